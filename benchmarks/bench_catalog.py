@@ -0,0 +1,83 @@
+"""Benchmark del índice de catálogo: tokens de prompt y latencia frente al tamaño del catálogo.
+
+Compara el bloque de catálogo que antes viajaba completo en cada prompt con el
+bloque de candidatos top-k que genera `CatalogIndex`. No llama a Gemini: los tokens
+se estiman con la misma heurística que usa el planificador (≈4 caracteres/token).
+
+Uso:
+    python benchmarks/bench_catalog.py [--sizes 100 1000 5000 20000] [--queries 200]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from jobcraft_matching import CatalogIndex, format_candidates
+from jobcraft_ratelimit import estimate_tokens
+
+ROLES = ["Analista", "Especialista", "Coordinador", "Jefe", "Gerente", "Asistente", "Consultor", "Ingeniero", "Técnico", "Director"]
+AREAS = [
+    "Ventas", "Compensación y Beneficios", "Clima Laboral", "Capacitación", "Onboarding", "Reclutamiento",
+    "Nómina", "Finanzas", "Contabilidad", "Logística", "Compras", "Marketing Digital", "Datos", "Ciberseguridad",
+    "Infraestructura", "Atención al Cliente", "Calidad", "Legal", "Comunicaciones Internas", "Producto",
+]
+LEVELS = ["Junior", "Semi-Senior", "Senior", "Líder"]
+
+
+def synthetic_catalog(size: int, rng: random.Random) -> list[dict]:
+    records = []
+    while len(records) < size:
+        cargo = f"{rng.choice(ROLES)} de {rng.choice(AREAS)}"
+        if len(records) >= len(ROLES) * len(AREAS):
+            cargo += f" {rng.choice(['Regional', 'Corporativo', 'Global', 'Zona Norte', 'Zona Sur'])} {len(records)}"
+        records.append({"Cargo": cargo, "Nivel": rng.choice(LEVELS)})
+    return records
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 5000, 20000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    header = f"{'catálogo':>9} | {'build ms':>9} | {'tokens completo':>15} | {'tokens top-k':>12} | {'p50 ms':>7} | {'p95 ms':>7} | {'recall@k':>8}"
+    print(header)
+    print("-" * len(header))
+    for size in args.sizes:
+        rng = random.Random(args.seed)
+        records = synthetic_catalog(size, rng)
+
+        t0 = time.perf_counter()
+        index = CatalogIndex(records)
+        build_ms = (time.perf_counter() - t0) * 1000
+
+        full_tokens = estimate_tokens(index.as_text(), expected_output=0)
+        latencies, topk_tokens, found = [], [], 0
+        for _ in range(args.queries):
+            target = rng.choice(records)
+            # Variación realista de la petición: minúsculas y sin el sufijo regional.
+            query = target["Cargo"].split(" Regional")[0].lower()
+            t0 = time.perf_counter()
+            matches = index.search(query, target["Nivel"])
+            latencies.append((time.perf_counter() - t0) * 1000)
+            topk_tokens.append(estimate_tokens(format_candidates(matches), expected_output=0))
+            found += any(m.cargo.lower().startswith(query) for m in matches)
+
+        print(
+            f"{size:>9} | {build_ms:>9.1f} | {full_tokens:>15} | {statistics.mean(topk_tokens):>12.0f} | "
+            f"{percentile(latencies, 50):>7.2f} | {percentile(latencies, 95):>7.2f} | {found / args.queries:>8.0%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+"""Benchmark de carga sin red: lote (`process_job_batch`) y web (`run_jobcraft_ai`) contra dobles locales.
+
+Gemini se sustituye por `FakeGenaiClient` (latencia lognormal, errores 429/503 con la
+probabilidad indicada) y Sheets por `FakeSpreadsheet`, instalados en el registro de
+clientes con `use_fakes`. Se recorren varios tamaños de lote, de catálogo y niveles de
+concurrencia, y para cada escenario se informa del rendimiento (filas/s), la latencia
+por fila p50/p95/p99, los tokens medios de prompt y el pico de memoria (tracemalloc).
+
+Con `--save-baseline` los resultados se guardan en un JSON; con `--baseline` se comparan
+con uno anterior y el proceso termina con código 1 si algún escenario empeora más de
+`--tolerance` (rendimiento menor o p95 mayor).
+
+Uso:
+    python benchmarks/bench_load.py [--batch-sizes 20 100] [--catalog-sizes 100 5000]
+        [--concurrency 1 8] [--latency 0.2] [--error-rate 0.05]
+        [--save-baseline base.json | --baseline base.json --tolerance 0.2]
+"""
+import os
+import sys
+import csv
+import json
+import time
+import random
+import argparse
+import tempfile
+import contextlib
+import statistics
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# El estado local (.jobcraft/) se crea relativo al directorio de trabajo: se aísla en un temporal
+# antes de importar los módulos que abren sus cachés al importarse.
+CALLER_CWD = os.getcwd()
+WORKDIR = tempfile.mkdtemp(prefix="jobcraft-bench-")
+os.chdir(WORKDIR)
+
+from bench_catalog import ROLES, AREAS, LEVELS, synthetic_catalog
+from jobcraft_fakes import FakeGenaiClient, FakeSpreadsheet, lognormal_latency, use_fakes
+from jobcraft_matching import CatalogIndex, CompetencyIndex
+from jobcraft_ratelimit import RateLimitScheduler
+
+SKILLS = ["Negociación", "SQL", "Liderazgo", "Excel avanzado", "Comunicación", "Python", "Gestión de proyectos"]
+
+# Métricas comparadas con la línea base: (clave, True si más alto es mejor).
+COMPARED = [("throughput", True), ("p95_ms", False)]
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def synthetic_rows(size: int, tag: str, rng: random.Random) -> list[tuple]:
+    # Títulos únicos (con `tag`) para que ni la caché de resultados ni la deduplicación oculten llamadas.
+    return [(f"{rng.choice(ROLES)} de {rng.choice(AREAS)} {tag}-{i}", rng.choice(LEVELS), rng.choice(SKILLS)) for i in range(size)]
+
+
+def synthetic_dictionary(size: int = 40) -> list[dict]:
+    return [{"Familia": f"Familia {i}", "COREES_Definición_Core_N1_Inicial": f"Definición de la competencia {i}"} for i in range(size)]
+
+
+def fast_scheduler() -> RateLimitScheduler:
+    # Sin límite de cuota y con backoff corto: se mide la aplicación, no la espera a la cuota real.
+    return RateLimitScheduler(rpm=1_000_000, tpm=1_000_000_000, max_retries=6, base_delay=0.05, max_delay=0.5)
+
+
+def summarize(latencies: list[float], elapsed: float, client: FakeGenaiClient, failed: int) -> dict:
+    calls = client.models.calls
+    return {
+        "rows": len(latencies),
+        "failed": failed,
+        "seconds": round(elapsed, 3),
+        "throughput": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "prompt_tokens": round(statistics.mean(c["prompt_tokens"] for c in calls)) if calls else 0,
+        "model_errors": client.models.errors,
+        "peak_mb": round(tracemalloc.get_traced_memory()[1] / 2**20, 1),
+    }
+
+
+def bench_batch(size: int, concurrency: int, args, rng: random.Random) -> dict:
+    import jobcraft_runner as runner
+
+    input_file = os.path.join(WORKDIR, f"batch_{size}_{concurrency}.csv")
+    with open(input_file, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["title", "level", "critical_skill"])
+        writer.writerows(synthetic_rows(size, f"b{size}c{concurrency}", rng))
+
+    latencies = []
+    generate = runner.generate_job_description
+
+    def timed(*a, **kw):
+        t0 = time.perf_counter()
+        try:
+            return generate(*a, **kw)
+        finally:
+            latencies.append(time.perf_counter() - t0)
+
+    client = FakeGenaiClient(latency=lognormal_latency(args.latency, rng=rng), error_rate=args.error_rate, seed=rng.random())
+    runner.RATE_LIMITER, runner.generate_job_description = fast_scheduler(), timed
+    output_file = os.path.join(WORKDIR, f"out_{size}_{concurrency}.jsonl")
+    try:
+        with use_fakes(genai_client=client), open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            tracemalloc.start()
+            t0 = time.perf_counter()
+            # Sin correo: el benchmark no debe tocar SMTP (su espera no es rendimiento del lote).
+            runner.process_job_batch("bench", input_file, max_concurrency=concurrency, output_file=output_file, dedup=False,
+                                     notify="none")
+            elapsed = time.perf_counter() - t0
+            result = summarize(latencies, elapsed, client, 0)
+            tracemalloc.stop()
+    finally:
+        runner.generate_job_description = generate
+    with open(output_file, encoding="utf-8") as f:
+        result["failed"] = size - sum(1 for _ in f)
+    return result
+
+
+def bench_web(requests: int, catalog_size: int, concurrency: int, args, rng: random.Random) -> dict:
+    import jobcraft_web as web
+    from streamlit.logger import set_log_level
+
+    set_log_level("error")   # fuera de `streamlit run` cada caché avisa de que no hay contexto de sesión
+    diccionario = CompetencyIndex(synthetic_dictionary())
+    catalogo = CatalogIndex(synthetic_catalog(catalog_size, rng))
+    client = FakeGenaiClient(latency=lognormal_latency(args.latency, rng=rng), error_rate=args.error_rate, seed=rng.random())
+    scheduler = fast_scheduler()
+    web.get_rate_limiter = lambda: scheduler
+    rows = synthetic_rows(requests, f"w{catalog_size}c{concurrency}", rng)
+    latencies, failed = [], 0
+
+    def one(row):
+        t0 = time.perf_counter()
+        error, _ = web.run_jobcraft_ai("bench", *row, diccionario, catalogo)
+        latencies.append(time.perf_counter() - t0)
+        return error
+
+    with use_fakes(genai_client=client, spreadsheet=FakeSpreadsheet()):
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            failed = sum(1 for error in pool.map(one, rows) if error)
+        elapsed = time.perf_counter() - t0
+        result = summarize(latencies, elapsed, client, failed)
+        tracemalloc.stop()
+    return result
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if previous is None:
+            continue
+        for key, higher_is_better in COMPARED:
+            before, now = previous.get(key), current.get(key)
+            if not before or now is None:
+                continue
+            change = (now - before) / before
+            if (higher_is_better and change < -tolerance) or (not higher_is_better and change > tolerance):
+                regressions.append(f"{name}: {key} {before} -> {now} ({change:+.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[20, 100])
+    parser.add_argument("--catalog-sizes", type=int, nargs="+", default=[100, 5000])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--web-requests", type=int, default=40, help="Peticiones por escenario web.")
+    parser.add_argument("--latency", type=float, default=0.2, help="Latencia mediana del modelo (s).")
+    parser.add_argument("--error-rate", type=float, default=0.05, help="Fracción de llamadas que fallan con 429/503.")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--save-baseline", help="Guarda los resultados en este JSON.")
+    parser.add_argument("--baseline", help="Compara con este JSON y sale con 1 si hay regresión.")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Empeoramiento relativo tolerado.")
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    scenarios = []
+    for size in args.batch_sizes:
+        for concurrency in args.concurrency:
+            scenarios.append((f"lote n={size} c={concurrency}", lambda s=size, c=concurrency: bench_batch(s, c, args, rng)))
+    for catalog_size in args.catalog_sizes:
+        for concurrency in args.concurrency:
+            scenarios.append((f"web catálogo={catalog_size} c={concurrency}",
+                              lambda s=catalog_size, c=concurrency: bench_web(args.web_requests, s, c, args, rng)))
+
+    print(f"Latencia mediana del modelo: {args.latency}s, errores 429/503: {args.error_rate:.0%}\n")
+    header = f"{'escenario':<28} | {'filas/s':>7} | {'p50 ms':>7} | {'p95 ms':>7} | {'p99 ms':>7} | {'tokens':>6} | {'fallos':>6} | {'MB':>6}"
+    print(header)
+    print("-" * len(header))
+    results = {}
+    for name, run in scenarios:
+        r = results[name] = run()
+        print(
+            f"{name:<28} | {r['throughput']:7.1f} | {r['p50_ms']:7.0f} | {r['p95_ms']:7.0f} | {r['p99_ms']:7.0f} | "
+            f"{r['prompt_tokens']:6d} | {r['failed']:6d} | {r['peak_mb']:6.1f}"
+        )
+
+    config = {k: v for k, v in vars(args).items() if k not in ("save_baseline", "baseline", "tolerance")}
+    if args.save_baseline:
+        with open(os.path.join(CALLER_CWD, args.save_baseline), "w", encoding="utf-8") as f:
+            json.dump({"config": config, "scenarios": results}, f, ensure_ascii=False, indent=2)
+        print(f"\nLínea base guardada en {args.save_baseline}")
+    if args.baseline:
+        with open(os.path.join(CALLER_CWD, args.baseline), encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("config") != config:
+            print("\n⚠️ La línea base se tomó con otra configuración: la comparación es orientativa.")
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n❌ Regresiones (tolerancia {args.tolerance:.0%}):")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"\n✅ Sin regresiones frente a {args.baseline} (tolerancia {args.tolerance:.0%}).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Benchmark de arranque de jobcraft_web: tiempo de importación y tiempo hasta el primer render.
+
+Cada medida se toma en un proceso nuevo, como en un arranque en frío del contenedor.
+El primer render se mide con el `AppTest` de Streamlit y dobles locales de Sheets y
+Gemini (no hay red): "sin copia" simula la primera ejecución en una máquina nueva,
+con `--sheet-latency` segundos por descarga de hoja; "con copia" reutiliza la copia
+local de las hojas que dejó la ejecución anterior.
+
+Uso:
+    python benchmarks/bench_startup.py [--runs 5] [--sheet-latency 1.5]
+"""
+import os
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ["pandas", "google.genai", "gspread", "docx", "fpdf"]
+
+IMPORT_PROBE = """
+import sys, time, json
+t0 = time.perf_counter()
+import {module}
+ms = (time.perf_counter() - t0) * 1000
+print(json.dumps({{"ms": ms, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+# Script que ejecuta AppTest: instala los dobles en el registro de clientes (sin importar
+# gspread ni google-genai, para no falsear la medida) y lanza la app como `streamlit run`.
+APP_SCRIPT = """
+import sys, time, runpy
+sys.path.insert(0, {root!r})
+from jobcraft_clients import REGISTRY, _Entry
+
+class _Worksheet:
+    def __init__(self, rows): self.rows = rows
+    def get_all_records(self):
+        time.sleep({latency!r})
+        return self.rows
+    def append_rows(self, rows, **kwargs): pass
+
+_SHEETS = {{
+    "Diccionario_JobCraft": _Worksheet([{{"Familia": f"Familia {{i}}", "COREES_Definición_Core_N1_Inicial": f"Definición {{i}}"}} for i in range(40)]),
+    "Perfiles_Base_JobCraft": _Worksheet([{{"Cargo": f"Analista {{i}}", "Nivel": "Senior"}} for i in range(300)]),
+    "Seguimiento Generaciones": _Worksheet([]),
+}}
+
+class _Spreadsheet:
+    def worksheet(self, name): return _SHEETS[name]
+    def get_lastUpdateTime(self): return "2024-01-01T00:00:00Z"
+
+def _fake_genai(api_key):
+    from jobcraft_fakes import FakeGenaiClient
+    return _Entry(FakeGenaiClient())
+
+REGISTRY._build_spreadsheet = lambda creds, sheet_id: _Entry(_Spreadsheet())
+REGISTRY._build_genai = _fake_genai
+runpy.run_path({app!r}, run_name="__main__")
+"""
+
+RENDER_PROBE = """
+import time, json
+t0 = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file({script!r}, default_timeout=120)
+at.secrets["GEMINI_API_KEY"] = "bench"
+at.secrets["gspread"] = {{"gcp_service_account_credentials": {{}}}}
+t1 = time.perf_counter()
+at.run()
+t2 = time.perf_counter()
+assert not at.exception, at.exception
+while {wait} and at.info and time.perf_counter() - t2 < 60:
+    time.sleep(0.2)
+    at.run()   # espera a que termine la descarga en segundo plano (para sembrar la copia local)
+print(json.dumps({{"render_ms": (t2 - t1) * 1000, "total_ms": (t2 - t0) * 1000,
+                   "form": len(at.text_input) > 0, "loading": len(at.info) > 0}}))
+"""
+
+
+def run_probe(code: str, cwd: str) -> dict:
+    out = subprocess.run([sys.executable, "-c", code], cwd=cwd, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--sheet-latency", type=float, default=1.5, help="Segundos que tarda cada descarga de hoja.")
+    args = parser.parse_args()
+
+    print("Importación (proceso nuevo, mediana):")
+    for module in ["streamlit", *HEAVY_MODULES, "jobcraft_web"]:
+        samples = [run_probe(IMPORT_PROBE.format(module=module, heavy=HEAVY_MODULES), ROOT) for _ in range(args.runs)]
+        loaded = [m for m in samples[-1]["loaded"] if m != module]
+        extra = f"  (arrastra: {', '.join(loaded)})" if loaded and module == "jobcraft_web" else ""
+        print(f"  {module:<14} {statistics.median(s['ms'] for s in samples):8.0f} ms{extra}")
+
+    print(f"\nPrimer render (latencia de Sheets: {args.sheet_latency}s por hoja, mediana de {args.runs}):")
+    header = f"{'escenario':>10} | {'render ms':>9} | {'total ms':>9} | formulario | cargando"
+    print(header)
+    print("-" * len(header))
+    with tempfile.TemporaryDirectory() as tmp:
+        script = os.path.join(tmp, "app.py")
+        with open(script, "w", encoding="utf-8") as f:
+            f.write(APP_SCRIPT.format(root=ROOT, latency=args.sheet_latency, app=os.path.join(ROOT, "jobcraft_web.py")))
+        for label, keep_snapshot in (("sin copia", False), ("con copia", True)):
+            samples = []
+            for i in range(args.runs):
+                workdir = os.path.join(tmp, "state")
+                if not keep_snapshot or i == 0:
+                    # "sin copia": estado vacío en cada ejecución; "con copia": se siembra una vez.
+                    shutil.rmtree(workdir, ignore_errors=True)
+                    os.makedirs(workdir)
+                    if keep_snapshot:
+                        run_probe(RENDER_PROBE.format(script=script, wait=True), workdir)
+                samples.append(run_probe(RENDER_PROBE.format(script=script, wait=False), workdir))
+            print(
+                f"{label:>10} | {statistics.median(s['render_ms'] for s in samples):9.0f} | "
+                f"{statistics.median(s['total_ms'] for s in samples):9.0f} | "
+                f"{'sí' if all(s['form'] for s in samples) else 'no':>10} | "
+                f"{'sí' if any(s['loading'] for s in samples) else 'no':>8}"
+            )
+
+
+if __name__ == "__main__":
+    main()
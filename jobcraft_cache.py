@@ -0,0 +1,118 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+import unicodedata
+
+# ---------------------------------------------------------
+# CACHÉ PERSISTENTE DE PERFILES GENERADOS
+# ---------------------------------------------------------
+# Carpeta local donde JobCraft guarda su estado (cachés, diarios, etc.).
+DATA_DIR = ".jobcraft"
+CACHE_FILE = os.path.join(DATA_DIR, "result_cache.sqlite")
+
+DEFAULT_MAX_ENTRIES = 5000
+DEFAULT_MAX_AGE = 30 * 24 * 3600  # 30 días
+
+
+def normalize_text(text) -> str:
+    """Minúsculas, sin tildes y con espacios colapsados: 'Analista  de Ventas ' == 'analista de ventas'."""
+    text = unicodedata.normalize("NFKD", str(text or ""))
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return " ".join(text.lower().split())
+
+
+def fingerprint(*parts) -> str:
+    """Hash estable (sha256) de cualquier combinación de textos/estructuras serializables."""
+    payload = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """Caché en SQLite de perfiles ya validados, direccionada por el contenido de la petición.
+
+    La clave incluye las entradas normalizadas, el modelo, la versión del prompt y la
+    huella del contexto (diccionario + catálogo), así que cualquier cambio en ellos
+    invalida automáticamente las entradas antiguas. Es segura entre hilos.
+    """
+
+    def __init__(self, path: str = CACHE_FILE, max_entries: int = DEFAULT_MAX_ENTRIES, max_age: float = DEFAULT_MAX_AGE):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " key TEXT PRIMARY KEY, schema TEXT NOT NULL, payload TEXT NOT NULL,"
+            " created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self.conn.commit()
+
+    @staticmethod
+    def make_key(title: str, level: str, critical_skill: str, model: str, prompt_version: str, context_hash: str = "") -> str:
+        return fingerprint(
+            normalize_text(title), normalize_text(level), normalize_text(critical_skill),
+            model, prompt_version, context_hash,
+        )
+
+    def get(self, key: str, model_cls):
+        """Devuelve el objeto `model_cls` validado o None (fallo de caché)."""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT payload, created FROM results WHERE key = ? AND schema = ?", (key, model_cls.__name__)
+            ).fetchone()
+            if row is None or time.time() - row[1] > self.max_age:
+                self.misses += 1
+                return None
+            try:
+                value = model_cls.model_validate_json(row[0])
+            except Exception:
+                # Entrada corrupta o de un esquema anterior: se descarta.
+                self.conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                self.conn.commit()
+                self.misses += 1
+                return None
+            self.conn.execute("UPDATE results SET accessed = ? WHERE key = ?", (time.time(), key))
+            self.conn.commit()
+            self.hits += 1
+            return value
+
+    def put(self, key: str, value):
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO results (key, schema, payload, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, type(value).__name__, value.model_dump_json(), now, now),
+            )
+            self._evict(now)
+            self.conn.commit()
+
+    def _evict(self, now: float):
+        """Borra lo caducado y, si aún sobra, lo menos usado recientemente."""
+        self.conn.execute("DELETE FROM results WHERE created < ?", (now - self.max_age,))
+        (count,) = self.conn.execute("SELECT COUNT(*) FROM results").fetchone()
+        if count > self.max_entries:
+            self.conn.execute(
+                "DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY accessed ASC LIMIT ?)",
+                (count - self.max_entries,),
+            )
+
+    def stats(self) -> dict:
+        with self.lock:
+            (entries,) = self.conn.execute("SELECT COUNT(*) FROM results").fetchone()
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": entries,
+        }
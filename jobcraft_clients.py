@@ -0,0 +1,123 @@
+import time
+import threading
+
+from jobcraft_cache import fingerprint
+
+# ---------------------------------------------------------
+# REGISTRO DE CLIENTES COMPARTIDOS (Gemini + Google Sheets)
+# ---------------------------------------------------------
+# Conexiones abiertas que se mantienen por cliente; cubre la concurrencia del lote y de la web.
+POOL_SIZE = 32
+# Cada cuánto se comprueba que un cliente sigue sano antes de prestarlo.
+HEALTH_CHECK_INTERVAL = 300.0
+# Modelo usado para el chequeo de Gemini (solo lee metadatos, no consume cuota de generación).
+HEALTH_CHECK_MODEL = "gemini-2.5-flash"
+
+# Las librerías de cliente (google-genai, gspread, httpx) se importan al crear el primer
+# cliente y no al importar el módulo: son lo más lento del arranque de la web.
+
+
+class _Entry:
+    def __init__(self, client, credentials=None):
+        self.client = client
+        self.credentials = credentials
+        self.created = time.monotonic()
+        self.checked = self.created
+        self.uses = 0
+
+
+class ClientRegistry:
+    """Clientes de larga vida compartidos por todo el proceso (sesiones de Streamlit e hilos del lote).
+
+    Se crea un `genai.Client` por clave de API y un `Spreadsheet` por cuenta de servicio y
+    documento, cada uno con su pool de conexiones. Antes de prestar un cliente que lleva
+    `health_interval` segundos sin comprobarse se verifica que responde (y en Sheets se
+    renueva el token si ha caducado); si no responde, se descarta y se crea otro.
+    """
+
+    def __init__(self, pool_size: int = POOL_SIZE, health_interval: float = HEALTH_CHECK_INTERVAL):
+        self.pool_size = pool_size
+        self.health_interval = health_interval
+        self.entries = {}
+        self.builds = 0
+        self.lock = threading.Lock()
+
+    # --- Gemini ---
+    def _build_genai(self, api_key: str) -> _Entry:
+        import httpx
+        from google import genai
+        from google.genai import types
+
+        limits = httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size)
+        client = genai.Client(api_key=api_key, http_options=types.HttpOptions(client_args={"limits": limits}))
+        return _Entry(client)
+
+    def _check_genai(self, entry: _Entry):
+        entry.client.models.get(model=HEALTH_CHECK_MODEL)
+
+    def genai(self, api_key: str):
+        """`genai.Client` compartido para `api_key`."""
+        return self._get(("genai", fingerprint(api_key)), lambda: self._build_genai(api_key), self._check_genai)
+
+    # --- Google Sheets ---
+    def _build_spreadsheet(self, creds: dict, sheet_id: str) -> _Entry:
+        import gspread
+        from requests.adapters import HTTPAdapter
+
+        gc = gspread.service_account_from_dict(dict(creds))
+        adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+        gc.http_client.session.mount("https://", adapter)
+        return _Entry(gc.open_by_key(sheet_id), gc.http_client.auth)
+
+    def _check_spreadsheet(self, entry: _Entry):
+        if entry.credentials is not None and not entry.credentials.valid:
+            from google.auth.transport.requests import Request
+            entry.credentials.refresh(Request())
+        entry.client.fetch_sheet_metadata()
+
+    def spreadsheet(self, creds: dict, sheet_id: str):
+        """`gspread.Spreadsheet` compartido para la cuenta de servicio `creds` y el documento `sheet_id`."""
+        key = ("sheets", fingerprint(creds.get("client_email", ""), creds.get("private_key_id", ""), sheet_id))
+        return self._get(key, lambda: self._build_spreadsheet(creds, sheet_id), self._check_spreadsheet)
+
+    # --- Común ---
+    def _get(self, key, build, check):
+        with self.lock:
+            entry = self.entries.get(key)
+        if entry is not None and time.monotonic() - entry.checked >= self.health_interval:
+            try:
+                check(entry)
+                entry.checked = time.monotonic()
+            except Exception:
+                self.invalidate(key)
+                entry = None
+        if entry is None:
+            with self.lock:
+                entry = self.entries.get(key)
+                if entry is None:
+                    # Se construye bajo el candado: así dos hilos no autentican a la vez.
+                    entry = self.entries[key] = build()
+                    self.builds += 1
+        entry.uses += 1
+        return entry.client
+
+    def invalidate(self, key=None):
+        """Descarta un cliente (o todos); el siguiente `get` crea uno nuevo.
+
+        No se cierra explícitamente: otros hilos pueden tenerlo prestado y terminan sus llamadas con él.
+        """
+        with self.lock:
+            for k in ([key] if key is not None else list(self.entries)):
+                self.entries.pop(k, None)
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "clients": len(self.entries),
+                "builds": self.builds,
+                "uses": sum(e.uses for e in self.entries.values()),
+            }
+
+
+# Registro único del proceso.
+REGISTRY = ClientRegistry()
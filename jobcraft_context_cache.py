@@ -0,0 +1,121 @@
+import time
+import threading
+
+from jobcraft_ratelimit import estimate_tokens
+from jobcraft_streaming import open_stream
+
+# ---------------------------------------------------------
+# CACHÉ DE CONTEXTO DE GEMINI (prefijo estable del prompt)
+# ---------------------------------------------------------
+# Gemini rechaza cachés por debajo de este tamaño; no merece la pena ni intentarlo.
+MIN_CACHE_TOKENS = 1024
+DEFAULT_TTL = 3600
+# Se renueva el caché un poco antes de que caduque para no perder llamadas en el borde.
+REFRESH_MARGIN = 120
+# Tras un fallo al crear el caché, se trabaja en modo normal durante este tiempo antes de reintentar.
+RETRY_DISABLED_FOR = 600
+
+
+def is_cache_error(error: Exception) -> bool:
+    """El caché referenciado ya no existe o no es válido (caducado, borrado, otro modelo)."""
+    code = getattr(error, "code", None)
+    return code in (400, 403, 404) and "cach" in str(error).lower()
+
+
+class ContextCache:
+    """Mantiene un `CachedContent` con el prefijo estable (instrucciones, catálogo, diccionario).
+
+    `key` identifica el contenido del prefijo (p.ej. versión del prompt + huella de las hojas):
+    si cambia, el caché se vuelve a crear. Si el servicio no permite cachear (prefijo muy
+    corto, modelo sin soporte, cuota), las llamadas se hacen enviando el prefijo como
+    `system_instruction` normal, sin que el llamador tenga que enterarse.
+    """
+
+    def __init__(self, model: str, ttl: int = DEFAULT_TTL):
+        self.model = model
+        self.ttl = ttl
+        self.name = None
+        self.key = None
+        self.expires_at = 0.0
+        self.disabled_until = 0.0
+        self.created = 0
+        self.lock = threading.Lock()
+
+    def _delete(self, client, name: str):
+        try:
+            client.caches.delete(name=name)
+        except Exception:
+            pass  # Caducará solo.
+
+    def handle(self, client, system_instruction: str, key: str) -> str | None:
+        """Nombre del caché vigente para `key`, creándolo o renovándolo si hace falta; None = sin caché."""
+        now = time.time()
+        with self.lock:
+            if self.name and self.key == key and now < self.expires_at - REFRESH_MARGIN:
+                return self.name
+            if now < self.disabled_until or estimate_tokens(system_instruction, expected_output=0) < MIN_CACHE_TOKENS:
+                return None
+
+            from google.genai import types
+
+            old_name = self.name
+            try:
+                cached = client.caches.create(
+                    model=self.model,
+                    config=types.CreateCachedContentConfig(
+                        system_instruction=system_instruction,
+                        ttl=f"{self.ttl}s",
+                        display_name=f"jobcraft-{key[:16]}",
+                    ),
+                )
+            except Exception:
+                self.name, self.key = None, None
+                self.disabled_until = now + RETRY_DISABLED_FOR
+                return None
+
+            self.name, self.key = cached.name, key
+            self.expires_at = now + self.ttl
+            self.created += 1
+
+        if old_name and old_name != self.name:
+            self._delete(client, old_name)
+        return self.name
+
+    def invalidate(self):
+        with self.lock:
+            self.name, self.key, self.expires_at = None, None, 0.0
+
+    def generate(self, client, contents: str, system_instruction: str, key: str, call=None, stream_handler=None,
+                 uncached: tuple[str, str] | None = None, **config_kwargs):
+        """`generate_content` usando el caché si existe; si el caché falla, reintenta una vez sin él.
+
+        `call(fn, **kwargs)` permite interponer el planificador de cuota (por defecto se llama directo).
+        Con `stream_handler(chunks)` se usa `generate_content_stream` y se devuelve lo que devuelva el handler.
+        `uncached=(contents, system_instruction)` es lo que se envía cuando no hay caché: el prefijo
+        cacheable puede llevar contexto extra que solo compensa a precio de caché.
+        """
+        from google.genai import types
+
+        call = call or (lambda fn, **kwargs: fn(**kwargs))
+        if stream_handler is None:
+            generate = client.models.generate_content
+        else:
+            def generate(**kwargs):
+                return stream_handler(open_stream(client.models.generate_content_stream, **kwargs))
+        plain_contents, plain_instruction = uncached or (contents, system_instruction)
+
+        def without_cache():
+            config = types.GenerateContentConfig(system_instruction=plain_instruction, **config_kwargs)
+            return call(generate, model=self.model, contents=plain_contents, config=config)
+
+        name = self.handle(client, system_instruction, key)
+        if not name:
+            return without_cache()
+        try:
+            return call(generate, model=self.model, contents=contents,
+                        config=types.GenerateContentConfig(cached_content=name, **config_kwargs))
+        except Exception as e:
+            if not is_cache_error(e):
+                raise
+            self.invalidate()
+            return without_cache()
@@ -0,0 +1,109 @@
+import re
+from difflib import SequenceMatcher
+from dataclasses import dataclass
+
+from jobcraft_cache import normalize_text
+from jobcraft_matching import STOPWORDS, TfidfIndex, level_rank
+
+# ---------------------------------------------------------
+# DEDUPLICACIÓN DE FILAS DE ENTRADA (lotes)
+# ---------------------------------------------------------
+# Similitud mínima (0-1, sobre el texto canónico) para considerar dos filas la misma petición.
+# Con 1.0 solo se agrupan las filas idénticas tras normalizar.
+TITLE_THRESHOLD = 0.92
+SKILL_THRESHOLD = 0.85
+# Umbral laxo del índice TF-IDF para preseleccionar candidatos antes de comparar carácter a carácter.
+CANDIDATE_THRESHOLD = 0.3
+
+# Abreviaturas que se expanden antes de comparar.
+ABBREVIATIONS = {"sr": "senior", "jr": "junior", "ssr": "semisenior", "ing": "ingeniero", "lic": "licenciado", "asist": "asistente"}
+# Palabras de nivel que a veces se cuelan en el título ('Analista Sr.'): el nivel ya va en su columna.
+TITLE_LEVEL_WORDS = {"senior", "junior", "semisenior", "trainee", "practicante"}
+
+
+def canonical_text(text) -> str:
+    """Minúsculas, sin tildes ni signos, abreviaturas expandidas y espacios colapsados."""
+    text = normalize_text(text).replace("semi senior", "semisenior").replace("semi-senior", "semisenior")
+    words = re.findall(r"[a-z0-9+#]+", text)
+    return " ".join(ABBREVIATIONS.get(w, w) for w in words)
+
+
+def canonical_row(title, level, critical_skill) -> tuple[str, str, str]:
+    """(título, nivel, habilidad) canónicos. El nivel se reduce a su rango si se reconoce ('Sr.' == 'Senior (5+ años)')."""
+    title_words = [w for w in canonical_text(title).split() if w not in TITLE_LEVEL_WORDS and w not in STOPWORDS]
+    rank = level_rank(level)
+    canonical_level = f"rango {rank}" if rank is not None else canonical_text(level)
+    return " ".join(title_words), canonical_level, canonical_text(critical_skill)
+
+
+def similarity(a: str, b: str) -> float:
+    if a == b:
+        return 1.0
+    return SequenceMatcher(None, a, b).ratio()
+
+
+@dataclass
+class DedupReport:
+    rows: int
+    groups: int
+    exact: int      # filas unidas por ser idénticas tras normalizar
+    fuzzy: int      # variantes unidas por parecido (sus copias exactas cuentan en `exact`)
+
+    @property
+    def calls_saved(self) -> int:
+        return self.rows - self.groups
+
+    def __str__(self) -> str:
+        pct = self.calls_saved / self.rows if self.rows else 0.0
+        return (
+            f"{self.rows} filas -> {self.groups} peticiones únicas "
+            f"({self.exact} duplicadas exactas, {self.fuzzy} casi duplicadas): "
+            f"{self.calls_saved} llamadas ahorradas ({pct:.0%})"
+        )
+
+
+def group_rows(rows: list[tuple], title_threshold: float = TITLE_THRESHOLD,
+               skill_threshold: float = SKILL_THRESHOLD) -> tuple[list[list[int]], DedupReport]:
+    """Agrupa filas (title, level, critical_skill) que piden lo mismo.
+
+    Devuelve los grupos como listas de índices en orden de entrada (el primero es el
+    representante que se genera) y un resumen. Primero se unen las filas idénticas tras
+    canonicalizar; después, entre filas del mismo nivel, las que superan ambos umbrales
+    de similitud frente al representante de un grupo anterior.
+    """
+    keys = [canonical_row(*row) for row in rows]
+
+    exact = {}
+    for i, key in enumerate(keys):
+        exact.setdefault(key, []).append(i)
+    uniques = list(exact)   # en orden de primera aparición
+
+    merged_into = {}        # posición en `uniques` -> posición del representante
+    fuzzy_rows = 0
+    if title_threshold < 1.0 and len(uniques) > 1:
+        index = TfidfIndex([title for title, _, _ in uniques])
+        for pos, (title, level, skill) in enumerate(uniques):
+            best = None
+            for other, score in index.scores(title).items():
+                if other >= pos or other in merged_into or score < CANDIDATE_THRESHOLD:
+                    continue
+                o_title, o_level, o_skill = uniques[other]
+                if o_level != level:
+                    continue
+                if similarity(title, o_title) >= title_threshold and similarity(skill, o_skill) >= skill_threshold:
+                    best = other if best is None else min(best, other)
+            if best is not None:
+                merged_into[pos] = best
+                fuzzy_rows += 1
+
+    groups = {}
+    for pos, key in enumerate(uniques):
+        groups.setdefault(merged_into.get(pos, pos), []).extend(exact[key])
+    result = [sorted(members) for _, members in sorted(groups.items())]
+    report = DedupReport(
+        rows=len(rows),
+        groups=len(result),
+        exact=len(rows) - len(uniques),
+        fuzzy=fuzzy_rows,
+    )
+    return result, report
@@ -0,0 +1,321 @@
+import io
+import os
+import re
+import csv
+import time
+import hashlib
+import zipfile
+import tempfile
+import contextlib
+import threading
+import multiprocessing
+from types import SimpleNamespace
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+import pandas as pd
+from docx import Document 
+from docx.shared import Pt 
+from fpdf import FPDF 
+
+# ---------------------------------------------------------
+# 1. GENERADORES DE ARCHIVOS (Word, PDF, TXT, CSV)
+# ---------------------------------------------------------
+
+# --- A. Generador de WORD ---
+def create_docx(res):
+    doc = Document()
+    doc.add_heading(res.titulo_puesto, 0)
+    p = doc.add_paragraph()
+    p.add_run("Nivel: ").bold = True
+    p.add_run(f"{getattr(res, 'nivel', 'N/A')}\n")
+    p.add_run("Misión del Cargo: ").bold = True
+    p.add_run(f"{res.mision_puesto}")
+
+    def add_section(title, items):
+        doc.add_heading(title, level=1)
+        if items:
+            for item in items:
+                doc.add_paragraph(item, style='List Bullet')
+    
+    add_section("Responsabilidades Clave", res.responsabilidades_clave)
+    add_section("Competencias Conductuales", res.competencias_conductuales_seleccionadas)
+    add_section("Requisitos Técnicos", res.competencias_tecnicas)
+    add_section("Formación", res.requisitos_formacion)
+    add_section("KPIs Sugeridos", res.kpis_sugeridos)
+    
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    buffer.seek(0)
+    return buffer
+
+# --- B. Generador de PDF ---
+class PDF(FPDF):
+    def header(self):
+        self.set_font('Arial', 'B', 15)
+        self.cell(0, 10, 'Perfil de Puesto - JobCraft AI', 0, 1, 'C')
+        self.ln(5)
+
+def clean_text_for_pdf(text):
+    return text.encode('latin-1', 'replace').decode('latin-1')
+
+def create_pdf(res):
+    pdf = PDF()
+    add_pdf_profile(pdf, res)
+    
+    try:
+        pdf_output = pdf.output(dest='S').encode('latin-1')
+    except:
+        pdf_output = pdf.output(dest='S')
+    return pdf_output
+
+def add_pdf_profile(pdf, res):
+    # Añade un perfil en página nueva; se reutiliza para el PDF combinado de la exportación masiva.
+    pdf.add_page()
+    pdf.set_font("Arial", size=12)
+    
+    pdf.set_font("Arial", 'B', 16)
+    pdf.multi_cell(0, 10, clean_text_for_pdf(res.titulo_puesto))
+    pdf.ln(5)
+    
+    pdf.set_font("Arial", 'B', 12)
+    pdf.cell(0, 10, "Misión del Cargo:", ln=True)
+    pdf.set_font("Arial", size=12)
+    pdf.multi_cell(0, 7, clean_text_for_pdf(res.mision_puesto))
+    pdf.ln(5)
+    
+    def add_pdf_section(title, items):
+        pdf.set_font("Arial", 'B', 12)
+        pdf.cell(0, 10, clean_text_for_pdf(title), ln=True)
+        pdf.set_font("Arial", size=12)
+        for item in items:
+            pdf.multi_cell(0, 7, f"- {clean_text_for_pdf(item)}")
+        pdf.ln(3)
+
+    add_pdf_section("Responsabilidades Clave", res.responsabilidades_clave)
+    add_pdf_section("Competencias Conductuales", res.competencias_conductuales_seleccionadas)
+    add_pdf_section("Requisitos Técnicos", res.competencias_tecnicas)
+    add_pdf_section("Formación", res.requisitos_formacion)
+
+# --- C. Generador de TXT ---
+def convert_to_text(res):
+    texto = f"PERFIL: {res.titulo_puesto}\nNivel: {getattr(res, 'nivel', 'N/A')}\nMisión: {res.mision_puesto}\n\n"
+    texto += "RESPONSABILIDADES:\n" + "\n".join([f"- {x}" for x in res.responsabilidades_clave]) + "\n\n"
+    texto += "COMPETENCIAS:\n" + "\n".join([f"- {x}" for x in res.competencias_conductuales_seleccionadas]) + "\n\n"
+    texto += "TÉCNICAS:\n" + "\n".join([f"- {x}" for x in res.competencias_tecnicas])
+    return texto
+
+# --- D. Generador de CSV (NUEVO) ---
+def csv_record(res):
+    # Creamos un diccionario plano. Unimos las listas con " | "
+    return {
+        "Título": res.titulo_puesto,
+        "Nivel": getattr(res, 'nivel', 'N/A'),
+        "Misión": res.mision_puesto,
+        "Responsabilidades": " | ".join(res.responsabilidades_clave),
+        "Competencias Conductuales": " | ".join(res.competencias_conductuales_seleccionadas),
+        "Competencias Técnicas": " | ".join(res.competencias_tecnicas),
+        "Formación": " | ".join(res.requisitos_formacion),
+        "KPIs": " | ".join(res.kpis_sugeridos),
+        "Estado": getattr(res, 'origen_titulo', 'N/A')
+    }
+
+def create_csv(res):
+    data = csv_record(res)
+    # Creamos un DataFrame de 1 sola fila
+    df = pd.DataFrame([data])
+    return df.to_csv(index=False).encode('utf-8')
+
+# ---------------------------------------------------------
+# 2. CACHÉ DE EXPORTACIONES (se generan al pedirlas, una vez por contenido)
+# ---------------------------------------------------------
+# formato -> (extensión, tipo MIME)
+EXPORT_FORMATS = {
+    "docx": ("docx", "application/vnd.openxmlformats-officedocument.wordprocessingml.document"),
+    "pdf": ("pdf", "application/pdf"),
+    "txt": ("txt", "text/plain"),
+    "csv": ("csv", "text/csv"),
+}
+
+def render_export(res, fmt: str) -> bytes:
+    """Genera el archivo `fmt` de un perfil y lo devuelve siempre como bytes."""
+    if fmt == "docx":
+        return create_docx(res).getvalue()
+    if fmt == "pdf":
+        return bytes(create_pdf(res))
+    if fmt == "txt":
+        return convert_to_text(res).encode("utf-8")
+    if fmt == "csv":
+        return create_csv(res)
+    raise ValueError(f"Formato de exportación desconocido: {fmt}")
+
+def content_hash(res) -> str:
+    """Huella del contenido del perfil: dos perfiles iguales comparten exportaciones."""
+    return hashlib.sha256(res.model_dump_json().encode("utf-8")).hexdigest()
+
+class ExportCache:
+    """Memoriza exportaciones por (huella del perfil, formato) con desalojo LRU.
+
+    Si dos sesiones piden a la vez el mismo archivo, solo una lo genera y la otra espera el resultado.
+    """
+
+    def __init__(self, max_items: int = 256):
+        self.max_items = max_items
+        self.items = OrderedDict()
+        self.building = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.renders = 0
+
+    def get(self, res, fmt: str) -> bytes:
+        key = (content_hash(res), fmt)
+        with self.lock:
+            if key in self.items:
+                self.items.move_to_end(key)
+                self.hits += 1
+                return self.items[key]
+            key_lock = self.building.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self.lock:
+                if key in self.items:
+                    self.hits += 1
+                    return self.items[key]
+            data = render_export(res, fmt)
+            with self.lock:
+                self.renders += 1
+                self.items[key] = data
+                while len(self.items) > self.max_items:
+                    self.items.popitem(last=False)
+                self.building.pop(key, None)
+            return data
+
+# ---------------------------------------------------------
+# 3. EXPORTACIÓN MASIVA (ZIP + PDF combinado, en paralelo)
+# ---------------------------------------------------------
+# Formatos que se generan como un archivo por perfil dentro del ZIP; "csv" va combinado en uno solo.
+BULK_FILE_FORMATS = ("docx", "pdf", "txt")
+
+def as_profile_view(data: dict):
+    """Vista con los atributos que esperan los generadores, desde un JobDescriptionV4 o un JobDescription del runner."""
+    return SimpleNamespace(
+        titulo_puesto=data.get("titulo_puesto", ""),
+        nivel=data.get("nivel", "N/A"),
+        mision_puesto=data.get("mision_puesto", data.get("resumen_puesto", "")),
+        responsabilidades_clave=data.get("responsabilidades_clave", []),
+        competencias_conductuales_seleccionadas=data.get("competencias_conductuales_seleccionadas", data.get("competencias_deseables", [])),
+        competencias_tecnicas=data.get("competencias_tecnicas", data.get("requisitos_minimos", [])),
+        requisitos_formacion=data.get("requisitos_formacion", []),
+        kpis_sugeridos=data.get("kpis_sugeridos", []),
+        origen_titulo=data.get("origen_titulo", "N/A"),
+    )
+
+def safe_file_name(text: str) -> str:
+    return re.sub(r"[^\w\-]+", "_", text, flags=re.UNICODE).strip("_")[:80] or "perfil"
+
+def _render_bulk_item(index: int, data: dict, formats: tuple) -> tuple:
+    # Se ejecuta en un proceso del pool: recibe un dict (serializable) y devuelve bytes + tiempos por formato.
+    view = as_profile_view(data)
+    base = f"{index + 1:05d}_{safe_file_name(view.titulo_puesto)}"
+    files, timings = [], {}
+    for fmt in formats:
+        start = time.perf_counter()
+        files.append((f"{fmt}/{base}.{EXPORT_FORMATS[fmt][0]}", render_export(view, fmt)))
+        timings[fmt] = time.perf_counter() - start
+    return index, files, timings
+
+def export_bulk(profiles, zip_target=None, formats=("docx", "pdf", "csv"), workers: int | None = None, merged_pdf_path: str | None = None) -> dict:
+    """Genera los archivos de muchos perfiles en paralelo y los escribe directamente en un ZIP.
+
+    `profiles` puede ser cualquier iterable (se consume de forma perezosa) de modelos Pydantic
+    o dicts; `zip_target` es una ruta o un archivo binario abierto (None = sin ZIP, solo PDF combinado). Solo hay en memoria los
+    perfiles en vuelo (unos pocos por proceso). El CSV combinado se va escribiendo en un
+    temporal y el PDF combinado, si se pide, se compone en el proceso principal (FPDF lo
+    mantiene en memoria hasta guardarlo). Devuelve estadísticas de rendimiento por formato.
+    """
+    if zip_target is None:
+        formats = ()
+    file_formats = tuple(f for f in formats if f in BULK_FILE_FORMATS)
+    workers = workers or os.cpu_count() or 1
+    window = workers * 4
+    stats = defaultdict(lambda: {"files": 0, "bytes": 0, "cpu_seconds": 0.0})
+    started = time.perf_counter()
+    total = 0
+
+    merged = PDF() if merged_pdf_path else None
+    csv_tmp = tempfile.TemporaryFile(mode="w+", encoding="utf-8", newline="") if "csv" in formats else None
+    csv_writer = None
+
+    def handle(index, files, timings):
+        for name, data in files:
+            zf.writestr(name, data)
+            fmt = name.split("/", 1)[0]
+            stats[fmt]["files"] += 1
+            stats[fmt]["bytes"] += len(data)
+            stats[fmt]["cpu_seconds"] += timings[fmt]
+
+    # "spawn" evita heredar hilos y bloqueos del proceso padre (Streamlit, pools de red) al hacer fork.
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) if workers > 1 else None
+    try:
+        archive = zipfile.ZipFile(zip_target, "w", compression=zipfile.ZIP_DEFLATED) if zip_target is not None else contextlib.nullcontext()
+        with archive as zf:
+            in_flight = set()
+            for index, profile in enumerate(profiles):
+                data = profile if isinstance(profile, dict) else profile.model_dump()
+                total += 1
+                if csv_tmp is not None:
+                    record = csv_record(as_profile_view(data))
+                    if csv_writer is None:
+                        csv_writer = csv.DictWriter(csv_tmp, fieldnames=list(record))
+                        csv_writer.writeheader()
+                    csv_writer.writerow(record)
+                    stats["csv"]["files"] = 1
+                if merged is not None:
+                    add_pdf_profile(merged, as_profile_view(data))
+                if not file_formats:
+                    continue
+
+                if pool is None:
+                    handle(*_render_bulk_item(index, data, file_formats))
+                    continue
+                in_flight.add(pool.submit(_render_bulk_item, index, data, file_formats))
+                if len(in_flight) >= window:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        handle(*future.result())
+
+            for future in in_flight:
+                handle(*future.result())
+
+            if csv_tmp is not None and csv_writer is not None:
+                csv_tmp.seek(0)
+                with zf.open("perfiles.csv", "w") as dest:
+                    for line in csv_tmp:
+                        dest.write(line.encode("utf-8"))
+                stats["csv"]["bytes"] = zf.getinfo("perfiles.csv").file_size
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        if csv_tmp is not None:
+            csv_tmp.close()
+
+    if merged is not None and total:
+        merged.output(merged_pdf_path, dest="F")
+        stats["pdf_combinado"] = {"files": 1, "bytes": os.path.getsize(merged_pdf_path), "cpu_seconds": 0.0}
+
+    elapsed = time.perf_counter() - started
+    return {
+        "profiles": total,
+        "seconds": elapsed,
+        "formats": {
+            fmt: {**s, "files_per_second": s["files"] / elapsed if elapsed > 0 else 0.0}
+            for fmt, s in stats.items()
+        },
+    }
+
+def format_bulk_stats(stats: dict) -> str:
+    """Resumen legible del rendimiento por formato de `export_bulk`."""
+    lines = [f"📦 {stats['profiles']} perfiles exportados en {stats['seconds']:.1f}s"]
+    for fmt, s in stats["formats"].items():
+        lines.append(f"   - {fmt}: {s['files']} archivo(s), {s['bytes'] / 1024:.0f} KB, {s['files_per_second']:.1f} archivos/s")
+    return "\n".join(lines)
@@ -0,0 +1,247 @@
+import re
+import json
+import time
+import random
+import itertools
+import threading
+import contextlib
+import typing
+
+from google.genai import errors
+from pydantic import BaseModel
+
+# ---------------------------------------------------------
+# DOBLES LOCALES DE GEMINI (pruebas y benchmarks sin gastar cuota)
+# ---------------------------------------------------------
+
+
+def fake_payload(schema, seed: str = "", row_ids: list[int] | None = None) -> dict:
+    """Instancia válida de un esquema Pydantic: textos de relleno y listas de 5 elementos.
+
+    Las listas de sub-modelos (respuestas empaquetadas) llevan un elemento por cada `row_ids`.
+    """
+    payload = {}
+    for name, field in schema.model_fields.items():
+        args = typing.get_args(field.annotation)
+        if typing.get_origin(field.annotation) is list and args and isinstance(args[0], type) and issubclass(args[0], BaseModel):
+            ids = row_ids or [1, 2, 3]
+            payload[name] = [{**fake_payload(args[0], seed=str(i)), "row_id": i} for i in ids]
+        elif typing.get_origin(field.annotation) is list:
+            payload[name] = [f"{name} {i} {seed}".strip() for i in range(1, 6)]
+        elif field.annotation is int:
+            payload[name] = int(seed) if seed.isdigit() else 1
+        else:
+            payload[name] = f"{name} {seed}".strip()
+    return payload
+
+
+class FakeUsage:
+    def __init__(self, prompt_tokens: int, output_tokens: int, cached_tokens: int = 0):
+        self.prompt_token_count = prompt_tokens
+        self.candidates_token_count = output_tokens
+        self.cached_content_token_count = cached_tokens
+        self.total_token_count = prompt_tokens + output_tokens
+
+
+class FakeResponse:
+    def __init__(self, text: str, usage: FakeUsage):
+        self.text = text
+        self.usage_metadata = usage
+
+
+class FakeCachedContent:
+    def __init__(self, name: str, model: str, system_instruction: str):
+        self.name = name
+        self.model = model
+        self.system_instruction = system_instruction
+
+
+class FakeCaches:
+    """Imita `client.caches`: crea/borra cachés y permite simular que no están disponibles o caducan."""
+
+    def __init__(self, available: bool = True):
+        self.available = available
+        self.store = {}
+        self.create_calls = 0
+        self.delete_calls = 0
+        self._ids = itertools.count(1)
+
+    def create(self, model: str, config):
+        self.create_calls += 1
+        if not self.available:
+            raise errors.ClientError(400, {"error": {"code": 400, "status": "INVALID_ARGUMENT", "message": "Cached content is too small."}})
+        name = f"cachedContents/fake-{next(self._ids)}"
+        self.store[name] = FakeCachedContent(name, model, config.system_instruction)
+        return self.store[name]
+
+    def delete(self, name: str):
+        self.delete_calls += 1
+        self.store.pop(name, None)
+
+    def expire(self, name: str):
+        """Simula la caducidad del caché en el servidor."""
+        self.store.pop(name, None)
+
+
+def lognormal_latency(median: float, sigma: float = 0.5, rng: random.Random | None = None):
+    """Distribución de latencia con cola larga (como la de un LLM real): devuelve segundos por llamada."""
+    rng = rng or random.Random()
+    return lambda: rng.lognormvariate(0.0, sigma) * median
+
+
+def _quota_error(code: int) -> errors.APIError:
+    if code == 429:
+        return errors.ClientError(429, {"error": {"code": 429, "status": "RESOURCE_EXHAUSTED", "message": "Quota exceeded (fake)."}})
+    return errors.ServerError(code, {"error": {"code": code, "status": "UNAVAILABLE", "message": "The model is overloaded (fake)."}})
+
+
+class FakeModels:
+    """Imita `client.models.generate_content` devolviendo JSON válido para el `response_schema` pedido.
+
+    `latency()` da los segundos de cada llamada, `error_rate` la probabilidad de fallar con
+    uno de `error_codes` (429/503, los que el planificador reintenta) y `output_tokens` fija
+    los tokens de salida que se declaran en `usage_metadata` (por defecto, ≈ longitud/4).
+    """
+
+    def __init__(self, caches: FakeCaches, latency=None, error_rate: float = 0.0,
+                 error_codes: tuple = (429, 503), output_tokens: int | None = None, seed: int | None = None):
+        self.caches = caches
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_codes = error_codes
+        self.output_tokens = output_tokens
+        self.rng = random.Random(seed)
+        self.calls = []
+        self.errors = 0
+        self.lock = threading.Lock()
+
+    def _simulate(self):
+        if self.latency is not None:
+            time.sleep(max(0.0, self.latency()))
+        with self.lock:
+            fail = self.error_rate and self.rng.random() < self.error_rate
+            code = self.rng.choice(self.error_codes) if fail else None
+            if fail:
+                self.errors += 1
+        if fail:
+            raise _quota_error(code)
+
+    def get(self, model: str):
+        """Chequeo de salud del registro de clientes."""
+        return {"name": f"models/{model}"}
+
+    def generate_content(self, model: str, contents, config=None):
+        self._simulate()
+        cached_name = getattr(config, "cached_content", None)
+        cached_tokens = 0
+        if cached_name:
+            cached = self.caches.store.get(cached_name)
+            if cached is None:
+                raise errors.ClientError(404, {"error": {"code": 404, "status": "NOT_FOUND", "message": f"CachedContent not found: {cached_name}"}})
+            cached_tokens = len(cached.system_instruction) // 4
+        system_instruction = getattr(config, "system_instruction", None) or ""
+
+        schema = getattr(config, "response_schema", None)
+        row_ids = [int(i) for i in re.findall(r"row_id (\d+)", str(contents))]
+        text = json.dumps(fake_payload(schema, row_ids=row_ids), ensure_ascii=False) if schema else "Texto generado por el doble de Gemini."
+        prompt_tokens = (len(str(contents)) + len(system_instruction)) // 4 + cached_tokens
+        output_tokens = self.output_tokens if self.output_tokens is not None else len(text) // 4
+
+        with self.lock:
+            self.calls.append({
+                "model": model, "contents": contents, "cached_content": cached_name, "system_instruction": system_instruction,
+                "prompt_tokens": prompt_tokens, "output_tokens": output_tokens,
+            })
+        return FakeResponse(text, FakeUsage(prompt_tokens, output_tokens, cached_tokens))
+
+    def generate_content_stream(self, model: str, contents, config=None, chunk_size: int = 40):
+        """Misma respuesta que `generate_content`, entregada en trozos; el último lleva el consumo."""
+        response = self.generate_content(model=model, contents=contents, config=config)
+        for i in range(0, len(response.text), chunk_size):
+            yield FakeResponse(response.text[i:i + chunk_size], None)
+        yield FakeResponse("", response.usage_metadata)
+
+
+class FakeGenaiClient:
+    """Sustituto de `genai.Client` con `models` y `caches` en memoria (ver `FakeModels` para latencia y errores)."""
+
+    def __init__(self, caching_available: bool = True, **model_options):
+        self.caches = FakeCaches(caching_available)
+        self.models = FakeModels(self.caches, **model_options)
+
+
+# ---------------------------------------------------------
+# DOBLES LOCALES DE GOOGLE SHEETS (gspread)
+# ---------------------------------------------------------
+class FakeWorksheet:
+    """Hoja en memoria con la parte de la API de gspread que usa JobCraft."""
+
+    def __init__(self, title: str, records: list[dict] | None = None, latency: float = 0.0):
+        self.title = title
+        self.records = list(records or [])
+        self.appended = []
+        self.options = []     # kwargs de cada `append_rows` (p.ej. value_input_option)
+        self.latency = latency
+        self.reads = 0
+        self.writes = 0
+        self.lock = threading.Lock()
+
+    def get_all_records(self) -> list[dict]:
+        time.sleep(self.latency)
+        self.reads += 1
+        return [dict(r) for r in self.records]
+
+    def append_row(self, row: list, **kwargs):
+        self.append_rows([row], **kwargs)
+
+    def append_rows(self, rows: list[list], **kwargs):
+        time.sleep(self.latency)
+        with self.lock:
+            self.writes += 1
+            self.options.append(kwargs)
+            self.appended.extend(list(r) for r in rows)
+
+
+class FakeSpreadsheet:
+    def __init__(self, worksheets: dict[str, FakeWorksheet] | None = None, modified_time: str = "2024-01-01T00:00:00Z"):
+        self.worksheets = dict(worksheets or {})
+        self.modified_time = modified_time
+
+    def add(self, title: str, records: list[dict] | None = None, latency: float = 0.0) -> FakeWorksheet:
+        self.worksheets[title] = FakeWorksheet(title, records, latency)
+        return self.worksheets[title]
+
+    def worksheet(self, title: str) -> FakeWorksheet:
+        if title not in self.worksheets:
+            raise LookupError(f"WorksheetNotFound: {title}")
+        return self.worksheets[title]
+
+    def get_lastUpdateTime(self) -> str:
+        return self.modified_time
+
+    def fetch_sheet_metadata(self) -> dict:
+        sheets = []
+        for title, ws in self.worksheets.items():
+            columns = len(ws.records[0]) if ws.records else 0
+            grid = {"rowCount": len(ws.records) + len(ws.appended) + 1, "columnCount": columns}
+            sheets.append({"properties": {"title": title, "gridProperties": grid}})
+        return {"sheets": sheets}
+
+
+@contextlib.contextmanager
+def use_fakes(genai_client=None, spreadsheet: FakeSpreadsheet | None = None, registry=None):
+    """Hace que el registro de clientes entregue estos dobles en lugar de los clientes reales."""
+    from jobcraft_clients import REGISTRY, _Entry
+
+    registry = registry or REGISTRY
+    original = registry._build_genai, registry._build_spreadsheet
+    if genai_client is not None:
+        registry._build_genai = lambda api_key: _Entry(genai_client)
+    if spreadsheet is not None:
+        registry._build_spreadsheet = lambda creds, sheet_id: _Entry(spreadsheet)
+    registry.invalidate()
+    try:
+        yield registry
+    finally:
+        registry._build_genai, registry._build_spreadsheet = original
+        registry.invalidate()
@@ -0,0 +1,115 @@
+import time
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# ---------------------------------------------------------
+# COLA DE LOTES EN SEGUNDO PLANO (carga masiva desde la web)
+# ---------------------------------------------------------
+# Filas generadas a la vez entre todos los lotes del proceso (comparten la cuota de Gemini).
+MAX_WORKERS = 8
+# Tiempo que se conservan en memoria los lotes terminados para poder descargarlos.
+JOB_TTL = 3600.0
+
+
+class BulkJob:
+    """Un lote de filas: estado, resultados por fila y avance. Lo actualizan los hilos de la cola."""
+
+    def __init__(self, rows: list[tuple]):
+        self.id = uuid.uuid4().hex[:12]
+        self.rows = list(rows)
+        self.results = {}      # índice de fila -> resultado
+        self.errors = {}       # índice de fila -> mensaje de error
+        self.created = time.time()
+        self.finished = None
+        self.cancelled = False
+        self.lock = threading.Lock()
+
+    @property
+    def done(self) -> int:
+        return len(self.results) + len(self.errors)
+
+    @property
+    def total(self) -> int:
+        return len(self.rows)
+
+    @property
+    def status(self) -> str:
+        if self.finished is not None:
+            return "cancelado" if self.cancelled else "terminado"
+        return "cancelando" if self.cancelled else ("en curso" if self.done else "en cola")
+
+    def eta(self) -> float | None:
+        """Segundos estimados hasta terminar, según el ritmo hasta ahora (None sin datos)."""
+        if not self.done or self.finished is not None:
+            return None
+        rate = self.done / (time.time() - self.created)
+        return (self.total - self.done) / rate if rate > 0 else None
+
+    def ordered(self) -> list[tuple]:
+        """[(fila, resultado o None, error o None)] en el orden del archivo."""
+        with self.lock:
+            return [(row, self.results.get(i), self.errors.get(i)) for i, row in enumerate(self.rows)]
+
+
+class BulkQueue:
+    """Cola de lotes de todo el proceso: sobrevive a los reruns de Streamlit y a la sesión que los lanzó.
+
+    `submit(rows, generate)` reparte las filas en un pool compartido de `max_workers` hilos;
+    `generate(row)` devuelve `(error, resultado)` como `run_jobcraft_ai` y no puede usar
+    `st.*` (corre fuera de la sesión). La sesión solo guarda el id del lote y consulta su avance.
+    """
+
+    def __init__(self, max_workers: int = MAX_WORKERS, ttl: float = JOB_TTL):
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="jobcraft-bulk")
+        self.ttl = ttl
+        self.jobs = {}
+        self.lock = threading.Lock()
+
+    def submit(self, rows: list[tuple], generate) -> BulkJob:
+        job = BulkJob(rows)
+        with self.lock:
+            self._evict()
+            self.jobs[job.id] = job
+        if not rows:
+            job.finished = time.time()
+        for index, row in enumerate(job.rows):
+            self.pool.submit(self._run_row, job, index, row, generate)
+        return job
+
+    def _run_row(self, job: BulkJob, index: int, row: tuple, generate):
+        if job.cancelled:
+            error, result = "Cancelado", None
+        else:
+            try:
+                error, result = generate(row)
+            except Exception as e:
+                error, result = str(e), None
+        with job.lock:
+            if error or result is None:
+                job.errors[index] = error or "Sin resultado"
+            else:
+                job.results[index] = result
+            if job.done == job.total:
+                job.finished = time.time()
+
+    def get(self, job_id: str) -> BulkJob | None:
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def cancel(self, job_id: str):
+        """Las filas aún no empezadas se marcan como canceladas; las que están en curso terminan."""
+        job = self.get(job_id)
+        if job is not None:
+            job.cancelled = True
+
+    def _evict(self):
+        now = time.time()
+        for job_id, job in list(self.jobs.items()):
+            if job.finished is not None and now - job.finished > self.ttl:
+                del self.jobs[job_id]
+
+    def stats(self) -> dict:
+        with self.lock:
+            active = [j for j in self.jobs.values() if j.finished is None]
+            return {"jobs": len(self.jobs), "active": len(active), "pending_rows": sum(j.total - j.done for j in active)}
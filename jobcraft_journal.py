@@ -0,0 +1,101 @@
+import os
+import time
+import sqlite3
+import threading
+
+from jobcraft_cache import DATA_DIR, normalize_text, fingerprint
+
+# ---------------------------------------------------------
+# DIARIO DE LOTES (checkpoint para reanudar con --resume)
+# ---------------------------------------------------------
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+
+def row_hash(title, level, critical_skill) -> str:
+    """Identificador estable de una fila: no depende de su posición ni de mayúsculas/tildes/espacios."""
+    return fingerprint(normalize_text(title), normalize_text(level), normalize_text(critical_skill))
+
+
+def journal_path(input_file: str) -> str:
+    """Un diario por archivo de entrada, dentro de la carpeta de estado de JobCraft."""
+    name = os.path.splitext(os.path.basename(input_file))[0]
+    return os.path.join(DATA_DIR, f"journal_{name}_{fingerprint(os.path.abspath(input_file))[:8]}.sqlite")
+
+
+class BatchJournal:
+    """Registro persistente del estado de cada fila de un lote.
+
+    Cada resultado se confirma en SQLite en cuanto llega, así que si el proceso muere
+    a mitad de lote basta con relanzarlo con `--resume`: las filas terminadas se leen
+    del diario y solo se regeneran las que faltan o fallaron.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS rows ("
+            " input_hash TEXT PRIMARY KEY, status TEXT NOT NULL, payload TEXT, error TEXT,"
+            " attempts INTEGER NOT NULL DEFAULT 0, updated REAL NOT NULL, published INTEGER NOT NULL DEFAULT 0)"
+        )
+        try:
+            # Diarios creados antes de anotar qué filas llegaron ya a la salida.
+            self.conn.execute("ALTER TABLE rows ADD COLUMN published INTEGER NOT NULL DEFAULT 0")
+        except sqlite3.OperationalError:
+            pass
+        self.conn.commit()
+
+    def reset(self):
+        """Empieza un lote desde cero (sin --resume)."""
+        with self.lock:
+            self.conn.execute("DELETE FROM rows")
+            self.conn.commit()
+
+    def completed(self, model_cls) -> dict:
+        """{input_hash: objeto validado} de todas las filas ya terminadas."""
+        with self.lock:
+            rows = self.conn.execute("SELECT input_hash, payload FROM rows WHERE status = ?", (STATUS_DONE,)).fetchall()
+        done = {}
+        for input_hash, payload in rows:
+            try:
+                done[input_hash] = model_cls.model_validate_json(payload)
+            except Exception:
+                pass  # Entrada ilegible: la fila se regenera.
+        return done
+
+    def published(self) -> set:
+        """Hashes de las filas terminadas que ya se escribieron en una salida publicada."""
+        with self.lock:
+            rows = self.conn.execute("SELECT input_hash FROM rows WHERE status = ? AND published = 1", (STATUS_DONE,)).fetchall()
+        return {input_hash for (input_hash,) in rows}
+
+    def mark_published(self, input_hashes):
+        with self.lock:
+            self.conn.executemany("UPDATE rows SET published = 1 WHERE input_hash = ? AND status = ?",
+                                  [(h, STATUS_DONE) for h in input_hashes])
+            self.conn.commit()
+
+    def record_done(self, input_hash: str, value):
+        self._record(input_hash, STATUS_DONE, value.model_dump_json(), None)
+
+    def record_failed(self, input_hash: str, error: str):
+        self._record(input_hash, STATUS_FAILED, None, error)
+
+    def _record(self, input_hash: str, status: str, payload, error):
+        with self.lock:
+            self.conn.execute(
+                "INSERT INTO rows (input_hash, status, payload, error, attempts, updated) VALUES (?, ?, ?, ?, 1, ?)"
+                " ON CONFLICT(input_hash) DO UPDATE SET status = excluded.status, payload = excluded.payload,"
+                " error = excluded.error, attempts = rows.attempts + 1, updated = excluded.updated, published = 0",
+                (input_hash, status, payload, error, time.time()),
+            )
+            self.conn.commit()
+
+    def counts(self) -> dict:
+        with self.lock:
+            return dict(self.conn.execute("SELECT status, COUNT(*) FROM rows GROUP BY status").fetchall())
@@ -0,0 +1,223 @@
+import time
+import queue
+import smtplib
+import mimetypes
+import threading
+from dataclasses import dataclass, field
+from email.message import EmailMessage
+
+from jobcraft_ratelimit import TokenBucket
+
+# ---------------------------------------------------------
+# ENVÍO DE CORREO: CONEXIÓN SMTP REUTILIZADA + COLA + RESÚMENES
+# ---------------------------------------------------------
+SMTP_HOST = "smtp.gmail.com"
+SMTP_PORT = 465                 # SMTP sobre SSL
+# Límites de envío de Gmail para cuentas personales (Workspace admite más). Ajustar al proveedor.
+SEND_PER_MINUTE = 20
+DAILY_LIMIT = 500               # destinatarios por día
+# Segundos sin mensajes tras los que se cierra la conexión (Gmail corta las inactivas).
+IDLE_TIMEOUT = 60.0
+# Reintentos ante errores temporales del servidor (4xx, desconexiones).
+MAX_RETRIES = 3
+# Un resumen se parte en varios mensajes si supera cualquiera de estos límites (Gmail admite 25 MB).
+DIGEST_MAX_ATTACHMENTS = 25
+DIGEST_MAX_BYTES = 20 * 1024 * 1024
+
+# Servidor de depuración local: `python -m aiosmtpd -n -l localhost:1025` imprime cada mensaje sin enviarlo.
+DEBUG_HOST = "localhost"
+DEBUG_PORT = 1025
+
+
+@dataclass
+class MailMessage:
+    to: list[str]
+    subject: str
+    body: str
+    attachments: list[tuple[str, bytes]] = field(default_factory=list)   # (nombre de archivo, contenido)
+
+
+def build_digest(to: list[str], title: str, items: list[tuple[str, str, list[tuple[str, bytes]]]],
+                 max_attachments: int = DIGEST_MAX_ATTACHMENTS, max_bytes: int = DIGEST_MAX_BYTES) -> list[MailMessage]:
+    """Agrupa muchos perfiles `(título, resumen, adjuntos)` en los menos mensajes posibles.
+
+    Cada mensaje lleva un índice con el resumen de sus perfiles y sus adjuntos; se abre
+    un mensaje nuevo al superar `max_attachments` adjuntos o `max_bytes`.
+    """
+    chunks, current, size = [], [], 0
+    for item in items:
+        item_size = sum(len(data) for _, data in item[2])
+        attachments = sum(len(i[2]) for i in current)
+        if current and (attachments + len(item[2]) > max_attachments or size + item_size > max_bytes):
+            chunks.append(current)
+            current, size = [], 0
+        current.append(item)
+        size += item_size
+    if current:
+        chunks.append(current)
+
+    messages = []
+    for n, chunk in enumerate(chunks, start=1):
+        part = f" ({n}/{len(chunks)})" if len(chunks) > 1 else ""
+        body = "\n\n".join(f"{i}. {item_title}\n{summary}" for i, (item_title, summary, _) in enumerate(chunk, start=1))
+        messages.append(MailMessage(
+            to=list(to),
+            subject=f"{title}{part}: {len(chunk)} puestos",
+            body=body,
+            attachments=[a for _, _, files in chunk for a in files],
+        ))
+    return messages
+
+
+class MailDispatcher:
+    """Envía correos desde una cola en un hilo aparte, con una sola conexión SMTP autenticada.
+
+    La conexión se abre (TLS + login) con el primer mensaje y se reutiliza para los
+    siguientes; se cierra tras `idle_timeout` segundos sin trabajo y se reabre sola si el
+    servidor la corta. Los envíos respetan `per_minute` mensajes por minuto y `daily_limit`
+    destinatarios por día; los errores temporales (4xx) se reintentan con espera creciente.
+    Con `MailDispatcher.debug()` se envía a un servidor SMTP local sin TLS ni login.
+    """
+
+    def __init__(self, sender: str, password: str | None = None, host: str = SMTP_HOST, port: int = SMTP_PORT,
+                 use_ssl: bool = True, starttls: bool = False, login: bool = True,
+                 per_minute: float = SEND_PER_MINUTE, daily_limit: int = DAILY_LIMIT,
+                 idle_timeout: float = IDLE_TIMEOUT, max_retries: int = MAX_RETRIES):
+        self.sender = sender
+        self.password = password
+        self.host = host
+        self.port = port
+        self.use_ssl = use_ssl
+        self.starttls = starttls
+        self.login = login
+        self.bucket = TokenBucket(per_minute, capacity=1)   # sin ráfagas: un mensaje cada 60/per_minute s
+        self.daily_limit = daily_limit
+        self.idle_timeout = idle_timeout
+        self.max_retries = max_retries
+        self.smtp = None
+        self.queue = queue.Queue()
+        self.day = time.strftime("%Y-%m-%d")
+        self.recipients_today = 0
+        self.sent = 0
+        self.failed = 0
+        self.logins = 0
+        self.last_error = None
+        self.thread = threading.Thread(target=self._run, name="jobcraft-mail", daemon=True)
+        self.thread.start()
+
+    @classmethod
+    def debug(cls, sender: str = "jobcraft@localhost", host: str = DEBUG_HOST, port: int = DEBUG_PORT, **kwargs):
+        """Despachador contra un servidor SMTP de depuración local (sin TLS ni autenticación)."""
+        return cls(sender, host=host, port=port, use_ssl=False, login=False, **kwargs)
+
+    # --- API pública ---
+    def enqueue(self, message: MailMessage):
+        """Encola el mensaje y vuelve al instante."""
+        self.queue.put(message)
+
+    def send(self, to, subject: str, body: str, attachments: list[tuple[str, bytes]] | None = None):
+        self.enqueue(MailMessage(to=[to] if isinstance(to, str) else list(to), subject=subject, body=body,
+                                 attachments=list(attachments or [])))
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Espera a que se hayan procesado todos los mensajes encolados (True si terminó a tiempo)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def close(self, timeout: float | None = None):
+        self.flush(timeout)
+        self.queue.put(None)
+        self.thread.join(timeout)
+
+    def stats(self) -> dict:
+        return {"pending": self.queue.unfinished_tasks, "sent": self.sent, "failed": self.failed,
+                "logins": self.logins, "recipients_today": self.recipients_today, "last_error": self.last_error}
+
+    # --- Conexión ---
+    def _connect(self):
+        if self.use_ssl:
+            smtp = smtplib.SMTP_SSL(self.host, self.port, timeout=30)
+        else:
+            smtp = smtplib.SMTP(self.host, self.port, timeout=30)
+            if self.starttls:
+                smtp.starttls()
+        if self.login:
+            smtp.login(self.sender, self.password)
+        self.logins += 1
+        self.smtp = smtp
+
+    def _disconnect(self):
+        if self.smtp is not None:
+            try:
+                self.smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self.smtp = None
+
+    # --- Envío ---
+    def _build(self, message: MailMessage) -> EmailMessage:
+        msg = EmailMessage()
+        msg["From"] = self.sender
+        msg["To"] = ", ".join(message.to)
+        msg["Subject"] = message.subject
+        msg.set_content(message.body)
+        for name, data in message.attachments:
+            kind = mimetypes.guess_type(name)[0] or "application/octet-stream"
+            maintype, subtype = kind.split("/", 1)
+            msg.add_attachment(data, maintype=maintype, subtype=subtype, filename=name)
+        return msg
+
+    def _check_daily_limit(self, recipients: int):
+        today = time.strftime("%Y-%m-%d")
+        if today != self.day:
+            self.day, self.recipients_today = today, 0
+        if self.recipients_today + recipients > self.daily_limit:
+            raise RuntimeError(f"Límite diario de {self.daily_limit} destinatarios alcanzado; el mensaje no se envía.")
+
+    def _deliver(self, message: MailMessage):
+        self._check_daily_limit(len(message.to))
+        msg = self._build(message)
+        for attempt in range(self.max_retries + 1):
+            wait = self.bucket.reserve(1)
+            if wait > 0:
+                time.sleep(wait)
+            try:
+                if self.smtp is None:
+                    self._connect()
+                self.smtp.send_message(msg)
+                self.recipients_today += len(message.to)
+                return
+            except smtplib.SMTPServerDisconnected:
+                self.smtp = None        # El servidor cortó la conexión: se reabre en el siguiente intento.
+            except smtplib.SMTPResponseException as e:
+                if not 400 <= e.smtp_code < 500:
+                    raise               # 5xx (credenciales, destinatario inválido...): no se reintenta.
+            except OSError:
+                self._disconnect()
+            if attempt == self.max_retries:
+                raise RuntimeError(f"No se pudo enviar tras {self.max_retries + 1} intentos.")
+            time.sleep(min(30.0, 2 ** attempt))
+
+    def _run(self):
+        while True:
+            try:
+                message = self.queue.get(timeout=self.idle_timeout)
+            except queue.Empty:
+                self._disconnect()      # Inactiva: se libera la conexión hasta el próximo mensaje.
+                continue
+            if message is None:
+                self.queue.task_done()
+                self._disconnect()
+                return
+            try:
+                self._deliver(message)
+                self.sent += 1
+            except Exception as e:
+                self.failed += 1
+                self.last_error = f"{', '.join(message.to)}: {e}"
+            finally:
+                self.queue.task_done()
@@ -0,0 +1,184 @@
+import math
+import re
+from collections import defaultdict
+from dataclasses import dataclass
+
+from jobcraft_cache import normalize_text, fingerprint
+
+# ---------------------------------------------------------
+# ÍNDICE LOCAL DE COINCIDENCIAS CON EL CATÁLOGO OFICIAL
+# ---------------------------------------------------------
+# Por debajo de esta similitud (coseno TF-IDF) el puesto se considera NUEVO sin consultar al modelo.
+MATCH_THRESHOLD = 0.35
+DEFAULT_TOP_K = 5
+
+STOPWORDS = {"de", "del", "la", "las", "el", "los", "y", "e", "en", "para", "con", "a", "al", "o", "u", "por"}
+
+# Nivel normalizado -> rango ordinal. Los niveles desconocidos no filtran.
+LEVEL_RANKS = {
+    "practicante": 0, "trainee": 0, "becario": 0,
+    "junior": 1, "jr": 1,
+    "semi senior": 2, "semisenior": 2, "ssr": 2, "intermedio": 2, "medio": 2,
+    "senior": 3, "sr": 3,
+    "lider": 4, "jefe": 4, "gerente": 4, "manager": 4, "director": 5,
+}
+
+
+def level_rank(level) -> int | None:
+    """Convierte 'Senior (5+ años)', 'Sr.' o 'Líder/Gerente' a un rango comparable."""
+    text = re.sub(r"[^a-z ]", " ", normalize_text(level)).replace("semi senior", "semisenior")
+    for word in text.split():
+        if word in LEVEL_RANKS:
+            return LEVEL_RANKS[word]
+    return None
+
+
+def tokenize(text) -> list[str]:
+    """Palabras significativas normalizadas (sin tildes, sin stopwords)."""
+    words = re.findall(r"[a-z0-9]+", normalize_text(text))
+    return [w for w in words if w not in STOPWORDS]
+
+
+def features(text) -> list[str]:
+    """Palabras + trigramas de caracteres, para tolerar variantes y erratas ('Analísta' ~ 'Analista')."""
+    feats = []
+    for word in tokenize(text):
+        feats.append(f"w:{word}")
+        padded = f"#{word}#"
+        feats.extend(f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2))
+    return feats
+
+
+class TfidfIndex:
+    """Índice TF-IDF disperso con listas invertidas; cada consulta solo recorre los documentos que comparten rasgos."""
+
+    def __init__(self, texts: list[str]):
+        doc_features = [features(t) for t in texts]
+        df = defaultdict(int)
+        for feats in doc_features:
+            for f in set(feats):
+                df[f] += 1
+        n = len(texts)
+        self.idf = {f: math.log((1 + n) / (1 + c)) + 1.0 for f, c in df.items()}
+        self.postings = defaultdict(list)
+        for doc_id, feats in enumerate(doc_features):
+            for f, w in self._vector(feats).items():
+                self.postings[f].append((doc_id, w))
+
+    def _vector(self, feats: list[str]) -> dict:
+        counts = defaultdict(int)
+        for f in feats:
+            counts[f] += 1
+        vec = {f: c * self.idf.get(f, 0.0) for f, c in counts.items()}
+        norm = math.sqrt(sum(w * w for w in vec.values())) or 1.0
+        return {f: w / norm for f, w in vec.items() if w}
+
+    def scores(self, text) -> dict:
+        """Similitud coseno de `text` contra cada documento con algún rasgo en común."""
+        result = defaultdict(float)
+        for f, qw in self._vector(features(text)).items():
+            for doc_id, dw in self.postings.get(f, ()):
+                result[doc_id] += qw * dw
+        return result
+
+
+@dataclass
+class CatalogMatch:
+    cargo: str
+    nivel: str
+    score: float
+
+
+class CatalogIndex:
+    """Catálogo de Perfiles_Base_JobCraft indexado una sola vez por carga de la hoja."""
+
+    def __init__(self, records: list[dict]):
+        self.entries = [(str(r.get("Cargo", "")).strip(), str(r.get("Nivel", "N/A") or "N/A").strip()) for r in records]
+        self.entries = [(c, n) for c, n in self.entries if c]
+        self.ranks = [level_rank(n) for _, n in self.entries]
+        self.index = TfidfIndex([c for c, _ in self.entries])
+        self.fingerprint = fingerprint(self.entries)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def search(self, title: str, level: str = "", top_k: int = DEFAULT_TOP_K, threshold: float = MATCH_THRESHOLD) -> list[CatalogMatch]:
+        """Devuelve hasta `top_k` puestos oficiales parecidos; lista vacía = puesto NUEVO."""
+        wanted = level_rank(level)
+        ranked = []
+        for doc_id, score in self.index.scores(title).items():
+            rank = self.ranks[doc_id]
+            if wanted is not None and rank is not None:
+                gap = abs(rank - wanted)
+                if gap > 1:
+                    continue
+                # Mismo nivel puntúa un poco más que el nivel contiguo.
+                score *= 1.0 if gap == 0 else 0.9
+            if score >= threshold:
+                ranked.append((score, doc_id))
+        ranked.sort(reverse=True)
+        return [CatalogMatch(*self.entries[doc_id], round(score, 3)) for score, doc_id in ranked[:top_k]]
+
+    def as_text(self) -> str:
+        """Catálogo completo en el formato antiguo (una línea 'Cargo (Nivel)' por puesto)."""
+        return "\n".join(f"{c} ({n})" for c, n in self.entries)
+
+
+def format_candidates(matches: list[CatalogMatch]) -> str:
+    """Lista compacta de candidatos para incrustar en el prompt."""
+    return "\n".join(f"- {m.cargo} ({m.nivel}) [similitud {m.score:.2f}]" for m in matches)
+
+
+# ---------------------------------------------------------
+# RECUPERACIÓN DE COMPETENCIAS DEL DICCIONARIO
+# ---------------------------------------------------------
+# Competencias que viajan al prompt; el modelo elige 4-5 de ellas.
+COMPETENCY_TOP_K = 8
+
+DEFINITION_COLUMN = "COREES_Definición_Core_N1_Inicial"
+
+
+@dataclass
+class Competency:
+    familia: str
+    definicion: str
+
+
+class CompetencyIndex:
+    """Diccionario_JobCraft precomputado una vez por carga: textos listos para el prompt + índice TF-IDF."""
+
+    def __init__(self, records: list[dict]):
+        self.items = [
+            Competency(str(r.get("Familia", "")).strip(), str(r.get(DEFINITION_COLUMN, "")).strip())
+            for r in records
+        ]
+        self.items = [c for c in self.items if c.familia]
+        self.lines = [f"- {c.familia}: {c.definicion}" for c in self.items]
+        self.families = ", ".join(c.familia for c in self.items)
+        self.index = TfidfIndex([f"{c.familia} {c.definicion}" for c in self.items])
+        self.fingerprint = fingerprint([(c.familia, c.definicion) for c in self.items])
+
+    def __len__(self):
+        return len(self.items)
+
+    def top_k(self, title: str, critical_skill: str = "", k: int = COMPETENCY_TOP_K) -> list[int]:
+        """Posiciones de las `k` competencias más afines al cargo y a la habilidad crítica.
+
+        La habilidad crítica pesa el doble que el título. Si hay pocas coincidencias se
+        completa con el orden del diccionario para que el modelo siempre tenga donde elegir.
+        """
+        scores = defaultdict(float)
+        for doc_id, score in self.index.scores(title).items():
+            scores[doc_id] += score
+        for doc_id, score in self.index.scores(critical_skill).items():
+            scores[doc_id] += 2 * score
+        ranked = sorted(scores, key=lambda i: (-scores[i], i))[:k]
+        for i in range(len(self.items)):
+            if len(ranked) >= k:
+                break
+            if i not in scores:
+                ranked.append(i)
+        return ranked
+
+    def as_prompt(self, title: str, critical_skill: str = "", k: int = COMPETENCY_TOP_K) -> str:
+        return "\n".join(self.lines[i] for i in self.top_k(title, critical_skill, k))
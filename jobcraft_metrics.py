@@ -0,0 +1,261 @@
+import os
+import json
+import time
+import atexit
+import threading
+import contextlib
+from collections import Counter, deque
+
+from jobcraft_cache import DATA_DIR
+
+# ---------------------------------------------------------
+# MÉTRICAS POR ETAPA (tiempos, reintentos, tokens, caché)
+# ---------------------------------------------------------
+METRICS_FILE = os.path.join(DATA_DIR, "metrics.jsonl")
+PROMETHEUS_FILE = os.path.join(DATA_DIR, "metrics.prom")
+# Eventos en memoria antes de escribirlos al JSONL (también se escriben al cerrar).
+FLUSH_EVENTS = 50
+# Duraciones recientes por etapa que se guardan para los percentiles del panel.
+RECENT_SAMPLES = 500
+
+# Precio de lista por millón de tokens (USD). Ajustar si cambia la tarifa del proyecto.
+PRICES = {
+    "gemini-2.5-flash": {"input": 0.30, "cached": 0.075, "output": 2.50},
+    "gemini-2.5-flash-lite": {"input": 0.10, "cached": 0.025, "output": 0.40},
+}
+
+
+def estimate_cost(model: str, prompt_tokens: int, output_tokens: int, cached_tokens: int = 0) -> float:
+    """Coste en USD de una llamada; 0 si el modelo no tiene precio configurado."""
+    price = PRICES.get(model)
+    if price is None:
+        return 0.0
+    fresh = max(0, prompt_tokens - cached_tokens)
+    return (fresh * price["input"] + cached_tokens * price["cached"] + output_tokens * price["output"]) / 1_000_000
+
+
+def usage_fields(response) -> dict:
+    """Tokens de `response.usage_metadata` (vacío si la respuesta no lo trae)."""
+    usage = getattr(response, "usage_metadata", None)
+    fields = {
+        "prompt_tokens": getattr(usage, "prompt_token_count", None),
+        "output_tokens": getattr(usage, "candidates_token_count", None),
+        "cached_tokens": getattr(usage, "cached_content_token_count", None),
+    }
+    return {k: v for k, v in fields.items() if isinstance(v, int)}
+
+
+def _percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+class Metrics:
+    """Registro de etapas de un punto de entrada (`source` = "web" o "runner").
+
+    Cada etapa medida con `stage` produce un evento (nombre, segundos, estado y los campos
+    que añada quien mide) que se guarda en un JSONL local y se agrega por etapa. `flush`
+    además reescribe un fichero de texto en formato Prometheus con los acumulados, apto
+    para el textfile collector de node_exporter.
+    """
+
+    def __init__(self, source: str, path: str = METRICS_FILE, prom_path: str = PROMETHEUS_FILE,
+                 flush_events: int = FLUSH_EVENTS):
+        self.source = source
+        self.path = path
+        self.prom_path = prom_path
+        self.flush_events = flush_events
+        self.started = time.time()
+        self.stages = {}               # etapa -> {"count", "errors", "seconds", "max", "recent"}
+        self.counters = Counter()      # aciertos de caché, reintentos, tokens...
+        self.cost = 0.0
+        self.events = deque(maxlen=RECENT_SAMPLES)   # últimos eventos, para el panel de depuración
+        self.pending = []
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()   # un solo hilo escribiendo ficheros a la vez
+        atexit.register(self.flush)
+
+    # --- Registro ---
+    @contextlib.contextmanager
+    def trace(self, trace_id: str):
+        """Etiqueta con `trace_id` los eventos que se registren en este hilo (p.ej. una generación)."""
+        previous = getattr(self.local, "trace", None)
+        self.local.trace = trace_id
+        try:
+            yield
+        finally:
+            self.local.trace = previous
+
+    @contextlib.contextmanager
+    def stage(self, name: str, **fields):
+        """Mide el bloque como etapa `name`; el diccionario que se entrega admite campos extra."""
+        status = "ok"
+        t0 = time.perf_counter()
+        try:
+            yield fields
+        except BaseException:
+            status = "error"
+            raise
+        finally:
+            self.record(name, time.perf_counter() - t0, status=status, **fields)
+
+    def record(self, name: str, seconds: float, status: str = "ok", **fields):
+        event = {"ts": round(time.time(), 3), "source": self.source, "stage": name,
+                 "ms": round(seconds * 1000, 2), "status": status, **fields}
+        trace = getattr(self.local, "trace", None)
+        if trace is not None:
+            event["trace"] = trace
+        with self.lock:
+            agg = self.stages.setdefault(name, {"count": 0, "errors": 0, "seconds": 0.0, "max": 0.0,
+                                                "recent": deque(maxlen=RECENT_SAMPLES)})
+            agg["count"] += 1
+            agg["errors"] += status != "ok"
+            agg["seconds"] += seconds
+            agg["max"] = max(agg["max"], seconds)
+            agg["recent"].append(seconds)
+            for key in ("prompt_tokens", "output_tokens", "cached_tokens", "retries"):
+                if isinstance(fields.get(key), int):
+                    self.counters[key] += fields[key]
+            self.events.append(event)
+            self.pending.append(event)
+            ready = len(self.pending) >= self.flush_events
+        if ready:
+            self.flush()
+
+    def count(self, name: str, n: int = 1):
+        with self.lock:
+            self.counters[name] += n
+
+    def measured_call(self, call, model: str, stage: str = "model_call", **labels):
+        """Envuelve `call(fn, **kwargs)` del planificador: tiempo total, reintentos, tokens y coste.
+
+        `labels` se añaden a cada evento (p.ej. la ruta del enrutador de modelos).
+
+        Cada invocación de `fn` es un intento, así que los reintentos se cuentan sin tocar el planificador.
+        """
+        def wrapped(fn, *args, **kwargs):
+            attempts = 0
+
+            def attempt(*a, **kw):
+                nonlocal attempts
+                attempts += 1
+                return fn(*a, **kw)
+
+            with self.stage(stage, model=model, **labels) as fields:
+                try:
+                    response = call(attempt, *args, **kwargs)
+                finally:
+                    fields["retries"] = max(0, attempts - 1)
+                self._account(fields, model, response)
+            return response
+        return wrapped
+
+    def measured_stream(self, call, model: str, stage: str = "model_call", **labels):
+        """Como `measured_call`, para llamadas que devuelven un stream de trozos (p.ej. `open_stream`).
+
+        Devuelve un generador: la etapa dura hasta el último trozo y el consumo se toma del
+        trozo que lo traiga (el último, en Gemini).
+        """
+        def wrapped(fn, *args, **kwargs):
+            attempts = 0
+
+            def attempt(*a, **kw):
+                nonlocal attempts
+                attempts += 1
+                return fn(*a, **kw)
+
+            with self.stage(stage, model=model, **labels) as fields:
+                try:
+                    chunks = call(attempt, *args, **kwargs)
+                finally:
+                    fields["retries"] = max(0, attempts - 1)
+                last = None
+                for chunk in chunks:
+                    if getattr(chunk, "usage_metadata", None) is not None:
+                        last = chunk
+                    yield chunk
+                self._account(fields, model, last)
+        return wrapped
+
+    def _account(self, fields: dict, model: str, response):
+        # Tokens y coste de la respuesta, en los campos del evento y en el acumulado.
+        usage = usage_fields(response)
+        fields.update(usage)
+        if usage:
+            cost = estimate_cost(model, usage.get("prompt_tokens", 0), usage.get("output_tokens", 0), usage.get("cached_tokens", 0))
+            fields["cost_usd"] = round(cost, 6)
+            with self.lock:
+                self.cost += cost
+
+    # --- Consulta ---
+    def summary(self) -> dict:
+        with self.lock:
+            stages = {
+                name: {
+                    "count": agg["count"],
+                    "errors": agg["errors"],
+                    "avg_ms": round(agg["seconds"] / agg["count"] * 1000, 2),
+                    "p95_ms": round(_percentile(agg["recent"], 95) * 1000, 3),
+                    "max_ms": round(agg["max"] * 1000, 2),
+                    "total_s": round(agg["seconds"], 6),
+                }
+                for name, agg in self.stages.items()
+            }
+            return {"stages": stages, "counters": dict(self.counters), "cost_usd": round(self.cost, 6),
+                    "uptime_s": round(time.time() - self.started, 1)}
+
+    def recent(self, trace_id: str | None = None, limit: int = 50) -> list[dict]:
+        """Últimos eventos (de una traza concreta si se indica), del más antiguo al más reciente."""
+        with self.lock:
+            events = [e for e in self.events if trace_id is None or e.get("trace") == trace_id]
+        return events[-limit:]
+
+    # --- Persistencia ---
+    def prometheus(self) -> str:
+        summary = self.summary()
+        src = f'source="{self.source}"'
+        lines = [
+            "# HELP jobcraft_stage_seconds Tiempo de pared por etapa.",
+            "# TYPE jobcraft_stage_seconds summary",
+        ]
+        for name, s in summary["stages"].items():
+            labels = f'{src},stage="{name}"'
+            lines.append(f'jobcraft_stage_seconds{{{labels},quantile="0.95"}} {s["p95_ms"] / 1000:.6f}')
+            lines.append(f"jobcraft_stage_seconds_sum{{{labels}}} {s['total_s']:.6f}")
+            lines.append(f"jobcraft_stage_seconds_count{{{labels}}} {s['count']}")
+        lines += ["# HELP jobcraft_stage_errors_total Etapas terminadas con excepción.", "# TYPE jobcraft_stage_errors_total counter"]
+        for name, s in summary["stages"].items():
+            lines.append(f'jobcraft_stage_errors_total{{{src},stage="{name}"}} {s["errors"]}')
+        lines += ["# HELP jobcraft_events_total Contadores (tokens, reintentos, aciertos de caché).", "# TYPE jobcraft_events_total counter"]
+        for name, value in sorted(summary["counters"].items()):
+            lines.append(f'jobcraft_events_total{{{src},name="{name}"}} {value}')
+        lines += ["# HELP jobcraft_cost_usd_total Coste estimado de las llamadas al modelo.", "# TYPE jobcraft_cost_usd_total counter",
+                  f"jobcraft_cost_usd_total{{{src}}} {summary['cost_usd']:.6f}"]
+        return "\n".join(lines) + "\n"
+
+    def flush(self, prometheus: bool = True):
+        """Añade los eventos pendientes al JSONL y, si se pide, reescribe el fichero Prometheus."""
+        with self.flush_lock:
+            with self.lock:
+                events, self.pending = self.pending, []
+            self._write(events, prometheus)
+
+    def _write(self, events: list, prometheus: bool):
+        try:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            if events:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.writelines(json.dumps(e, ensure_ascii=False) + "\n" for e in events)
+            if prometheus and self.prom_path:
+                # Un fichero por origen: web y lote no se pisan los acumulados.
+                root, ext = os.path.splitext(self.prom_path)
+                target = f"{root}_{self.source}{ext}"
+                with open(target + ".tmp", "w", encoding="utf-8") as f:
+                    f.write(self.prometheus())
+                os.replace(target + ".tmp", target)
+        except OSError:
+            pass  # Las métricas nunca deben tumbar una generación.
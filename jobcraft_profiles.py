@@ -0,0 +1,206 @@
+import os
+import math
+import functools
+import time
+import sqlite3
+import threading
+from collections import Counter
+from dataclasses import dataclass
+
+from jobcraft_cache import DATA_DIR, fingerprint, normalize_text
+from jobcraft_matching import features, level_rank, tokenize
+
+# ---------------------------------------------------------
+# HISTORIAL DE PERFILES GENERADOS (SQLite + búsqueda de texto completo)
+# ---------------------------------------------------------
+PROFILES_FILE = os.path.join(DATA_DIR, "profiles.sqlite")
+# Perfiles que devuelve la búsqueda de texto antes de puntuarlos por similitud con la petición.
+CANDIDATES = 20
+# El título pesa más que la habilidad crítica al comparar una petición con un perfil guardado.
+TITLE_WEIGHT = 0.75
+# Un perfil de otro nivel puede adaptarse, pero nunca reutilizarse tal cual.
+LEVEL_PENALTY = 0.8
+
+# Columnas de texto completo: las de la petición primero (son las que usa `closest`).
+FTS_COLUMNS = ("title", "critical_skill", "titulo_puesto", "titulo_oficial_match", "contenido")
+
+
+@functools.lru_cache(maxsize=4096)
+def _vector(text: str) -> tuple[Counter, float]:
+    # Los títulos y habilidades del historial se repiten mucho entre consultas: se memorizan sus rasgos.
+    counts = Counter(features(text))
+    return counts, math.sqrt(sum(c * c for c in counts.values()))
+
+
+def similarity(a: str, b: str) -> float:
+    """Coseno entre los rasgos (palabras + trigramas) de dos textos; 1.0 si ambos están vacíos."""
+    (fa, na), (fb, nb) = _vector(a), _vector(b)
+    if not fa and not fb:
+        return 1.0
+    if not fa or not fb:
+        return 0.0
+    if len(fa) > len(fb):
+        fa, fb = fb, fa
+    return sum(c * fb[f] for f, c in fa.items() if f in fb) / (na * nb)
+
+
+def _match_expression(text: str, any_word: bool = False, columns: tuple = ()) -> str | None:
+    # Palabras normalizadas entre comillas (sin operadores de FTS5 que inyectar) y como prefijo.
+    words = list(dict.fromkeys(tokenize(text)))
+    if not words:
+        return None
+    expression = (" OR " if any_word else " AND ").join(f'"{w}"*' for w in words)
+    if columns:
+        expression = f"{{{' '.join(columns)}}} : ({expression})"
+    return expression
+
+
+@dataclass
+class StoredProfile:
+    id: int
+    title: str                 # lo que pidió el usuario
+    level: str
+    critical_skill: str
+    titulo_puesto: str
+    origen_titulo: str
+    titulo_oficial_match: str
+    route: str
+    context: str               # huella de prompt + diccionario + catálogo con que se generó
+    created: float
+    reused: int
+    score: float | None = None  # similitud con la petición (solo en `closest`)
+
+
+class ProfileStore:
+    """Historial local de perfiles ya validados, con índice de texto completo (FTS5).
+
+    Guarda un perfil por petición normalizada (título, nivel, habilidad): una nueva
+    generación de la misma petición sustituye a la anterior. Sirve para listar y filtrar
+    lo generado (`search`) y para encontrar el perfil más parecido a una petición nueva
+    (`closest`) antes de llamar al modelo. Es segura entre hilos.
+    """
+
+    def __init__(self, schema, path: str = PROFILES_FILE):
+        self.schema = schema
+        self.path = path
+        self.lock = threading.Lock()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS profiles ("
+            " id INTEGER PRIMARY KEY, key TEXT UNIQUE NOT NULL,"
+            " title TEXT NOT NULL, level TEXT NOT NULL, level_rank INTEGER, critical_skill TEXT NOT NULL,"
+            " titulo_puesto TEXT NOT NULL, origen_titulo TEXT NOT NULL, titulo_oficial_match TEXT NOT NULL,"
+            " route TEXT NOT NULL, context TEXT NOT NULL, payload TEXT NOT NULL,"
+            " created REAL NOT NULL, reused INTEGER NOT NULL DEFAULT 0)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS profiles_created ON profiles (created)")
+        self.conn.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS profiles_fts USING fts5({', '.join(FTS_COLUMNS)},"
+            " tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        self.conn.commit()
+
+    @staticmethod
+    def _content(profile) -> str:
+        # Todo el texto del perfil que no está en columnas propias, para la búsqueda libre.
+        parts = [profile.mision_puesto, profile.observacion_ia]
+        for name in ("responsabilidades_clave", "competencias_conductuales_seleccionadas", "competencias_tecnicas",
+                     "requisitos_formacion", "kpis_sugeridos"):
+            parts.extend(getattr(profile, name))
+        return "\n".join(str(p) for p in parts)
+
+    def add(self, title: str, level: str, critical_skill: str, profile, route: str = "full", context: str = "") -> int:
+        """Guarda (o sustituye) el perfil generado para esta petición y devuelve su id."""
+        key = fingerprint(normalize_text(title), normalize_text(level), normalize_text(critical_skill))
+        row = (title, level, level_rank(level), critical_skill, profile.titulo_puesto, profile.origen_titulo,
+               profile.titulo_oficial_match, route, context, profile.model_dump_json(), time.time())
+        with self.lock:
+            (profile_id,) = self.conn.execute(
+                "INSERT INTO profiles (key, title, level, level_rank, critical_skill, titulo_puesto, origen_titulo,"
+                " titulo_oficial_match, route, context, payload, created) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (key) DO UPDATE SET title = excluded.title, level = excluded.level,"
+                " level_rank = excluded.level_rank, critical_skill = excluded.critical_skill,"
+                " titulo_puesto = excluded.titulo_puesto, origen_titulo = excluded.origen_titulo,"
+                " titulo_oficial_match = excluded.titulo_oficial_match, route = excluded.route,"
+                " context = excluded.context, payload = excluded.payload, created = excluded.created"
+                " RETURNING id",
+                (key, *row),
+            ).fetchone()
+            self.conn.execute("DELETE FROM profiles_fts WHERE rowid = ?", (profile_id,))
+            self.conn.execute(
+                f"INSERT INTO profiles_fts (rowid, {', '.join(FTS_COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?)",
+                (profile_id, title, critical_skill, profile.titulo_puesto, profile.titulo_oficial_match, self._content(profile)),
+            )
+            self.conn.commit()
+        return profile_id
+
+    def get(self, profile_id: int):
+        """El perfil completo (`schema` validado) o None si no existe."""
+        with self.lock:
+            row = self.conn.execute("SELECT payload FROM profiles WHERE id = ?", (profile_id,)).fetchone()
+        return None if row is None else self.schema.model_validate_json(row[0])
+
+    def mark_reused(self, profile_id: int):
+        with self.lock:
+            self.conn.execute("UPDATE profiles SET reused = reused + 1 WHERE id = ?", (profile_id,))
+            self.conn.commit()
+
+    def _rows(self, where: list[str], params: list, order: str, limit: int, offset: int = 0, match: str | None = None) -> list[StoredProfile]:
+        columns = ", ".join(f"p.{c}" for c in ("id", "title", "level", "critical_skill", "titulo_puesto", "origen_titulo",
+                                                 "titulo_oficial_match", "route", "context", "created", "reused"))
+        sql = f"SELECT {columns} FROM profiles p"
+        if match is not None:
+            sql += " JOIN profiles_fts ON profiles_fts.rowid = p.id"
+            where, params = ["profiles_fts MATCH ?", *where], [match, *params]
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += f" ORDER BY {order} LIMIT ? OFFSET ?"
+        with self.lock:
+            rows = self.conn.execute(sql, (*params, limit, offset)).fetchall()
+        return [StoredProfile(*row) for row in rows]
+
+    def search(self, query: str = "", level: str = "", origen: str = "", limit: int = 100, offset: int = 0) -> list[StoredProfile]:
+        """Perfiles que contienen todas las palabras de `query` (por prefijo, en cualquier campo), filtrados.
+
+        Sin `query` se listan del más reciente al más antiguo; con ella, por relevancia (bm25).
+        """
+        where, params = [], []
+        if level:
+            where.append("p.level_rank IS ?")
+            params.append(level_rank(level))
+        if origen:
+            where.append("p.origen_titulo = ?")
+            params.append(origen)
+        match = _match_expression(query)
+        order = "profiles_fts.rank" if match else "p.created DESC"
+        return self._rows(where, params, order, limit, offset, match)
+
+    def closest(self, title: str, level: str, critical_skill: str = "", limit: int = 3) -> list[StoredProfile]:
+        """Perfiles guardados más parecidos a la petición, con `score` en [0, 1] (de mayor a menor).
+
+        El índice de texto preselecciona `CANDIDATES` perfiles que comparten alguna palabra
+        del título o la habilidad; luego se puntúan con trigramas (tolera erratas y variantes)
+        y se penalizan los de otro nivel.
+        """
+        match = _match_expression(f"{title} {critical_skill}", any_word=True, columns=FTS_COLUMNS[:3])
+        if match is None:
+            return []
+        wanted = level_rank(level)
+        scored = []
+        for p in self._rows([], [], "profiles_fts.rank", CANDIDATES, match=match):
+            title_score = max(similarity(title, p.title), similarity(title, p.titulo_puesto))
+            p.score = TITLE_WEIGHT * title_score + (1 - TITLE_WEIGHT) * similarity(critical_skill, p.critical_skill)
+            if level_rank(p.level) != wanted or (wanted is None and normalize_text(p.level) != normalize_text(level)):
+                p.score *= LEVEL_PENALTY
+            p.score = round(p.score, 3)
+            scored.append(p)
+        scored.sort(key=lambda p: (-p.score, -p.created))
+        return scored[:limit]
+
+    def count(self) -> int:
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM profiles").fetchone()[0]
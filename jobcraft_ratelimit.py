@@ -0,0 +1,220 @@
+import re
+import time
+import random
+import threading
+
+# ---------------------------------------------------------
+# PLANIFICADOR DE LLAMADAS A GEMINI (cuota + reintentos)
+# ---------------------------------------------------------
+# Cuotas por defecto de gemini-2.5-flash (Tier 1). Ajustar a la cuota real del proyecto.
+DEFAULT_RPM = 1000
+DEFAULT_TPM = 1_000_000
+
+# Tokens de salida que esperamos por perfil cuando aún no conocemos el consumo real.
+DEFAULT_OUTPUT_TOKENS = 1500
+
+RETRYABLE_CODES = {429, 500, 502, 503, 504}
+RETRYABLE_MARKERS = ("overloaded", "resource_exhausted", "unavailable", "rate limit", "quota")
+# Solo para errores sin código HTTP: el código como palabra suelta ("5000 tokens" no es un 500).
+_RETRYABLE_CODE_RE = re.compile(r"\b(" + "|".join(str(c) for c in sorted(RETRYABLE_CODES)) + r")\b")
+
+
+class CircuitOpenError(Exception):
+    """Se lanza cuando el circuito está abierto por sobrecarga sostenida del servicio."""
+
+
+class TokenBucket:
+    """Cubo de fichas que se rellena de forma continua a `rate_per_minute` fichas por minuto."""
+
+    def __init__(self, rate_per_minute: float, capacity: float | None = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float) -> float:
+        """Descuenta `amount` fichas y devuelve cuántos segundos hay que esperar para cubrir la deuda."""
+        with self.lock:
+            self._refill()
+            # Una petición mayor que el cubo entero nunca cabría: se limita a la capacidad.
+            self.tokens -= min(amount, self.capacity)
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def adjust(self, delta: float):
+        """Corrige el saldo cuando el consumo real difiere de lo estimado (delta > 0 devuelve fichas)."""
+        with self.lock:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens + delta)
+
+
+class CircuitBreaker:
+    """Abre el circuito tras `failure_threshold` fallos por sobrecarga seguidos.
+
+    Mientras está abierto las llamadas fallan al instante; pasado `reset_timeout`
+    se deja pasar una llamada de prueba (semiabierto) que decide si se cierra de nuevo.
+    """
+
+    def __init__(self, failure_threshold: int = 8, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self.lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def before_call(self):
+        with self.lock:
+            state = self.state
+            if state == "open" or (state == "half-open" and self.probing):
+                raise CircuitOpenError("El servicio de IA está sobrecargado; circuito abierto temporalmente.")
+            if state == "half-open":
+                self.probing = True
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.probing or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self.probing = False
+
+    def release_probe(self):
+        """Libera la llamada de prueba sin veredicto (p.ej. interrumpida) para que otra pueda intentarlo."""
+        with self.lock:
+            self.probing = False
+
+
+def is_retryable(error: Exception) -> bool:
+    """Indica si el error es transitorio (cuota, sobrecarga o fallo del servidor).
+
+    Manda el código HTTP del error (`APIError.code` de google-genai y gspread, `status_code`);
+    el texto del mensaje solo se mira cuando el error no trae código.
+    """
+    for attr in ("code", "status_code"):
+        code = getattr(error, attr, None)
+        if isinstance(code, int) and code > 0:   # gspread usa -1 cuando no pudo leer la respuesta
+            return code in RETRYABLE_CODES
+    text = str(error).lower()
+    return bool(_RETRYABLE_CODE_RE.search(text)) or any(m in text for m in RETRYABLE_MARKERS)
+
+
+def retry_after_seconds(error: Exception) -> float | None:
+    """Extrae la espera sugerida por el servidor (cabecera Retry-After o RetryInfo.retryDelay)."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if headers:
+        value = headers.get("retry-after") or headers.get("Retry-After")
+        if value:
+            try:
+                return max(0.0, float(value))
+            except ValueError:
+                pass
+
+    match = re.search(r"retryDelay['\"]?\s*[:=]\s*['\"]?(\d+(?:\.\d+)?)s", str(error))
+    if match:
+        return float(match.group(1))
+    return None
+
+
+def estimate_tokens(prompt: str, expected_output: int = DEFAULT_OUTPUT_TOKENS) -> int:
+    """Estimación rápida (≈4 caracteres por token) del consumo total de una llamada."""
+    return len(prompt) // 4 + expected_output
+
+
+class RateLimitScheduler:
+    """Reparte la cuota de Gemini (RPM y TPM) entre todos los hilos y reintenta con backoff.
+
+    Todas las llamadas al modelo de ambos puntos de entrada deben pasar por `call`,
+    para que un 429 en un hilo frene también al resto en lugar de provocar una tormenta.
+    """
+
+    def __init__(
+        self,
+        rpm: float = DEFAULT_RPM,
+        tpm: float = DEFAULT_TPM,
+        max_retries: int = 5,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        breaker: CircuitBreaker | None = None,
+    ):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker = breaker or CircuitBreaker()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _pause(self, seconds: float):
+        """Detiene a todos los hilos durante `seconds` (respeta el Retry-After del servidor)."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def _wait_for_budget(self, estimated_tokens: int):
+        pause = self._paused_until - time.monotonic()
+        if pause > 0:
+            time.sleep(pause)
+        wait = max(self.requests.reserve(1), self.tokens.reserve(estimated_tokens))
+        if wait > 0:
+            time.sleep(wait)
+
+    def backoff(self, attempt: int) -> float:
+        """Backoff exponencial con jitter completo."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def call(self, fn, *args, estimated_tokens: int = DEFAULT_OUTPUT_TOKENS, **kwargs):
+        """Ejecuta `fn(*args, **kwargs)` respetando la cuota y reintentando errores transitorios."""
+        for attempt in range(self.max_retries + 1):
+            self.breaker.before_call()
+            self._wait_for_budget(estimated_tokens)
+            try:
+                response = fn(*args, **kwargs)
+            except Exception as e:
+                if not is_retryable(e):
+                    # El servicio respondió (p.ej. un 400): no es sobrecarga y la prueba semiabierta queda resuelta.
+                    self.breaker.record_success()
+                    raise
+                self.breaker.record_failure()
+                if attempt == self.max_retries:
+                    raise
+                hint = retry_after_seconds(e)
+                if hint is None:
+                    time.sleep(self.backoff(attempt))
+                    continue
+                if hint > self.max_delay:
+                    # El servidor pide esperar más de lo que aguanta una petición (p.ej. cuota diaria
+                    # agotada): no se bloquea el hilo ni se frena al resto, se devuelve el error ya.
+                    raise
+                self._pause(hint)
+                time.sleep(hint)
+                continue
+            except BaseException:
+                self.breaker.release_probe()   # KeyboardInterrupt, SystemExit...: sin veredicto
+                raise
+
+            self.breaker.record_success()
+            usage = getattr(response, "usage_metadata", None)
+            used = getattr(usage, "total_token_count", None)
+            if isinstance(used, int):
+                self.tokens.adjust(estimated_tokens - used)
+            return response
@@ -0,0 +1,176 @@
+import re
+import json
+import typing
+import threading
+from collections import Counter
+
+from pydantic import BaseModel, Field, ValidationError, create_model
+
+from jobcraft_cache import normalize_text
+from jobcraft_ratelimit import estimate_tokens
+from jobcraft_streaming import PartialJsonParser
+
+# ---------------------------------------------------------
+# REPARACIÓN LOCAL DE SALIDAS JSON DEL MODELO
+# ---------------------------------------------------------
+# Separadores con los que el modelo a veces entrega una lista como texto.
+_LIST_SPLIT = re.compile(r"\s*(?:\n+|;|•|\s\|\s)\s*")
+_BULLET = re.compile(r"^(?:[-*·]\s+|\d+[.)]\s+)")
+_FENCE = re.compile(r"```(?:json)?", re.IGNORECASE)
+
+# Tokens de salida esperados en una repregunta: solo unos pocos campos.
+REASK_OUTPUT_TOKENS = 400
+
+stats = Counter()      # valid / repaired / reasked / failed
+_stats_lock = threading.Lock()
+
+
+def _count(kind: str):
+    with _stats_lock:
+        stats[kind] += 1
+
+
+def extract_json(text: str) -> dict:
+    """Primer objeto JSON del texto, ignorando ```json, texto antes o después y cortes al final.
+
+    Si el objeto está truncado se devuelven los campos que llegaron completos
+    (y, de una lista a medias, los elementos ya cerrados).
+    """
+    text = _FENCE.sub("", text or "")
+    start = text.find("{")
+    if start < 0:
+        return {}
+    try:
+        value, _ = json.JSONDecoder().raw_decode(text, start)
+        return value if isinstance(value, dict) else {}
+    except ValueError:
+        return PartialJsonParser().feed(text[start:])
+
+
+def _is_list_of_str(annotation) -> bool:
+    return typing.get_origin(annotation) is list and typing.get_args(annotation) in ((str,), ())
+
+
+def split_list(value: str) -> list[str]:
+    """'a; b; c', líneas o viñetas -> ['a', 'b', 'c']. Las comas solo separan si no hay otro separador."""
+    parts = _LIST_SPLIT.split(value.strip())
+    if len(parts) == 1 and value.count(",") >= 2:
+        parts = value.split(",")
+    return [_BULLET.sub("", p).strip() for p in parts if _BULLET.sub("", p).strip()]
+
+
+def coerce_fields(data: dict, schema: type[BaseModel]) -> dict:
+    """Ajusta nombres y tipos de `data` a `schema` sin inventar contenido; descarta claves desconocidas."""
+    by_name = {normalize_text(name).replace(" ", "_"): name for name in schema.model_fields}
+    result = {}
+    for key, value in data.items():
+        name = by_name.get(normalize_text(key).replace(" ", "_").replace("-", "_"))
+        if name is None or value is None:
+            continue
+        annotation = schema.model_fields[name].annotation
+        if _is_list_of_str(annotation):
+            if isinstance(value, str):
+                value = split_list(value)
+            elif isinstance(value, list):
+                value = [v if isinstance(v, str) else json.dumps(v, ensure_ascii=False) for v in value if v not in (None, "")]
+            else:
+                continue
+            if not value:
+                continue
+        elif annotation is str:
+            if isinstance(value, list):
+                value = "\n".join(str(v) for v in value)
+            elif isinstance(value, (int, float, bool)):
+                value = str(value)
+            elif not isinstance(value, str):
+                continue
+            value = value.strip()
+            if not value:
+                continue
+        elif annotation is int:
+            try:
+                value = int(str(value).strip())
+            except ValueError:
+                continue
+        result[name] = value
+    return result
+
+
+def missing_fields(data: dict, schema: type[BaseModel]) -> list[str]:
+    return [name for name in schema.model_fields if name not in data]
+
+
+def fields_model(schema: type[BaseModel], names: list[str]) -> type[BaseModel]:
+    """Sub-esquema con solo los campos `names` (mismas descripciones) para la repregunta."""
+    fields = {
+        name: (schema.model_fields[name].annotation, Field(description=schema.model_fields[name].description or ""))
+        for name in names
+    }
+    return create_model(f"{schema.__name__}Campos", **fields)
+
+
+def build_reask_prompt(names: list[str], partial: dict, request: str) -> str:
+    """Prompt corto: el perfil ya generado como contexto y solo los campos que faltan."""
+    return f"""
+    Tu respuesta anterior llegó incompleta. Devuelve SOLO estos campos, coherentes con el perfil ya generado:
+    {', '.join(names)}
+
+    --- PETICIÓN ORIGINAL ---
+    {request.strip()}
+
+    --- PERFIL YA GENERADO ---
+    {json.dumps(partial, ensure_ascii=False)}
+    """
+
+
+def reask_missing(client, model: str, call, schema: type[BaseModel], names: list[str], partial: dict, request: str) -> dict:
+    """Pide al modelo únicamente los campos `names`. `call(fn, **kwargs)` interpone el planificador de cuota."""
+    from google.genai import types
+
+    prompt = build_reask_prompt(names, partial, request)
+    response = call(
+        client.models.generate_content,
+        model=model,
+        contents=prompt,
+        config=types.GenerateContentConfig(response_mime_type="application/json", response_schema=fields_model(schema, names)),
+        estimated_tokens=estimate_tokens(prompt, expected_output=REASK_OUTPUT_TOKENS),
+    )
+    return coerce_fields(extract_json(response.text), schema)
+
+
+def parse_model_output(text: str, schema: type[BaseModel], defaults: dict | None = None, reask=None):
+    """Valida la salida del modelo reparándola en local antes de volver a llamar.
+
+    1. Si el JSON es válido tal cual, se devuelve sin más.
+    2. Si no, se extrae el objeto, se ajustan tipos (texto con viñetas -> lista, lista -> texto)
+       y se rellenan con `defaults` los campos seguros (p.ej. título y nivel pedidos).
+    3. Si aún faltan campos y hay `reask(campos, parcial) -> dict`, se piden solo esos.
+    Lanza `ValidationError` si ni así se obtiene un objeto válido.
+    """
+    try:
+        result = schema.model_validate_json(text)
+        _count("valid")
+        return result
+    except (ValidationError, ValueError):
+        pass
+
+    data = coerce_fields(extract_json(text), schema)
+    for name, value in (defaults or {}).items():
+        data.setdefault(name, value)
+
+    missing = missing_fields(data, schema)
+    if missing and reask is not None:
+        try:
+            data.update({k: v for k, v in reask(missing, data).items() if k in missing})
+            _count("reasked")
+        except Exception:
+            pass  # La validación de abajo informa de lo que siga faltando.
+
+    try:
+        result = schema.model_validate(data)
+    except ValidationError:
+        _count("failed")
+        raise
+    if not missing:
+        _count("repaired")
+    return result
@@ -0,0 +1,155 @@
+import os
+import json
+import threading
+from collections import Counter, deque
+from dataclasses import dataclass, replace
+
+# ---------------------------------------------------------
+# ENRUTADO POR NIVELES: HISTORIAL, RUTA RÁPIDA PARA PUESTOS DEL CATÁLOGO Y RUTA COMPLETA
+# ---------------------------------------------------------
+# Similitud con un perfil del historial (ver `ProfileStore.closest`) para devolverlo tal cual
+# (solo si se generó con el mismo prompt y las mismas hojas) o para adaptarlo con el modelo ligero.
+# Adaptar exige más de 0.6, lo que puntúa un título idéntico de otro nivel sin nada en común en la habilidad
+# (TITLE_WEIGHT × LEVEL_PENALTY): un Senior de SQL no sale de un Junior de Excel.
+REUSE_SCORE = 0.95
+ADAPT_SCORE = 0.65
+# Similitud mínima con el mejor candidato del catálogo para adaptar el puesto oficial por la ruta rápida.
+FAST_MATCH_SCORE = 0.8
+# Entradas más largas (título + habilidad) suelen ser peticiones a medida: van por la ruta completa.
+MAX_FAST_INPUT_CHARS = 120
+# Si en las últimas `FAILURE_WINDOW` llamadas de una ruta ligera falla la validación más de esta fracción,
+# la ruta se suspende hasta que vuelva a bajar (mínimo `MIN_SAMPLES` llamadas para decidir).
+MAX_LIGHT_FAILURE_RATE = 0.2
+FAILURE_WINDOW = 50
+MIN_SAMPLES = 10
+# Con una ruta ligera suspendida, una de cada `PROBE_EVERY` peticiones aptas la prueba igualmente para ver si se recuperó.
+PROBE_EVERY = 10
+
+
+@dataclass
+class RouteConfig:
+    model: str
+    template: str                     # "adapt" (perfil del historial), "short" (puesto oficial) o "full" (prompt completo)
+    max_output_tokens: int | None = None
+
+
+DEFAULT_ROUTES = {
+    "adapt": RouteConfig("gemini-2.5-flash-lite", "adapt", 4096),
+    "fast": RouteConfig("gemini-2.5-flash-lite", "short", 4096),
+    "full": RouteConfig("gemini-2.5-flash", "full"),
+}
+
+
+def load_routes(env=os.environ) -> dict[str, RouteConfig]:
+    """Rutas por defecto con lo que indique `JOBCRAFT_ROUTES` (JSON), p.ej. '{"fast": {"model": "gemini-2.0-flash"}}'."""
+    routes = dict(DEFAULT_ROUTES)
+    overrides = json.loads(env.get("JOBCRAFT_ROUTES") or "{}")
+    for name, fields in overrides.items():
+        routes[name] = replace(routes[name], **fields) if name in routes else RouteConfig(**fields)
+    return routes
+
+
+@dataclass
+class RouteDecision:
+    route: str
+    config: RouteConfig | None
+    reason: str
+
+
+class ModelRouter:
+    """Decide, antes de llamar al modelo, qué ruta sigue cada petición y lleva sus estadísticas.
+
+    - "cache": el resultado ya estaba guardado y no se llama al modelo (solo se anota con `record`).
+    - "reuse": el historial tiene un perfil casi idéntico (>= `reuse_score`) generado con el mismo
+      contexto (`context`: prompt, modelo completo y hojas); se devuelve sin llamar al modelo.
+    - "adapt": el historial tiene un perfil parecido (>= `adapt_score`); el modelo ligero lo adapta.
+    - "fast": el cargo coincide con un puesto oficial con similitud >= `fast_score` y la
+      entrada es corta; basta un modelo más barato y un prompt que adapte el puesto oficial.
+    - "full": puestos NUEVOS, coincidencias dudosas o peticiones largas; prompt y modelo completos.
+    Si una ruta ligera ("adapt", "fast") no valida se repite la petición por la completa ("fallback"),
+    y si su tasa de fallos reciente supera `max_failure_rate` solo se prueba de vez en cuando hasta que se recupere.
+    """
+
+    def __init__(self, routes: dict[str, RouteConfig] | None = None, fast_score: float = FAST_MATCH_SCORE,
+                 max_fast_input: int = MAX_FAST_INPUT_CHARS, max_failure_rate: float = MAX_LIGHT_FAILURE_RATE,
+                 reuse_score: float = REUSE_SCORE, adapt_score: float = ADAPT_SCORE):
+        self.routes = routes or load_routes()
+        self.fast_score = fast_score
+        self.reuse_score = reuse_score
+        self.adapt_score = adapt_score
+        self.max_fast_input = max_fast_input
+        self.max_failure_rate = max_failure_rate
+        self.recent = {}       # ruta ligera -> deque de validaciones recientes (True = validó)
+        self.totals = {}
+        self.suspended = Counter()   # ruta ligera -> peticiones aptas desviadas a la completa
+        self.lock = threading.Lock()
+
+    def failure_rate(self, route: str = "fast") -> float:
+        with self.lock:
+            recent = self.recent.get(route)
+            if not recent:
+                return 0.0
+            return 1 - sum(recent) / len(recent)
+
+    def _light(self, route: str, reason: str) -> RouteDecision | None:
+        # La ruta ligera si está configurada y no suspendida (o toca probarla); None = ruta completa.
+        if route not in self.routes:
+            return None
+        if len(self.recent.get(route, ())) >= MIN_SAMPLES and self.failure_rate(route) > self.max_failure_rate:
+            with self.lock:
+                self.suspended[route] += 1
+                if self.suspended[route] % PROBE_EVERY:
+                    return None
+            reason = f"prueba de la ruta suspendida ({reason})"
+        return RouteDecision(route, self.routes[route], reason)
+
+    def classify(self, title: str, level: str, critical_skill: str, candidates: list,
+                 similar=None, context: str = "") -> RouteDecision:
+        """Ruta para una petición que no estaba en la caché de resultados.
+
+        `candidates` viene de `CatalogIndex.search`; `similar` es el perfil más parecido del
+        historial (`StoredProfile` con `score`) y `context` la huella con que se generaría ahora.
+        """
+        if similar is not None:
+            if similar.score >= self.reuse_score:
+                if similar.context == context:
+                    return RouteDecision("reuse", None, f"perfil del historial '{similar.titulo_puesto}' ({similar.score:.2f})")
+                # Casi idéntico pero de otra ruta, prompt u hojas: adaptarlo no aporta nada, sigue su ruta normal.
+            elif similar.score >= self.adapt_score:
+                decision = self._light("adapt", f"adapta '{similar.titulo_puesto}' del historial ({similar.score:.2f})")
+                if decision is not None:
+                    return decision
+        best = candidates[0].score if candidates else 0.0
+        if best < self.fast_score:
+            return RouteDecision("full", self.routes["full"], f"sin coincidencia clara en el catálogo ({best:.2f})")
+        if len(f"{title} {critical_skill}") > self.max_fast_input:
+            return RouteDecision("full", self.routes["full"], "petición larga o a medida")
+        decision = self._light("fast", f"coincide con '{candidates[0].cargo}' ({best:.2f})")
+        return decision or RouteDecision("full", self.routes["full"], "ruta rápida no disponible o suspendida por fallos")
+
+    def record(self, route: str, seconds: float, valid: bool = True, fallback: bool = False):
+        """Anota un intento ya resuelto: latencia, si validó y si llegó a esta ruta tras fallar una ligera."""
+        with self.lock:
+            totals = self.totals.setdefault(route, {"count": 0, "seconds": 0.0, "invalid": 0, "fallbacks": 0,
+                                                    "recent": deque(maxlen=500)})
+            totals["count"] += 1
+            totals["seconds"] += seconds
+            totals["invalid"] += not valid
+            totals["fallbacks"] += fallback
+            totals["recent"].append(seconds)
+            if route not in ("full", "cache", "reuse"):
+                self.recent.setdefault(route, deque(maxlen=FAILURE_WINDOW)).append(valid)
+
+    def stats(self) -> dict:
+        with self.lock:
+            result = {}
+            for route, t in self.totals.items():
+                recent = sorted(t["recent"])
+                result[route] = {
+                    "count": t["count"],
+                    "avg_ms": round(t["seconds"] / t["count"] * 1000, 1),
+                    "p95_ms": round(recent[min(len(recent) - 1, int(0.95 * (len(recent) - 1) + 0.5))] * 1000, 1),
+                    "invalid_rate": round(t["invalid"] / t["count"], 3),
+                    "fallbacks": t["fallbacks"],
+                }
+            return result
@@ -1,10 +1,25 @@
 import os
 import json
+import time
+import atexit
+import argparse
+import functools
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 import pandas as pd
-import yagmail
-from google import genai
-from google.genai import types
 from pydantic import BaseModel, Field
+from jobcraft_ratelimit import RateLimitScheduler, estimate_tokens
+from jobcraft_cache import ResultCache
+from jobcraft_context_cache import ContextCache
+from jobcraft_exports import export_bulk, format_bulk_stats, render_export, as_profile_view, safe_file_name
+from jobcraft_journal import BatchJournal, journal_path, row_hash
+from jobcraft_sinks import open_sink
+from jobcraft_clients import REGISTRY
+from jobcraft_dedup import group_rows, TITLE_THRESHOLD, SKILL_THRESHOLD
+from jobcraft_repair import parse_model_output, coerce_fields, extract_json, reask_missing
+from jobcraft_metrics import Metrics
+from jobcraft_mail import MailDispatcher, build_digest
 
 # =========================================================
 # 1. DEFINICIÓN DEL ESQUEMA DE SALIDA (El Contrato JSON)
@@ -19,33 +34,142 @@ class JobDescription(BaseModel):
     competencias_deseables: list[str] = Field(description="Lista de 2 a 3 competencias o certificaciones que añaden valor.")
     palabras_clave_seo_rrhh: list[str] = Field(description="Lista de 3 a 5 palabras clave optimizadas para búsquedas de empleo.")
 
+class PackedJobDescription(JobDescription):
+    """Una descripción dentro de una respuesta empaquetada, identificada por la fila de entrada."""
+    row_id: int = Field(description="Identificador de la fila de entrada (copiar tal cual).")
+
+class JobDescriptionPack(BaseModel):
+    """Respuesta de una llamada que genera varios puestos a la vez."""
+    items: list[PackedJobDescription] = Field(description="Una descripción completa por cada puesto solicitado.")
+
 # =========================================================
 # 2. CONFIGURACIÓN Y FUNCIÓN PRINCIPAL DEL AGENTE
 # =========================================================
 
-def run_jobcraft_ai(api_key: str, title: str, level: str, critical_skill: str):
-    """Función que ejecuta el Agente JobCraft AI."""
+# Modelo usado por el agente en todas las llamadas.
+MODEL_NAME = 'gemini-2.5-flash'
 
-    # 2.1 Configuración de la clave
-    os.environ['GEMINI_API_KEY'] = api_key
+# Subir esta versión cada vez que cambie el Prompt Maestro (invalida la caché de resultados).
+PROMPT_VERSION = "runner-v3"
 
-    try:
-        client = genai.Client()
-    except Exception as e:
-        print(f"Error: No se pudo conectar a Gemini. Asegúrate de que la clave API es correcta. Error: {e}")
-        return
+# Archivo donde se acumulan las descripciones generadas.
+OUTPUT_FILE = "jobcraft_output.csv"
+# Salida por defecto de cada lote: se reescribe completa, así que no puede ser la acumulada de las ejecuciones sueltas.
+BATCH_OUTPUT_FILE = "jobcraft_batch_output.csv"
+
+# Planificador compartido por todos los hilos: cuota RPM/TPM, backoff y circuito.
+RATE_LIMITER = RateLimitScheduler()
+
+# Caché en disco de descripciones ya generadas (mismo puesto = 0 tokens).
+RESULT_CACHE = ResultCache()
+
+# Caché de contexto de Gemini para la parte fija del Prompt Maestro.
+CONTEXT_CACHE = ContextCache(MODEL_NAME)
 
-    # --- El Prompt Maestro (La Lógica del Agente) ---
-    prompt = f"""
+# Tiempos por etapa, reintentos, tokens y coste (.jobcraft/metrics.jsonl y metrics_runner.prom).
+METRICS = Metrics("runner")
+
+# --- El Prompt Maestro (La Lógica del Agente) ---
+# Ejemplos completos de la salida esperada. Fijan tono, extensión y formato de cada campo; solo
+# viajan en el prefijo cacheado (con ellos supera MIN_CACHE_TOKENS y se cobran a precio de caché).
+# Sin caché de contexto se envía la parte fija sin ejemplos.
+FEW_SHOT_EXAMPLES = [
+    (("Analista de Datos", "Junior", "SQL"), JobDescription(
+        titulo_puesto="Analista de Datos Junior",
+        nivel="Junior",
+        resumen_puesto=(
+            "Buscamos una persona Analista de Datos Junior que convierta los datos de negocio en información "
+            "clara y accionable. Trabajarás con los equipos de Operaciones y Finanzas preparando consultas, "
+            "cuadros de mando e informes periódicos, y aprenderás buenas prácticas de calidad y gobierno del dato "
+            "de la mano de analistas senior."
+        ),
+        responsabilidades_clave=[
+            "Escribir y mantener consultas SQL para extraer y cruzar datos de las bases operativas y del almacén de datos.",
+            "Preparar informes semanales y mensuales de indicadores para Operaciones y Finanzas.",
+            "Mantener actualizados los cuadros de mando y documentar el origen y la definición de cada métrica.",
+            "Detectar y reportar incidencias de calidad de datos (duplicados, nulos, valores atípicos).",
+            "Apoyar a los analistas senior en análisis puntuales y en la validación de hipótesis de negocio.",
+            "Automatizar tareas repetitivas de preparación de datos con SQL y hojas de cálculo.",
+        ],
+        requisitos_minimos=[
+            "Grado en Estadística, Matemáticas, Economía, Ingeniería o titulación afín.",
+            "Dominio de SQL (joins, agregaciones, funciones de ventana) demostrable en prácticas o proyectos.",
+            "Manejo avanzado de Excel o Google Sheets (tablas dinámicas, fórmulas de búsqueda).",
+            "Capacidad para explicar resultados numéricos a personas no técnicas.",
+            "Rigor, atención al detalle y organización en el trabajo diario.",
+        ],
+        competencias_deseables=[
+            "Experiencia con herramientas de visualización (Power BI, Looker Studio o Tableau).",
+            "Nociones de Python o R para análisis de datos.",
+        ],
+        palabras_clave_seo_rrhh=["Analista de Datos", "SQL", "Business Intelligence", "Junior", "Cuadros de mando"],
+    )),
+    (("Jefe de Ventas B2B", "Manager", "Negociación"), JobDescription(
+        titulo_puesto="Jefe/a de Ventas B2B",
+        nivel="Manager",
+        resumen_puesto=(
+            "Liderarás el equipo comercial B2B con el objetivo de hacer crecer la cartera de clientes empresa "
+            "de forma rentable. Serás responsable de la estrategia de cuentas clave, de las negociaciones de "
+            "mayor impacto y del desarrollo de un equipo de cinco a ocho ejecutivos de cuenta."
+        ),
+        responsabilidades_clave=[
+            "Definir el plan comercial anual B2B, con objetivos de facturación y margen por segmento y cuenta.",
+            "Dirigir y cerrar las negociaciones estratégicas con cuentas clave, protegiendo el margen.",
+            "Liderar, formar y evaluar al equipo de ejecutivos de cuenta con seguimiento semanal del embudo.",
+            "Establecer políticas de precios, descuentos y condiciones contractuales junto con Finanzas.",
+            "Analizar el mercado y la competencia para detectar nuevos segmentos y oportunidades.",
+            "Reportar a Dirección la previsión de ventas y el estado de las principales oportunidades.",
+        ],
+        requisitos_minimos=[
+            "Al menos 7 años de experiencia en venta consultiva B2B, 3 de ellos liderando equipos.",
+            "Historial demostrable de negociaciones complejas con ciclos de venta largos.",
+            "Dominio de un CRM (Salesforce, HubSpot o similar) y de la gestión del embudo por datos.",
+            "Capacidad de análisis financiero de ofertas (márgenes, descuentos, rentabilidad por cliente).",
+            "Liderazgo cercano, comunicación clara y orientación a resultados.",
+        ],
+        competencias_deseables=[
+            "Formación en técnicas de negociación (p.ej. método Harvard).",
+            "Inglés profesional para cuentas internacionales.",
+            "Experiencia en venta de soluciones tecnológicas o servicios.",
+        ],
+        palabras_clave_seo_rrhh=["Jefe de Ventas", "B2B", "Negociación", "Cuentas clave", "Liderazgo comercial"],
+    )),
+    (("Técnico de Soporte IT", "Intermedio", "Atención al usuario"), JobDescription(
+        titulo_puesto="Técnico/a de Soporte IT",
+        nivel="Intermedio",
+        resumen_puesto=(
+            "Serás el primer punto de contacto técnico de la plantilla: resolverás incidencias de equipos, "
+            "software y accesos con un trato cercano y resolutivo, y ayudarás a mantener el parque informático "
+            "seguro y actualizado dentro de los acuerdos de nivel de servicio."
+        ),
+        responsabilidades_clave=[
+            "Atender y resolver las incidencias y peticiones de los usuarios por teléfono, chat y herramienta de tickets.",
+            "Diagnosticar y reparar problemas de hardware, sistema operativo, ofimática y conectividad.",
+            "Gestionar altas, bajas y permisos de usuarios en el directorio corporativo y el correo.",
+            "Preparar, inventariar y desplegar equipos para nuevas incorporaciones.",
+            "Documentar soluciones en la base de conocimiento y escalar al segundo nivel cuando proceda.",
+        ],
+        requisitos_minimos=[
+            "Formación Profesional en Sistemas Microinformáticos y Redes o similar.",
+            "Dos a cuatro años de experiencia en soporte a usuarios (primer o segundo nivel).",
+            "Conocimientos sólidos de Windows, Microsoft 365 y Active Directory.",
+            "Experiencia con herramientas de ticketing (Jira Service Management, GLPI o similar).",
+            "Paciencia, empatía y capacidad para explicar soluciones técnicas con sencillez.",
+        ],
+        competencias_deseables=[
+            "Certificación ITIL Foundation.",
+            "Conocimientos básicos de macOS y de gestión de dispositivos móviles (MDM).",
+        ],
+        palabras_clave_seo_rrhh=["Soporte IT", "Helpdesk", "Atención al usuario", "Microsoft 365"],
+    )),
+]
+
+# Parte fija: igual para todos los puestos; viaja como system_instruction cuando no hay caché de contexto.
+SYSTEM_INSTRUCTION = """
     Eres el Agente de Diseño de Puestos de Trabajo Inteligente (JobCraft AI). 
     Tu objetivo es generar una descripción de puesto completa, atractiva y estructurada 
     para el sector de Recursos Humanos. El resultado debe ser 100% libre de sesgos.
 
-    **ENTRADAS DEL USUARIO:**
-    1.  Título del Puesto: {title}
-    2.  Nivel Requerido: {level}
-    3.  Habilidad Crítica de Enfoque: {critical_skill}
-
     **TAREAS CLAVE DEL AGENTE (Simulación de la tripulación):**
     1.  **Analista de Roles:** Identifica las responsabilidades y requisitos de mercado para el puesto y nivel indicados.
     2.  **Escritor Persuasivo:** Redacta un resumen del puesto conciso y profesional.
@@ -54,90 +178,308 @@ def run_jobcraft_ai(api_key: str, title: str, level: str, critical_skill: str):
     **REGLA DE SALIDA VITAL:** DEBES devolver la respuesta únicamente en el formato JSON que te indico, SIN añadir ningún texto explicativo o introducción.
     """
 
-    # Configuración para forzar la salida JSON usando el esquema Pydantic
-    config = types.GenerateContentConfig(
-        response_mime_type="application/json",
-        response_schema=JobDescription,
-    )
+# Prefijo que se guarda en el caché de contexto: la parte fija más los ejemplos de salida.
+CACHED_SYSTEM_INSTRUCTION = SYSTEM_INSTRUCTION + """
+    **EJEMPLOS DE SALIDA (referencia de tono, extensión y formato; no copies su contenido):**
+    """ + "\n".join(
+    f"\n    Entradas: {title} | {level} | {skill}\n    Salida: {example.model_dump_json()}"
+    for (title, level, skill), example in FEW_SHOT_EXAMPLES
+) + "\n"
+
+
+def build_prompt(title: str, level: str, critical_skill: str) -> str:
+    """Parte variable del Prompt Maestro: solo las entradas del puesto concreto."""
+    return f"""
+    **ENTRADAS DEL USUARIO:**
+    1.  Título del Puesto: {title}
+    2.  Nivel Requerido: {level}
+    3.  Habilidad Crítica de Enfoque: {critical_skill}
+    """
+
+
+def generate_job_description(client, title: str, level: str, critical_skill: str):
+    """Llama al modelo y devuelve un `JobDescription` validado, o None si la salida no es válida.
+
+    No escribe nada en disco, por lo que es seguro llamarla desde varios hilos
+    compartiendo el mismo `genai.Client`.
+    """
+    cache_key = ResultCache.make_key(title, level, critical_skill, MODEL_NAME, PROMPT_VERSION)
+    cached = RESULT_CACHE.get(cache_key, JobDescription)
+    if cached is not None:
+        METRICS.count("result_cache_hit")
+        print(f"⚡ Desde caché: {title} ({level})")
+        return cached
+    METRICS.count("result_cache_miss")
 
     print(f"🤖 Ejecutando JobCraft AI para: {title} ({level})...")
 
-    # Llamada a la API
-    response = client.models.generate_content(
-        model='gemini-2.5-flash',
-        contents=prompt,
-        config=config
+    # Llamada a la API (a través del planificador de cuota y reintentos).
+    # Salida JSON forzada usando el esquema Pydantic.
+    with METRICS.stage("prompt_build"):
+        prompt = build_prompt(title, level, critical_skill)
+    call = METRICS.measured_call(RATE_LIMITER.call, MODEL_NAME)
+    response = CONTEXT_CACHE.generate(
+        client, prompt, CACHED_SYSTEM_INSTRUCTION, PROMPT_VERSION, uncached=(prompt, SYSTEM_INSTRUCTION),
+        call=functools.partial(call, estimated_tokens=estimate_tokens(SYSTEM_INSTRUCTION + prompt)),
+        response_mime_type="application/json",
+        response_schema=JobDescription,
     )
 
-    # Procesar la respuesta
+    # Procesar la respuesta: si no valida se repara en local y, si aún faltan campos,
+    # se piden solo esos al modelo en lugar de regenerar el perfil entero.
     json_data = response.text
 
+    def reask(missing, partial):
+        print(f"🩹 Pidiendo solo los campos que faltan para {title}: {', '.join(missing)}")
+        return reask_missing(client, MODEL_NAME, METRICS.measured_call(RATE_LIMITER.call, MODEL_NAME, stage="model_reask"),
+                             JobDescription, missing, partial, prompt)
+
     try:
-        # **ESTE BLOQUE DE TRY ESTÁ CORREGIDO**
-        job_description_object = JobDescription.model_validate_json(json_data)
-        data_dict = job_description_object.model_dump()
-        
-        # --- LÓGICA DE EXPORTACIÓN DE DATOS (EL PASO DE ACCIÓN) ---
-        
-        # 1. Creamos un DataFrame (tabla) a partir de los datos.
-        #    Normalizamos para que las listas (responsabilidades, requisitos) se unan en una sola cadena.
-        data_dict_flat = {k: ', '.join(v) if isinstance(v, list) else v for k, v in data_dict.items()}
-        
-        # 2. Convertimos el diccionario a un DataFrame (tabla de pandas)
-        df = pd.DataFrame([data_dict_flat])
-        
-        # 3. Guardamos la tabla en un archivo CSV en la carpeta del proyecto.
-        output_file = "jobcraft_output.csv"
-        
-        # Usamos mode='a' para "append" (añadir al archivo si ya existe) y header=False para evitar repetir encabezados.
-        if os.path.exists(output_file):
-            df.to_csv(output_file, index=False, mode='a', header=False, encoding='utf-8')
-        else:
-            # Si no existe, creamos el archivo con los encabezados (header=True)
-            df.to_csv(output_file, index=False, encoding='utf-8')
-            
-        print(f"\n✅ MVP Generado y Exportado con Éxito por JobCraft AI:")
-        print(f"   - Título: {data_dict['titulo_puesto']}")
-        print(f"   - Archivo: {output_file} (Guardado/Actualizado en la carpeta JobCraft_MVP)")
-
-        # --- DEVUELVE EL JSON TEXTUAL PARA EL CORREO ---
-        job_output = json.dumps(data_dict, indent=2, ensure_ascii=False) 
-        return job_output
-        
+        with METRICS.stage("validation"):
+            job_description_object = parse_model_output(
+                json_data, JobDescription, defaults={"titulo_puesto": title, "nivel": level}, reask=reask,
+            )
     except Exception as e:
         print(f"❌ Error crítico en el procesamiento o validación del JSON: {e}")
         print(f"Salida cruda del modelo: {json_data}")
+        return None
+
+    RESULT_CACHE.put(cache_key, job_description_object)
+    return job_description_object
+
+
+# --- MODO EMPAQUETADO: varios puestos por llamada ---
+# Tokens de salida que reservamos por llamada empaquetada (gemini-2.5-flash admite 65.536, incluido el razonamiento).
+PACK_OUTPUT_BUDGET = 32768
+MAX_PACK_SIZE = 20
+
+
+class PackSizer:
+    """Ajusta K (puestos por llamada) para que la respuesta quepa holgadamente en el límite de salida.
+
+    Parte de una estimación de tokens por puesto y la corrige con el consumo real
+    (media móvil); si una respuesta se corta, reduce K a la mitad durante un tiempo.
+    """
+
+    def __init__(self, budget: int = PACK_OUTPUT_BUDGET, max_size: int = MAX_PACK_SIZE, tokens_per_item: float = 1200.0):
+        self.budget = budget
+        self.max_size = max_size
+        self.tokens_per_item = tokens_per_item
+        self.penalty = 1.0
+        self.lock = threading.Lock()
+
+    def size(self) -> int:
+        with self.lock:
+            k = int(self.budget * 0.7 * self.penalty / self.tokens_per_item)
+            return max(1, min(self.max_size, k))
+
+    def observe(self, output_tokens: int, items: int):
+        if items <= 0 or not output_tokens:
+            return
+        with self.lock:
+            self.tokens_per_item = 0.7 * self.tokens_per_item + 0.3 * (output_tokens / items)
+            self.penalty = min(1.0, self.penalty * 1.25)
+
+    def shrink(self):
+        with self.lock:
+            self.penalty = max(0.05, self.penalty / 2)
+
+
+PACK_SIZER = PackSizer()
+
+
+def parse_pack_size(value):
+    """`pack_size` normalizado: None (sin empaquetar), "auto" o un entero >= 1; ValueError si no es válido."""
+    if value is None or value == "auto":
+        return value
+    if isinstance(value, str):
+        value = value.strip().lower()
+        if value == "auto":
+            return value
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"pack_size debe ser 'auto' o un entero >= 1 (recibido: {value!r})") from None
+    if isinstance(value, float) and value != size or size < 1:
+        raise ValueError(f"pack_size debe ser 'auto' o un entero >= 1 (recibido: {value!r})")
+    return size
+
+
+def pack_size_arg(value: str):
+    """Tipo de argparse para `--pack-size`."""
+    try:
+        return parse_pack_size(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e)) from None
+
+
+def build_packed_prompt(rows: list[tuple]) -> str:
+    """Parte variable del prompt para varios puestos: una línea por fila con su row_id."""
+    lines = "\n".join(
+        f"    - row_id {row_id} | Título del Puesto: {title} | Nivel Requerido: {level} | Habilidad Crítica de Enfoque: {skill}"
+        for row_id, title, level, skill in rows
+    )
+    return f"""
+    **PUESTOS A GENERAR ({len(rows)}):**
+{lines}
+
+    Devuelve en 'items' una descripción completa e independiente por cada puesto, copiando su 'row_id'.
+    """
+
+
+def generate_packed_job_descriptions(client, rows: list[tuple]) -> dict:
+    """Genera varios puestos en una sola llamada. `rows` = [(row_id, title, level, skill), ...].
+
+    Devuelve {row_id: JobDescription} solo con los elementos que validan por separado;
+    las filas ausentes o inválidas quedan fuera para que el llamador las reintente una a una.
+    """
+    results, pending = {}, []
+    for row in rows:
+        row_id, title, level, skill = row
+        cached = RESULT_CACHE.get(ResultCache.make_key(title, level, skill, MODEL_NAME, PROMPT_VERSION), JobDescription)
+        if cached is not None:
+            METRICS.count("result_cache_hit")
+            results[row_id] = cached
+        else:
+            METRICS.count("result_cache_miss")
+            pending.append(row)
+    if not pending:
+        return results
+
+    print(f"📦 Ejecutando JobCraft AI para {len(pending)} puestos en una sola llamada...")
+    with METRICS.stage("prompt_build", rows=len(pending)):
+        prompt = build_packed_prompt(pending)
+    response = CONTEXT_CACHE.generate(
+        client, prompt, CACHED_SYSTEM_INSTRUCTION, PROMPT_VERSION, uncached=(prompt, SYSTEM_INSTRUCTION),
+        call=functools.partial(
+            METRICS.measured_call(RATE_LIMITER.call, MODEL_NAME, stage="model_call_packed"),
+            estimated_tokens=estimate_tokens(SYSTEM_INSTRUCTION + prompt, expected_output=int(PACK_SIZER.tokens_per_item * len(pending))),
+        ),
+        response_mime_type="application/json",
+        response_schema=JobDescriptionPack,
+        max_output_tokens=PACK_OUTPUT_BUDGET,
+    )
+
+    candidates = getattr(response, "candidates", None) or []
+    if candidates and str(getattr(candidates[0], "finish_reason", "")).endswith("MAX_TOKENS"):
+        PACK_SIZER.shrink()
+
+    # Una respuesta truncada o con texto alrededor conserva los elementos que llegaron completos.
+    with METRICS.stage("validation", rows=len(pending)):
+        items = extract_json(response.text).get("items", [])
+    if not isinstance(items, list) or not items:
+        print(f"❌ Respuesta empaquetada ilegible; se reintentarán los {len(pending)} puestos por separado.")
+        PACK_SIZER.shrink()
+        return results
+
+    by_id = {row[0]: row for row in pending}
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        # Reparación local por elemento; lo que siga incompleto se reintenta por separado.
+        fields = coerce_fields(item, PackedJobDescription)
+        if fields.get("row_id") not in by_id or fields["row_id"] in results:
+            continue
+        _, title, level, skill = by_id[fields["row_id"]]
+        fields.setdefault("titulo_puesto", title)
+        fields.setdefault("nivel", level)
+        try:
+            job = JobDescription.model_validate({k: v for k, v in fields.items() if k != "row_id"})
+        except Exception:
+            continue
+        RESULT_CACHE.put(ResultCache.make_key(title, level, skill, MODEL_NAME, PROMPT_VERSION), job)
+        results[fields["row_id"]] = job
+
+    usage = getattr(response, "usage_metadata", None)
+    generated = len(results) - (len(rows) - len(pending))
+    PACK_SIZER.observe(getattr(usage, "candidates_token_count", 0) or 0, generated)
+    return results
+
+
+_output_sink = None
+
+
+def get_output_sink():
+    """Salida compartida de las ejecuciones sueltas: el archivo se abre una vez y se cierra al salir."""
+    global _output_sink
+    if _output_sink is None:
+        _output_sink = open_sink(OUTPUT_FILE, JobDescription)
+        atexit.register(_output_sink.close)
+    return _output_sink
+
+
+def run_jobcraft_ai(api_key: str, title: str, level: str, critical_skill: str, client=None, sink=None):
+    """Función que ejecuta el Agente JobCraft AI."""
+
+    if client is None:
+        # 2.1 Cliente compartido del proceso (se crea una vez por clave y se reutiliza)
+        try:
+            client = REGISTRY.genai(api_key)
+        except Exception as e:
+            print(f"Error: No se pudo conectar a Gemini. Asegúrate de que la clave API es correcta. Error: {e}")
+            return
+
+    job_description_object = generate_job_description(client, title, level, critical_skill)
+    if job_description_object is None:
         # --- DEVUELVE None EN CASO DE ERROR ---
         return None
 
+    data_dict = job_description_object.model_dump()
+
+    # --- LÓGICA DE EXPORTACIÓN DE DATOS (EL PASO DE ACCIÓN) ---
+    sink = sink or get_output_sink()
+    sink.write(data_dict)
+
+    print(f"\n✅ MVP Generado y Exportado con Éxito por JobCraft AI:")
+    print(f"   - Título: {data_dict['titulo_puesto']}")
+    print(f"   - Archivo: {sink.path} (Guardado/Actualizado en la carpeta JobCraft_MVP)")
+
+    # --- DEVUELVE EL JSON TEXTUAL PARA EL CORREO ---
+    return json.dumps(data_dict, indent=2, ensure_ascii=False)
+
 # =========================================================
 # 2.3 FUNCIÓN DE ACCIÓN EXTERNA: Envío de Correo
 # =========================================================
-def send_job_email(recipient: str, title: str, body: str, sender_email: str, app_password: str):
-    """Envía el resultado de la descripción de puesto por correo electrónico."""
+# Modos de aviso por correo de un lote: ninguno, solo el primer puesto, un correo por
+# puesto o un resumen por destinatario con los perfiles adjuntos.
+NOTIFY_MODES = ("none", "first", "each", "digest")
+# Formato de los perfiles adjuntos en los resúmenes.
+DIGEST_FORMAT = "pdf"
+# Segundos que el lote espera a la cola de correo antes de dar su resumen (con SMTP caído no se bloquea).
+MAIL_FLUSH_TIMEOUT = 60.0
 
-    # Simulación de Conexión a un Servidor de Publicación
-    print(f"\n📧 Conectando para enviar la descripción a: {recipient}...")
+_mailers = {}
 
-    try:
-        # Conexión y autenticación con la Contraseña de Aplicación
-        yag = yagmail.SMTP(sender_email, app_password)
 
-        # Contenido del correo
-        subject = f"[JobCraft AI] Puesto Generado: {title}"
+def get_mailer(sender_email: str, app_password: str) -> MailDispatcher:
+    """Despachador compartido por remitente: una sola conexión SMTP autenticada para todo el proceso."""
+    if sender_email not in _mailers:
+        _mailers[sender_email] = MailDispatcher(sender_email, app_password)
+        atexit.register(_mailers[sender_email].close, MAIL_FLUSH_TIMEOUT)
+    return _mailers[sender_email]
 
-        # Enviamos el contenido en el cuerpo del correo
-        yag.send(
-            to=recipient,
-            subject=subject,
-            contents=body
-        )
-        print(f"✅ Notificación enviada exitosamente al gerente/publicador ({recipient}).")
 
-    except Exception as e:
-        print(f"❌ ERROR: Fallo al enviar el correo. Revisa tu Contraseña de Aplicación.")
-        print(f"Error detallado: {e}")
-        
+def send_job_email(recipient: str, title: str, body: str, sender_email: str, app_password: str, mailer: MailDispatcher | None = None):
+    """Encola el resultado de la descripción de puesto para enviarlo por correo (no espera al envío)."""
+    mailer = mailer or get_mailer(sender_email, app_password)
+    mailer.send(recipient, f"[JobCraft AI] Puesto Generado: {title}", body)
+    print(f"📧 Notificación para {recipient} encolada.")
+
+
+def send_job_digests(mailer: MailDispatcher, entries: list[tuple[str, int, JobDescription]]):
+    """Un resumen por destinatario con sus perfiles adjuntos. `entries` = [(destinatario, fila, perfil)]."""
+    by_recipient = {}
+    for recipient, index, job in entries:
+        name = f"{index + 1:05d}_{safe_file_name(job.titulo_puesto)}.{DIGEST_FORMAT}"
+        attachment = (name, render_export(as_profile_view(job.model_dump()), DIGEST_FORMAT))
+        by_recipient.setdefault(recipient, []).append((f"{job.titulo_puesto} ({job.nivel})", job.resumen_puesto, [attachment]))
+    messages = 0
+    for recipient, items in by_recipient.items():
+        for message in build_digest([recipient], "[JobCraft AI] Puestos generados", items):
+            mailer.enqueue(message)
+            messages += 1
+    print(f"📧 {messages} resumen(es) encolados para {len(by_recipient)} destinatario(s).")
+
 # =========================================================
 # 3. EJECUCIÓN DEL PROCESADOR DE LOTES (BATCH RUNNER)
 # =========================================================
@@ -146,11 +488,91 @@ def send_job_email(recipient: str, title: str, body: str, sender_email: str, app
 MY_GEMINI_API_KEY = "PEGA_TU_CLAVE_AQUI_A_PARTIR_DE_AIza..."
 # Si ya la pegaste, pégala de nuevo arriba.
 
+# Número máximo de llamadas simultáneas al modelo durante un lote.
+MAX_CONCURRENCY = 8
+
+
+class BatchProgress:
+    """Lleva la cuenta de tareas terminadas y muestra avance y rendimiento en una sola línea."""
+
+    def __init__(self, total: int):
+        self.total = total
+        self.done = 0
+        self.failed = 0
+        self.started = time.monotonic()
+
+    def update(self, ok: bool):
+        self.done += 1
+        if not ok:
+            self.failed += 1
+        elapsed = time.monotonic() - self.started
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        eta = (self.total - self.done) / rate if rate > 0 else 0.0
+        print(
+            f"📈 Progreso: {self.done}/{self.total} ({self.done / self.total:.0%}) | "
+            f"{rate:.2f} puestos/s | errores: {self.failed} | ETA: {eta:.0f}s",
+            flush=True,
+        )
+
+    def summary(self) -> str:
+        elapsed = time.monotonic() - self.started
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        return f"{self.done - self.failed} OK, {self.failed} con error en {elapsed:.1f}s ({rate:.2f} puestos/s)"
+
+
+def print_run_metrics(after: dict, before: dict, generated: int, progress: BatchProgress):
+    """Resumen de la ejecución a partir de la diferencia entre dos `Metrics.summary()`."""
+    counters = {k: v - before["counters"].get(k, 0) for k, v in after["counters"].items()}
+    cost = after["cost_usd"] - before["cost_usd"]
+    elapsed = time.monotonic() - progress.started
+    print(
+        f"🧮 Tokens: {counters.get('prompt_tokens', 0)} de prompt ({counters.get('cached_tokens', 0)} cacheados), "
+        f"{counters.get('output_tokens', 0)} de salida | reintentos: {counters.get('retries', 0)} | "
+        f"coste estimado: ${cost:.4f}" + (f" (${cost / generated:.5f}/puesto)" if generated else "")
+    )
+    print(f"⏱️ Rendimiento: {generated / elapsed if elapsed > 0 else 0.0:.2f} puestos generados/s. Tiempo por etapa:")
+    for name, stage in sorted(after["stages"].items(), key=lambda item: -item[1]["total_s"]):
+        done = stage["count"] - before["stages"].get(name, {}).get("count", 0)
+        if done:
+            total = stage["total_s"] - before["stages"].get(name, {}).get("total_s", 0.0)
+            print(f"   - {name:<18} {done:5d} × {total / done * 1000:8.1f} ms  (total {total:.1f}s)")
+
+
 # 3.1 Función que lee el archivo de entrada y procesa cada puesto
-def process_job_batch(api_key: str, input_file: str):
+def process_job_batch(api_key: str, input_file: str, max_concurrency: int = MAX_CONCURRENCY, pack_size=None,
+                      resume: bool = False, output_file: str = BATCH_OUTPUT_FILE, dedup: bool = True,
+                      title_threshold: float = TITLE_THRESHOLD, skill_threshold: float = SKILL_THRESHOLD,
+                      notify: str = "first", mailer: MailDispatcher | None = None):
     """
     Lee el archivo CSV de entrada y procesa cada puesto de trabajo
     usando el agente JobCraft AI.
+
+    Las filas se generan en paralelo (hasta `max_concurrency` llamadas a la vez)
+    compartiendo un único `genai.Client`. Los resultados llegan en cualquier orden,
+    pero se escriben en la salida respetando el orden del archivo de entrada. El formato
+    de salida (CSV, JSONL o Parquet) se deduce de la extensión de `output_file`.
+
+    `pack_size` activa el modo empaquetado: un entero fija K puestos por llamada y
+    "auto" deja que `PACK_SIZER` lo ajuste. Las filas que falten o no validen en una
+    respuesta empaquetada se reintentan como llamadas individuales.
+
+    Cada fila terminada se anota en un diario (`BatchJournal`) por hash de sus entradas.
+    Con `resume=True` las filas ya completadas se toman del diario y solo se generan las
+    pendientes o fallidas. La salida se va escribiendo por bloques en un temporal que
+    sustituye al destino al terminar, así que contiene exactamente las filas de este
+    archivo de entrada, sin duplicados, y nunca queda a medias. La excepción es `OUTPUT_FILE`,
+    donde se acumulan las ejecuciones sueltas: ahí el temporal parte de una copia del archivo
+    y el lote solo añade las filas que el diario no tenga ya como publicadas.
+
+    Con `dedup=True` las filas que piden lo mismo (mismo texto tras normalizar, o parecido
+    por encima de `title_threshold`/`skill_threshold` con el mismo nivel) se generan una
+    sola vez y el resultado se copia a cada fila original.
+
+    `notify` decide los avisos por correo (ver `NOTIFY_MODES`): "first" avisa solo del
+    primer puesto, "each" envía un correo por puesto a medida que se generan y "digest"
+    un resumen con los perfiles adjuntos al terminar. Si el CSV trae la columna
+    `manager_email`, cada puesto va a su responsable. Los correos salen de una cola con
+    una sola conexión SMTP (`mailer`; por defecto, la de `get_mailer`).
     """
     # --- CONFIGURACIÓN DE CORREO ---
     # ¡IMPORTANTE! Reemplaza los placeholders con tu información:
@@ -158,7 +580,13 @@ def process_job_batch(api_key: str, input_file: str):
     APP_PASSWORD = "TU_CLAVE_DE_APLICACION_DE_16_CARACTERES"  # <- Pega tu clave de 16 caracteres aquí
     RECIPIENT_EMAIL = "correo_del_gerente_destino@dominio.com" # <- Pega un correo de destino de prueba
     # -----------------------------
-    
+
+    try:
+        pack_size = parse_pack_size(pack_size)
+    except ValueError as e:
+        print(f"\n🚨 ERROR: {e}")
+        return
+
     if not os.path.exists(input_file):
         print(f"\n🚨 ERROR CRÍTICO: El archivo de entrada '{input_file}' no fue encontrado.")
         print("Asegúrate de haber creado el archivo input_jobs.csv en la carpeta del proyecto.")
@@ -168,43 +596,237 @@ def process_job_batch(api_key: str, input_file: str):
     
     try:
         # Leer el archivo CSV en un DataFrame de pandas
-        jobs_to_process = pd.read_csv(input_file)
+        with METRICS.stage("input_read"):
+            jobs_to_process = pd.read_csv(input_file)
         total_jobs = len(jobs_to_process)
-        
-        print(f"✅ Tareas encontradas: {total_jobs} puestos listos para procesar.")
-        
-        # Iterar sobre cada fila del DataFrame
-        for index, row in jobs_to_process.iterrows():
-            title = row['title']
-            level = row['level']
-            skill = row['critical_skill']
-            
-            print(f"\n--- 🔄 Procesando Tarea {index + 1} de {total_jobs} ---")
-            
-            # Llama a la función principal del agente y guarda el JSON de salida
-            job_json_output = run_jobcraft_ai(api_key, title, level, skill)
-            
-            # --- ACCIÓN ADICIONAL DE ENVÍO DE CORREO (Simulación de Publicación) ---
-            # Enviamos el correo solo para el primer puesto (index == 0) para no saturar el buzón.
-            if job_json_output and index == 0:
-                send_job_email(
-                    recipient=RECIPIENT_EMAIL,
-                    title=title,
-                    body=job_json_output,
-                    sender_email=SENDER_EMAIL,
-                    app_password=APP_PASSWORD
-                )
-            
-        # Esta línea estaba mal indentada en el código anterior. Debe estar fuera del bucle 'for'.
-        print(f"\n🎉 Lote de {total_jobs} puestos procesado con éxito.") 
-        
+        rows = list(zip(jobs_to_process['title'], jobs_to_process['level'], jobs_to_process['critical_skill']))
+        if 'manager_email' in jobs_to_process:
+            recipients = [r if isinstance(r, str) and r.strip() else RECIPIENT_EMAIL for r in jobs_to_process['manager_email']]
+        else:
+            recipients = [RECIPIENT_EMAIL] * total_jobs
     except Exception as e:
-        print(f"\n❌ ERROR: Ocurrió un error durante el procesamiento del lote: {e}")
+        print(f"\n❌ ERROR: No se pudo leer el lote: {e}")
         print("Verifica que las columnas del CSV de entrada se llamen: title, level, critical_skill")
+        return
+
+    modo = f", empaquetado: {pack_size}" if pack_size else ""
+    print(f"✅ Tareas encontradas: {total_jobs} puestos listos para procesar (concurrencia: {max_concurrency}{modo}).")
+    if not rows:
+        return
+
+    results = {}     # índice de fila -> JobDescription (o None si falló)
+    hashes = [row_hash(*row) for row in rows]
+    journal = BatchJournal(journal_path(input_file))
+    if resume:
+        completed = journal.completed(JobDescription)
+        results = {i: completed[h] for i, h in enumerate(hashes) if h in completed}
+        print(f"⏩ Reanudando: {len(results)} puestos ya completados, {total_jobs - len(results)} pendientes.")
+    else:
+        journal.reset()
+
+    # Las filas equivalentes se generan una sola vez y el resultado se reparte a todo el grupo.
+    if dedup:
+        groups, dedup_report = group_rows(rows, title_threshold, skill_threshold)
+        print(f"🧹 Deduplicación: {dedup_report}.")
+    else:
+        groups = [[i] for i in range(total_jobs)]
+    members = {}   # fila representante -> filas de su grupo aún sin resultado
+    for group in groups:
+        missing = [i for i in group if i not in results]
+        if missing:
+            members[missing[0]] = missing
+
+    before_run = METRICS.summary()
+    progress = BatchProgress(len(members))
+    queue = deque(sorted(members))    # representantes aún no enviados
+    retry = deque()                   # filas que faltaron en una respuesta empaquetada
+    pending = {}                      # future -> (índices de fila, empaquetado?)
+    workers = max(1, max_concurrency)
+    generated_now = set()
+    next_to_write = 0
+    # En la salida compartida no se reescriben las filas que un intento anterior ya publicó.
+    shared = os.path.abspath(output_file) == os.path.abspath(OUTPUT_FILE)
+    already_published = journal.published() if shared and resume else set()
+    try:
+        sink = open_sink(output_file, JobDescription, replace=True, keep_existing=shared)
+    except (RuntimeError, ValueError) as e:
+        print(f"❌ ERROR: {e}")
+        return
+
+    if queue:
+        try:
+            # Un solo cliente compartido por todos los hilos del lote (y por el resto del proceso).
+            client = REGISTRY.genai(api_key)
+        except Exception as e:
+            print(f"Error: No se pudo conectar a Gemini. Asegúrate de que la clave API es correcta. Error: {e}")
+            sink.abort()
+            return
+
+    def write_ready():
+        # Se entrega a la salida el tramo contiguo ya resuelto, para conservar el orden de entrada.
+        nonlocal next_to_write
+        block = []
+        while next_to_write in results:
+            if results[next_to_write] is not None and hashes[next_to_write] not in already_published:
+                block.append(results[next_to_write].model_dump())
+            next_to_write += 1
+        with METRICS.stage("output_write", rows=len(block)):
+            sink.write_many(block)
+
+    def submit_next(pool):
+        # Las tareas se envían a medida que se libera un hueco, así K se ajusta con lo ya observado.
+        if retry:
+            index = retry.popleft()
+            pending[pool.submit(generate_job_description, client, *rows[index])] = ([index], False)
+            return
+        k = 1
+        if pack_size:
+            k = PACK_SIZER.size() if pack_size == "auto" else pack_size
+        indices = [queue.popleft() for _ in range(min(k, len(queue)))]
+        if len(indices) == 1:
+            pending[pool.submit(generate_job_description, client, *rows[indices[0]])] = (indices, False)
+        else:
+            packed_rows = [(i, *rows[i]) for i in indices]
+            pending[pool.submit(generate_packed_job_descriptions, client, packed_rows)] = (indices, True)
+
+    def notifier():
+        nonlocal mailer
+        if mailer is None:
+            mailer = get_mailer(SENDER_EMAIL, APP_PASSWORD)
+        return mailer
+
+    def finish(index, outcome, error=None):
+        # Cada resultado queda confirmado en el diario antes de seguir: es el punto de reanudación.
+        for member in members[index]:
+            results[member] = outcome
+            if outcome is not None:
+                journal.record_done(hashes[member], outcome)
+                generated_now.add(member)
+                if notify == "each":
+                    send_job_email(recipients[member], rows[member][0], json.dumps(outcome.model_dump(), indent=2, ensure_ascii=False),
+                                   SENDER_EMAIL, APP_PASSWORD, mailer=notifier())
+            else:
+                journal.record_failed(hashes[member], error or "Salida del modelo no válida")
+        progress.update(outcome is not None)
+
+    try:
+        write_ready()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            while len(pending) < workers and (queue or retry):
+                submit_next(pool)
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    indices, packed = pending.pop(future)
+                    error = None
+                    try:
+                        outcome = future.result()
+                    except Exception as e:
+                        print(f"❌ Tarea(s) {', '.join(str(i + 1) for i in indices)} fallaron: {e}")
+                        outcome, error = ({} if packed else None), str(e)
+
+                    if packed:
+                        missing = [i for i in indices if i not in outcome]
+                        if missing:
+                            print(f"🔁 {len(missing)} puesto(s) sin respuesta válida en el paquete; se reintentan por separado.")
+                        retry.extend(missing)
+                        for i in indices:
+                            if i in outcome:
+                                finish(i, outcome[i])
+                    else:
+                        finish(indices[0], outcome, error)
+                write_ready()
+
+                while len(pending) < workers and (queue or retry):
+                    submit_next(pool)
+    except KeyboardInterrupt:
+        for future in pending:
+            future.cancel()
+        sink.abort()
+        print(f"\n⛔ Lote interrumpido. El progreso está guardado en '{journal.path}'.")
+        print("   Relanza con --resume para generar solo los puestos que faltan.")
+        return None
+
+    # Publica la salida completa (temporal + rename).
+    with METRICS.stage("output_write"):
+        sink.close()
+    journal.mark_published(hashes[i] for i in range(total_jobs) if results.get(i) is not None)
+    print(f"💾 {sink.written} resultados guardados en '{output_file}' ({sink.flushes} escrituras).")
+
+    # --- ACCIÓN ADICIONAL DE ENVÍO DE CORREO (Simulación de Publicación) ---
+    # "first": solo el primer puesto; "each" ya se encoló al generar cada fila; "digest": un resumen por destinatario.
+    first = results.get(0)
+    if notify == "first" and first is not None and 0 in generated_now:
+        send_job_email(
+            recipient=recipients[0],
+            title=rows[0][0],
+            body=json.dumps(first.model_dump(), indent=2, ensure_ascii=False),
+            sender_email=SENDER_EMAIL,
+            app_password=APP_PASSWORD,
+            mailer=notifier(),
+        )
+    elif notify == "digest" and generated_now:
+        with METRICS.stage("email_digest", rows=len(generated_now)):
+            send_job_digests(notifier(), [(recipients[i], i, results[i]) for i in sorted(generated_now)])
+    if mailer is not None and mailer.queue.unfinished_tasks:
+        print(f"⏳ Enviando {mailer.queue.unfinished_tasks} correo(s) pendientes (máx. {mailer.bucket.rate * 60:.0f}/min)...")
+        with METRICS.stage("email"):
+            flushed = mailer.flush(MAIL_FLUSH_TIMEOUT)
+        mail_stats = mailer.stats()
+        print(f"📧 Correos: {mail_stats['sent']} enviados, {mail_stats['failed']} fallidos, {mail_stats['logins']} conexión(es) SMTP.")
+        if not flushed:
+            print(f"   ⚠️ {mail_stats['pending']} correo(s) siguen en cola tras {MAIL_FLUSH_TIMEOUT:.0f}s; se siguen enviando en segundo plano.")
+        if mail_stats["last_error"]:
+            print(f"   Último error: {mail_stats['last_error']}")
+
+    print(f"\n🎉 Lote de {total_jobs} puestos procesado: {progress.summary()}.")
+    if dedup and dedup_report.calls_saved:
+        print(f"🧹 Llamadas ahorradas por deduplicación: {dedup_report.calls_saved} de {total_jobs}.")
+    cache_stats = RESULT_CACHE.stats()
+    print(f"⚡ Caché: {cache_stats['hits']} aciertos, {cache_stats['misses']} fallos ({cache_stats['hit_rate']:.0%}).")
+    print_run_metrics(METRICS.summary(), before_run, len(generated_now), progress)
+    METRICS.flush()
+    return [results.get(i) for i in range(total_jobs)]
 
 # 3.2 Ejecución Principal
-if MY_GEMINI_API_KEY == "PEGA_TU_CLAVE_AQUI_A_PARTIR_DE_AIza...":
-     print("\n🚨 ERROR: Por favor, pega tu Clave API de Gemini en la línea 170 del código.")
-else:
-     # EL PUNTO DE ENTRADA AL PROCESO DE BATCH
-     process_job_batch(MY_GEMINI_API_KEY, "input_jobs.csv")
\ No newline at end of file
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Procesador de lotes de JobCraft AI.")
+    parser.add_argument("input_file", nargs="?", default="input_jobs.csv", help="CSV con columnas title, level, critical_skill.")
+    parser.add_argument("--concurrency", type=int, default=MAX_CONCURRENCY, help="Llamadas simultáneas al modelo.")
+    parser.add_argument("--resume", action="store_true", help="Reanuda el último lote de este archivo: solo genera las filas pendientes o fallidas.")
+    parser.add_argument("--output", default=BATCH_OUTPUT_FILE, help=f"Salida del lote (.csv, .jsonl o .parquet); se reescribe completa al terminar (salvo '{OUTPUT_FILE}', donde se añade).")
+    parser.add_argument("--no-dedup", action="store_true", help="Genera cada fila aunque haya otras equivalentes.")
+    parser.add_argument("--dedup-title-threshold", type=float, default=TITLE_THRESHOLD, help="Similitud mínima de título para agrupar filas (1.0 = solo idénticas).")
+    parser.add_argument("--dedup-skill-threshold", type=float, default=SKILL_THRESHOLD, help="Similitud mínima de habilidad crítica para agrupar filas.")
+    parser.add_argument("--pack-size", type=pack_size_arg, default=None, help="Puestos por llamada (entero) o 'auto'. Por defecto, uno por llamada.")
+    parser.add_argument("--notify", choices=NOTIFY_MODES, default="first", help="Avisos por correo: ninguno, solo el primer puesto, uno por puesto o un resumen con adjuntos.")
+    parser.add_argument("--smtp-debug", action="store_true", help="Envía los correos a un servidor SMTP local de depuración (localhost:1025) en lugar de Gmail.")
+    parser.add_argument("--export-zip", default=None, help="Al terminar, exporta todos los perfiles a este ZIP.")
+    parser.add_argument("--export-formats", default="docx,pdf,csv", help="Formatos del ZIP separados por comas (docx, pdf, txt, csv).")
+    parser.add_argument("--merged-pdf", default=None, help="Además, un único PDF con todos los perfiles.")
+    parser.add_argument("--export-workers", type=int, default=None, help="Procesos para la exportación (por defecto, uno por CPU).")
+    args = parser.parse_args()
+
+    if MY_GEMINI_API_KEY == "PEGA_TU_CLAVE_AQUI_A_PARTIR_DE_AIza...":
+        print("\n🚨 ERROR: Por favor, pega tu Clave API de Gemini en la variable MY_GEMINI_API_KEY.")
+    else:
+        # EL PUNTO DE ENTRADA AL PROCESO DE BATCH
+        results = process_job_batch(
+            MY_GEMINI_API_KEY, args.input_file, args.concurrency, args.pack_size,
+            resume=args.resume, output_file=args.output, dedup=not args.no_dedup,
+            title_threshold=args.dedup_title_threshold, skill_threshold=args.dedup_skill_threshold,
+            notify=args.notify, mailer=MailDispatcher.debug() if args.smtp_debug else None,
+        )
+
+        if results and (args.export_zip or args.merged_pdf):
+            print(f"\n📦 Exportando perfiles a '{args.export_zip or args.merged_pdf}'...")
+            with METRICS.stage("export"):
+                stats = export_bulk(
+                    (r for r in results if r is not None),
+                    args.export_zip,
+                    formats=tuple(f.strip() for f in args.export_formats.split(",") if f.strip()),
+                    workers=args.export_workers,
+                    merged_pdf_path=args.merged_pdf,
+                )
+            print(format_bulk_stats(stats))
@@ -0,0 +1,237 @@
+import os
+import abc
+import csv
+import json
+import shutil
+import time
+import threading
+import typing
+
+# ---------------------------------------------------------
+# SALIDAS CON BÚFER (JSONL / PARQUET / CSV)
+# ---------------------------------------------------------
+# Filas acumuladas antes de escribir y tiempo máximo que una fila puede esperar en memoria.
+DEFAULT_FLUSH_ROWS = 50
+DEFAULT_FLUSH_INTERVAL = 5.0
+
+SINK_FORMATS = ("jsonl", "parquet", "csv")
+
+
+def format_from_path(path: str) -> str:
+    """'perfiles.jsonl' -> 'jsonl'. Las extensiones desconocidas se tratan como CSV."""
+    ext = os.path.splitext(path)[1].lower().lstrip(".")
+    if ext in ("jsonl", "ndjson"):
+        return "jsonl"
+    if ext in ("parquet", "pq"):
+        return "parquet"
+    return "csv"
+
+
+class OutputSink(abc.ABC):
+    """Base de las salidas: acumula filas y las escribe por bloques sobre un archivo abierto una sola vez.
+
+    El bloque se vuelca al llegar a `flush_rows` filas o cuando la más antigua lleva
+    `flush_interval` segundos esperando; un hilo de fondo (se arranca con la primera fila)
+    hace ese volcado por tiempo aunque no lleguen más escrituras. Con `replace=True` se
+    escribe en un temporal que sustituye al destino en `close()` (nunca queda un archivo
+    a medias); `abort()` lo descarta. Con `replace=False` las filas se añaden al archivo existente.
+    Con `replace=True, keep_existing=True` el temporal parte de una copia del destino: las
+    filas se añaden al final, pero el destino solo cambia, entero, en `close()`.
+    """
+
+    def __init__(self, path: str, fields: list[str], replace: bool = False, keep_existing: bool = False,
+                 flush_rows: int = DEFAULT_FLUSH_ROWS, flush_interval: float = DEFAULT_FLUSH_INTERVAL):
+        self.path = path
+        self.fields = list(fields)
+        self.replace = replace
+        self.flush_rows = max(1, flush_rows)
+        self.flush_interval = flush_interval
+        self.target = f"{path}.tmp" if replace else path
+        # Modo de apertura del archivo de la subclase: "a" si se conservan las filas que ya tenía el destino.
+        self.mode = "w" if replace and not keep_existing else "a"
+        self.buffer = []
+        self.first_buffered = None
+        self.written = 0
+        self.flushes = 0
+        self.closed = False
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.thread = None
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        if replace and keep_existing:
+            if os.path.exists(path):
+                shutil.copyfile(path, self.target)
+            elif os.path.exists(self.target):
+                os.remove(self.target)   # Temporal de un intento anterior interrumpido.
+
+    def write(self, record: dict):
+        self.write_many([record])
+
+    def write_many(self, records):
+        with self.lock:
+            for record in records:
+                self.buffer.append({f: record.get(f) for f in self.fields})
+            if self.buffer and self.first_buffered is None:
+                self.first_buffered = time.monotonic()
+            if self._due():
+                self._flush()
+            if self.buffer and self.thread is None and self.flush_interval > 0:
+                self.thread = threading.Thread(target=self._run, name="jobcraft-sink", daemon=True)
+                self.thread.start()
+
+    def flush(self):
+        with self.lock:
+            self._flush()
+
+    def _due(self) -> bool:
+        return bool(self.buffer) and (
+            len(self.buffer) >= self.flush_rows or time.monotonic() - self.first_buffered >= self.flush_interval
+        )
+
+    def _run(self):
+        # Vuelca las filas que llevan `flush_interval` esperando aunque el productor se haya quedado quieto.
+        timeout = self.flush_interval
+        while not self.wakeup.wait(timeout=timeout):
+            with self.lock:
+                if self.closed:
+                    return
+                if self._due():
+                    self._flush()
+                waiting = 0.0 if self.first_buffered is None else time.monotonic() - self.first_buffered
+                timeout = max(0.01, self.flush_interval - waiting)
+
+    def _flush(self):
+        if not self.buffer:
+            return
+        self._write_block(self.buffer)
+        self.written += len(self.buffer)
+        self.flushes += 1
+        self.buffer = []
+        self.first_buffered = None
+
+    def _stop(self):
+        # Fuera del candado: el hilo de fondo lo necesita para terminar su último volcado.
+        self.wakeup.set()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join()
+
+    def close(self):
+        self._stop()
+        with self.lock:
+            if self.closed:
+                return
+            self._flush()
+            self._close_file()
+            self.closed = True
+            if self.replace:
+                os.replace(self.target, self.path)
+
+    def abort(self):
+        """Cierra sin publicar: en modo `replace` el destino anterior queda intacto."""
+        self._stop()
+        with self.lock:
+            if self.closed:
+                return
+            self.buffer = []
+            self._close_file()
+            self.closed = True
+            if self.replace and os.path.exists(self.target):
+                os.remove(self.target)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    @abc.abstractmethod
+    def _write_block(self, rows: list[dict]):
+        """Escribe un bloque de filas (ya filtradas a `fields`) en el archivo abierto."""
+
+    @abc.abstractmethod
+    def _close_file(self):
+        """Cierra el archivo abierto por la subclase."""
+
+
+class JsonlSink(OutputSink):
+    """Un objeto JSON por línea; las listas se conservan tal cual."""
+
+    def __init__(self, path: str, fields: list[str], **kwargs):
+        super().__init__(path, fields, **kwargs)
+        self.file = open(self.target, self.mode, encoding="utf-8")
+
+    def _write_block(self, rows):
+        self.file.write("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in rows))
+        self.file.flush()
+
+    def _close_file(self):
+        self.file.close()
+
+
+class CsvSink(OutputSink):
+    """CSV compatible con el histórico: las listas se unen con ', ' (para hojas de cálculo, no para análisis)."""
+
+    def __init__(self, path: str, fields: list[str], **kwargs):
+        super().__init__(path, fields, **kwargs)
+        needs_header = self.mode == "w" or not os.path.exists(self.target) or os.path.getsize(self.target) == 0
+        self.file = open(self.target, self.mode, encoding="utf-8", newline="")
+        self.writer = csv.DictWriter(self.file, fieldnames=self.fields)
+        if needs_header:
+            self.writer.writeheader()
+
+    def _write_block(self, rows):
+        self.writer.writerows(
+            {k: ", ".join(v) if isinstance(v, list) else v for k, v in r.items()} for r in rows
+        )
+        self.file.flush()
+
+    def _close_file(self):
+        self.file.close()
+
+
+class ParquetSink(OutputSink):
+    """Parquet columnar con columnas de tipo lista; cada volcado es un row group.
+
+    Requiere `pyarrow` (opcional). Un Parquet no admite añadir filas a un archivo
+    cerrado, así que esta salida siempre reescribe el destino completo.
+    """
+
+    def __init__(self, path: str, fields: list[str], list_fields=(), **kwargs):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise RuntimeError("La salida Parquet necesita 'pyarrow' (pip install pyarrow).") from e
+        if kwargs.get("keep_existing"):
+            raise ValueError("Un Parquet no admite añadir filas a un archivo existente (usa .csv o .jsonl).")
+        kwargs["replace"] = True
+        super().__init__(path, fields, **kwargs)
+        self.pa = pa
+        self.schema = pa.schema([
+            (f, pa.list_(pa.string()) if f in list_fields else pa.string()) for f in self.fields
+        ])
+        self.writer = pq.ParquetWriter(self.target, self.schema)
+
+    def _write_block(self, rows):
+        self.writer.write_table(self.pa.Table.from_pylist(rows, schema=self.schema))
+
+    def _close_file(self):
+        self.writer.close()
+
+
+def open_sink(path: str, model_cls, fmt: str | None = None, **kwargs) -> OutputSink:
+    """Salida para objetos de `model_cls` (Pydantic); el formato sale de la extensión si no se indica."""
+    fmt = fmt or format_from_path(path)
+    fields = list(model_cls.model_fields)
+    if fmt == "jsonl":
+        return JsonlSink(path, fields, **kwargs)
+    if fmt == "parquet":
+        list_fields = [n for n, f in model_cls.model_fields.items() if typing.get_origin(f.annotation) is list]
+        return ParquetSink(path, fields, list_fields=list_fields, **kwargs)
+    if fmt == "csv":
+        return CsvSink(path, fields, **kwargs)
+    raise ValueError(f"Formato de salida no soportado: {fmt} (usa {', '.join(SINK_FORMATS)}).")
@@ -0,0 +1,216 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from dataclasses import dataclass
+
+from jobcraft_cache import DATA_DIR, fingerprint
+
+# ---------------------------------------------------------
+# COPIA LOCAL DE LAS HOJAS DE REFERENCIA (Diccionario / Perfiles)
+# ---------------------------------------------------------
+SNAPSHOT_FILE = os.path.join(DATA_DIR, "snapshots.sqlite")
+# Cada cuánto el hilo de fondo pregunta a Drive si el documento ha cambiado.
+REFRESH_INTERVAL = 300.0
+# La fecha de Drive es del documento entero y la hoja de seguimiento la mueve a menudo: si el tamaño
+# de una hoja no cambió, solo se vuelve a descargar (por si se editó en el sitio) pasado este tiempo.
+FULL_CHECK_INTERVAL = 3600.0
+
+
+@dataclass
+class Snapshot:
+    records: list
+    content_hash: str
+    modified_time: str | None
+    fetched: float
+    signature: str | None = None   # tamaño de la hoja (filas x columnas) al descargarla
+
+
+class SheetSnapshots:
+    """Copia en disco (SQLite) de varias hojas, servida desde memoria y refrescada en segundo plano.
+
+    Al arrancar se lee la copia local, así que la primera petición no espera a Sheets
+    (solo la primera ejecución en una máquina sin copia descarga en línea). Un hilo
+    consulta cada `refresh_interval` la fecha de modificación del documento en Drive.
+    Como esa fecha es del documento entero, si cambió se mira además el tamaño de cada
+    hoja (una sola petición de metadatos): solo se descarga la hoja si su tamaño cambió
+    o si su copia tiene más de `full_check_interval` segundos, y solo si el contenido
+    (hash) es distinto se reemplaza la copia. Quien construya índices a partir de `records` debe
+    usar `content_hash` como clave para reconstruirlos únicamente cuando cambian.
+    """
+
+    def __init__(self, open_spreadsheet, names: list[str], path: str = SNAPSHOT_FILE,
+                 refresh_interval: float = REFRESH_INTERVAL, full_check_interval: float = FULL_CHECK_INTERVAL,
+                 start: bool = True):
+        self.open_spreadsheet = open_spreadsheet
+        self.names = list(names)
+        self.path = path
+        self.refresh_interval = refresh_interval
+        self.full_check_interval = full_check_interval
+        self.checks = 0
+        self.downloads = 0
+        self.changes = 0
+        self.last_error = None
+        self.failures = {}   # hoja -> (momento, error) de la última descarga fallida sin copia
+        self.lock = threading.Lock()
+        self.fetch_lock = threading.Lock()   # una sola descarga inicial a la vez
+        self.prefetcher = None
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS snapshots ("
+            " name TEXT PRIMARY KEY, records TEXT NOT NULL, content_hash TEXT NOT NULL,"
+            " modified_time TEXT, fetched REAL NOT NULL, signature TEXT)"
+        )
+        try:
+            # Copias guardadas antes de anotar el tamaño de cada hoja.
+            self.conn.execute("ALTER TABLE snapshots ADD COLUMN signature TEXT")
+        except sqlite3.OperationalError:
+            pass
+        self.conn.commit()
+        self.snapshots = self._load()
+        self.stopped = threading.Event()
+        if start:
+            threading.Thread(target=self._run, name="jobcraft-snapshots", daemon=True).start()
+
+    def _load(self) -> dict:
+        rows = self.conn.execute("SELECT name, records, content_hash, modified_time, fetched, signature FROM snapshots").fetchall()
+        return {name: Snapshot(json.loads(records), h, mt, fetched, sig) for name, records, h, mt, fetched, sig in rows}
+
+    def _save(self, name: str, snapshot: Snapshot):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO snapshots (name, records, content_hash, modified_time, fetched, signature)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (name, json.dumps(snapshot.records, ensure_ascii=False), snapshot.content_hash,
+                 snapshot.modified_time, snapshot.fetched, snapshot.signature),
+            )
+            self.conn.commit()
+            self.snapshots[name] = snapshot
+
+    def _download(self, spreadsheet, name: str, modified_time, signature: str | None = None) -> bool:
+        """Descarga la hoja y guarda la copia; devuelve True si el contenido cambió."""
+        records = spreadsheet.worksheet(name).get_all_records()
+        self.downloads += 1
+        content_hash = fingerprint(records)
+        current = self.snapshots.get(name)
+        changed = current is None or current.content_hash != content_hash
+        if changed:
+            self.changes += 1
+            self._save(name, Snapshot(records, content_hash, modified_time, time.time(), signature))
+        else:
+            # Mismo contenido: solo se anota la fecha, para no volver a descargar hasta el próximo cambio.
+            self._save(name, Snapshot(current.records, content_hash, modified_time, time.time(), signature))
+        return changed
+
+    def get(self, name: str) -> Snapshot:
+        """Copia vigente de la hoja `name`; sin copia local, la descarga ahora.
+
+        Si esa descarga falla, el error se recuerda durante `refresh_interval` para no
+        reintentarlo en cada petición (p.ej. una hoja opcional que no existe).
+        """
+        snapshot = self.snapshots.get(name)
+        if snapshot is not None:
+            return snapshot
+        with self.fetch_lock:
+            if name in self.snapshots:
+                return self.snapshots[name]
+            failed_at, error = self.failures.get(name, (None, None))
+            if failed_at is not None and time.monotonic() - failed_at < self.refresh_interval:
+                raise error
+            try:
+                spreadsheet = self.open_spreadsheet()
+                self._download(spreadsheet, name, self._modified_time(spreadsheet), self._signatures(spreadsheet).get(name))
+            except Exception as e:
+                self.failures[name] = (time.monotonic(), e)
+                raise
+            self.failures.pop(name, None)
+            return self.snapshots[name]
+
+    def ready(self, name: str) -> bool:
+        """True si `get(name)` vuelve ya sin esperar a Sheets (hay copia, o un fallo reciente que devolver)."""
+        return name in self.snapshots or name in self.failures
+
+    def prefetch(self):
+        """Descarga en segundo plano las hojas que aún no tienen copia local (no bloquea)."""
+        if all(self.ready(n) for n in self.names) or (self.prefetcher and self.prefetcher.is_alive()):
+            return
+
+        def fetch_missing():
+            for name in self.names:
+                try:
+                    self.get(name)
+                except Exception:
+                    pass  # Queda anotado en `failures`; `get` lo devolverá a quien lo pida.
+
+        self.prefetcher = threading.Thread(target=fetch_missing, name="jobcraft-snapshots-prefetch", daemon=True)
+        self.prefetcher.start()
+
+    def _modified_time(self, spreadsheet):
+        try:
+            return spreadsheet.get_lastUpdateTime()
+        except Exception:
+            return None  # Sin acceso a Drive: se decide por hash del contenido.
+
+    def _signatures(self, spreadsheet) -> dict:
+        """{hoja: "filas x columnas"} de todo el documento con una sola petición; {} si no se puede saber."""
+        try:
+            sheets = spreadsheet.fetch_sheet_metadata().get("sheets", [])
+        except Exception:
+            return {}
+        signatures = {}
+        for sheet in sheets:
+            props = sheet.get("properties", {})
+            grid = props.get("gridProperties") or {}
+            if "rowCount" in grid:
+                signatures[props.get("title")] = f"{grid['rowCount']}x{grid.get('columnCount')}"
+        return signatures
+
+    def refresh(self) -> list[str]:
+        """Comprueba todas las hojas y devuelve las que cambiaron de contenido."""
+        self.checks += 1
+        spreadsheet = self.open_spreadsheet()
+        modified_time = self._modified_time(spreadsheet)
+        signatures = None
+        changed = []
+        for name in self.names:
+            current = self.snapshots.get(name)
+            if current is not None and modified_time is not None and current.modified_time == modified_time:
+                continue
+            # La fecha es del documento entero (la hoja de seguimiento también la mueve): antes de
+            # descargar se mira si esta hoja cambió de tamaño. La fecha no se anota al saltarla, así
+            # que una edición en el sitio se recoge en la descarga de `full_check_interval`.
+            if signatures is None:
+                signatures = self._signatures(spreadsheet)
+            signature = signatures.get(name)
+            if (current is not None and signature is not None and current.signature == signature
+                    and time.time() - current.fetched < self.full_check_interval):
+                continue
+            try:
+                if self._download(spreadsheet, name, modified_time, signature):
+                    changed.append(name)
+            except Exception as e:
+                self.last_error = f"{name}: {e}"
+        return changed
+
+    def _run(self):
+        while not self.stopped.wait(self.refresh_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                self.last_error = str(e)  # Se sigue sirviendo la última copia buena.
+
+    def close(self):
+        self.stopped.set()
+
+    def stats(self) -> dict:
+        return {
+            "sheets": {n: s.content_hash[:8] for n, s in self.snapshots.items()},
+            "checks": self.checks,
+            "downloads": self.downloads,
+            "changes": self.changes,
+            "last_error": self.last_error,
+        }
@@ -0,0 +1,107 @@
+import json
+import itertools
+
+# ---------------------------------------------------------
+# STREAMING: JSON PARCIAL Y RESPUESTAS POR TROZOS
+# ---------------------------------------------------------
+_decoder = json.JSONDecoder()
+
+
+def _skip_ws(text: str, pos: int) -> int:
+    while pos < len(text) and text[pos] in " \t\r\n":
+        pos += 1
+    return pos
+
+
+def _partial_list(text: str, pos: int) -> list:
+    """Elementos ya completos de una lista JSON que todavía no se ha cerrado (`pos` apunta tras '[')."""
+    items = []
+    while True:
+        pos = _skip_ws(text, pos)
+        if pos < len(text) and text[pos] == ",":
+            pos = _skip_ws(text, pos + 1)
+        try:
+            value, pos = _decoder.raw_decode(text, pos)
+        except ValueError:
+            return items
+        items.append(value)
+
+
+class PartialJsonParser:
+    """Extrae los campos de un objeto JSON a medida que llega por trozos.
+
+    `feed` devuelve los campos completos hasta el momento; una lista a medio recibir
+    aparece con los elementos que ya están cerrados. Los campos terminados no se
+    vuelven a analizar en cada trozo.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.pos = None        # posición tras el último campo completo
+        self.fields = {}
+
+    def feed(self, chunk: str) -> dict:
+        self.text += chunk
+        if self.pos is None:
+            start = self.text.find("{")
+            if start < 0:
+                return {}
+            self.pos = start + 1
+
+        partial = {}
+        while True:
+            pos = _skip_ws(self.text, self.pos)
+            if pos < len(self.text) and self.text[pos] == ",":
+                pos = _skip_ws(self.text, pos + 1)
+            try:
+                key, pos = _decoder.raw_decode(self.text, pos)
+                pos = _skip_ws(self.text, pos)
+                if not isinstance(key, str) or self.text[pos:pos + 1] != ":":
+                    break
+                pos = _skip_ws(self.text, pos + 1)
+            except ValueError:
+                break
+            try:
+                value, pos = _decoder.raw_decode(self.text, pos)
+            except ValueError:
+                if self.text[pos:pos + 1] == "[":
+                    partial[key] = _partial_list(self.text, pos + 1)
+                break
+            if pos >= len(self.text) and not isinstance(value, (str, list, dict)):
+                break  # un número o literal al final del texto puede seguir creciendo
+            self.fields[key] = value
+            self.pos = pos
+        return {**self.fields, **partial}
+
+
+class StreamedResponse:
+    """Respuesta ya consumida de `generate_content_stream`, con la misma interfaz que la normal."""
+
+    def __init__(self, text: str, usage_metadata=None):
+        self.text = text
+        self.usage_metadata = usage_metadata
+
+
+def open_stream(stream_fn, **kwargs):
+    """Abre el stream y espera el primer trozo, para que los errores de cuota salten aquí (y se reintenten)."""
+    chunks = iter(stream_fn(**kwargs))
+    first = next(chunks, None)
+    return itertools.chain([first] if first is not None else [], chunks)
+
+
+def collect_json_stream(chunks, on_partial=None) -> StreamedResponse:
+    """Consume un stream de JSON llamando a `on_partial(campos)` cada vez que se completa algo nuevo."""
+    parser = PartialJsonParser()
+    parts, usage, last_seen = [], None, None
+    for chunk in chunks:
+        usage = getattr(chunk, "usage_metadata", None) or usage
+        text = getattr(chunk, "text", None)
+        if not text:
+            continue
+        parts.append(text)
+        fields = parser.feed(text)
+        snapshot = json.dumps(fields, ensure_ascii=False, sort_keys=True)
+        if on_partial and fields and snapshot != last_seen:
+            last_seen = snapshot
+            on_partial(fields)
+    return StreamedResponse("".join(parts), usage)
@@ -0,0 +1,152 @@
+import os
+import json
+import time
+import atexit
+import threading
+import contextlib
+from collections import deque
+
+from jobcraft_cache import DATA_DIR
+from jobcraft_ratelimit import RateLimitScheduler, CircuitOpenError, is_retryable
+
+# ---------------------------------------------------------
+# COLA DE ESCRITURA DIFERIDA PARA LA HOJA DE SEGUIMIENTO
+# ---------------------------------------------------------
+SPOOL_FILE = os.path.join(DATA_DIR, "tracking_spool.jsonl")
+# Se envía en cuanto hay este número de filas o la más antigua lleva este tiempo esperando.
+BATCH_SIZE = 50
+FLUSH_INTERVAL = 10.0
+# Cuota de escritura de Sheets: 60 peticiones por minuto y usuario; dejamos margen.
+SHEETS_WRITE_RPM = 50
+# Tras agotar los reintentos (o con el circuito abierto) se espera esto antes de volver a probar.
+RETRY_PAUSE = 30.0
+
+
+class TrackingQueue:
+    """Acumula las filas de seguimiento y las envía por lotes con `append_rows` desde un hilo aparte.
+
+    `open_worksheet()` devuelve la hoja de destino; se llama una sola vez y el objeto
+    se reutiliza para todas las sesiones (se vuelve a abrir solo si falla). Cada fila
+    se anota antes en un archivo local (`spool_path`) que se reescribe al confirmar el
+    envío: si la app se reinicia, las filas pendientes se cargan y se envían al arrancar.
+    La entrega es "al menos una vez": un corte justo tras un envío puede duplicar ese lote.
+    """
+
+    def __init__(self, open_worksheet, spool_path: str = SPOOL_FILE, batch_size: int = BATCH_SIZE,
+                 flush_interval: float = FLUSH_INTERVAL, scheduler: RateLimitScheduler | None = None, metrics=None):
+        self.open_worksheet = open_worksheet
+        self.spool_path = spool_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.scheduler = scheduler or RateLimitScheduler(rpm=SHEETS_WRITE_RPM, max_retries=4, max_delay=30.0)
+        self.metrics = metrics   # `Metrics` opcional: cada envío se registra como etapa "tracking_send"
+        self.worksheet = None
+        self.rows = deque(self._load_spool())
+        self.oldest = time.monotonic() if self.rows else None
+        self.sent = 0
+        self.batches = 0
+        self.last_error = None
+        self.lock = threading.Lock()
+        self.sending = threading.Lock()   # un solo envío a la vez (hilo de fondo o cierre)
+        self.wakeup = threading.Event()
+        self.stopped = False
+        self.thread = threading.Thread(target=self._run, name="jobcraft-tracking", daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def _load_spool(self) -> list:
+        if not os.path.exists(self.spool_path):
+            return []
+        rows = []
+        with open(self.spool_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rows.append(json.loads(line))
+                except ValueError:
+                    pass  # Línea cortada por un cierre brusco.
+        return rows
+
+    def _rewrite_spool(self):
+        tmp_path = f"{self.spool_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in self.rows))
+        os.replace(tmp_path, self.spool_path)
+
+    def enqueue(self, row: list):
+        """Registra una fila; vuelve al instante (el envío lo hace el hilo de fondo)."""
+        with self.lock:
+            if os.path.dirname(self.spool_path):
+                os.makedirs(os.path.dirname(self.spool_path), exist_ok=True)
+            with open(self.spool_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+            self.rows.append(row)
+            if self.oldest is None:
+                self.oldest = time.monotonic()
+            if len(self.rows) >= self.batch_size:
+                self.wakeup.set()
+
+    def _due(self) -> bool:
+        return bool(self.rows) and (
+            len(self.rows) >= self.batch_size or time.monotonic() - self.oldest >= self.flush_interval
+        )
+
+    def _send(self, batch: list):
+        if self.worksheet is None:
+            self.worksheet = self.open_worksheet()
+        try:
+            with self.metrics.stage("tracking_send", rows=len(batch)) if self.metrics else contextlib.nullcontext():
+                # RAW, como el `append_row` original: el título lo escribe el usuario y no debe interpretarse como fórmula o fecha.
+                self.scheduler.call(self.worksheet.append_rows, batch, value_input_option="RAW", estimated_tokens=1)
+        except Exception as e:
+            if not is_retryable(e) and not isinstance(e, CircuitOpenError):
+                self.worksheet = None  # Credenciales caducadas u hoja movida: se reabre en el siguiente intento.
+            raise
+
+    def flush(self, timeout: float = -1) -> bool:
+        """Envía todo lo pendiente en lotes de `batch_size`. Devuelve False si algo quedó sin enviar."""
+        if not self.sending.acquire(timeout=timeout):
+            return False
+        try:
+            return self._flush_all()
+        finally:
+            self.sending.release()
+
+    def _flush_all(self) -> bool:
+        while True:
+            with self.lock:
+                batch = [self.rows[i] for i in range(min(self.batch_size, len(self.rows)))]
+            if not batch:
+                return True
+            try:
+                self._send(batch)
+            except Exception as e:
+                self.last_error = str(e)
+                return False
+            with self.lock:
+                for _ in batch:
+                    self.rows.popleft()
+                self.oldest = time.monotonic() if self.rows else None
+                self._rewrite_spool()
+                self.sent += len(batch)
+                self.batches += 1
+                self.last_error = None
+
+    def _run(self):
+        while not self.stopped:
+            self.wakeup.wait(timeout=1.0)
+            self.wakeup.clear()
+            if self._due() and not self.flush():
+                self.wakeup.wait(timeout=RETRY_PAUSE)
+
+    def close(self):
+        """Último intento de envío al salir; lo que falle sigue en el archivo local."""
+        if self.stopped:
+            return
+        self.stopped = True
+        self.wakeup.set()
+        self.thread.join(timeout=5.0)
+        self.flush(timeout=5.0)
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {"pending": len(self.rows), "sent": self.sent, "batches": self.batches, "last_error": self.last_error}
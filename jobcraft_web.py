@@ -1,16 +1,24 @@
 import time
+import functools
 import os
+import uuid
+import threading
 import streamlit as st
-import pandas as pd
-from google import genai
-from google.genai import types
-from pydantic import BaseModel, Field
-import gspread 
-import json 
-import io 
-from docx import Document 
-from docx.shared import Pt 
-from fpdf import FPDF 
+from pydantic import BaseModel, Field, ValidationError
+import io
+from jobcraft_ratelimit import RateLimitScheduler, CircuitOpenError, estimate_tokens, is_retryable
+from jobcraft_cache import ResultCache, fingerprint
+from jobcraft_matching import CatalogIndex, CatalogMatch, CompetencyIndex, format_candidates
+from jobcraft_context_cache import ContextCache
+from jobcraft_streaming import collect_json_stream, open_stream
+from jobcraft_tracking import TrackingQueue
+from jobcraft_clients import REGISTRY
+from jobcraft_snapshot import SheetSnapshots
+from jobcraft_repair import parse_model_output, reask_missing
+from jobcraft_metrics import Metrics
+from jobcraft_jobs import BulkQueue, BulkJob
+from jobcraft_routing import ModelRouter, RouteDecision
+from jobcraft_profiles import ProfileStore
 
 # ---------------------------------------------------------
 # 1. ESQUEMA DE DATOS (V4)
@@ -30,92 +38,380 @@ class JobDescriptionV4(BaseModel):
 
 GOOGLE_SHEET_ID = "1QPJ1JoCW7XO-6sf-WMz8SvAtylKTAShuMr_yGBoF-Xg" 
 
+MODEL_NAME = 'gemini-2.5-flash'
+# Subir esta versión cada vez que cambie el prompt (invalida la caché de resultados).
+PROMPT_VERSION = "web-v4.5"
+
 # ---------------------------------------------------------
 # 2. CONEXIÓN A SHEETS
 # ---------------------------------------------------------
-def get_google_sheet_client():
-    creds = st.secrets["gspread"]["gcp_service_account_credentials"]
-    gc = gspread.service_account_from_dict(creds)
-    return gc.open_by_key(GOOGLE_SHEET_ID)
+DICCIONARIO_SHEET = "Diccionario_JobCraft"
+PERFILES_SHEET = "Perfiles_Base_JobCraft"
+
+# Copia local de las hojas de referencia: arranque instantáneo y refresco en segundo plano solo si cambian.
+@st.cache_resource
+def get_sheet_snapshots():
+    creds = dict(st.secrets["gspread"]["gcp_service_account_credentials"])
+    return SheetSnapshots(functools.partial(REGISTRY.spreadsheet, creds, GOOGLE_SHEET_ID), [DICCIONARIO_SHEET, PERFILES_SHEET])
+
+# Los índices se construyen una vez por contenido de la hoja (hash) y los comparten todas las sesiones.
+@st.cache_resource(max_entries=2)
+def build_competency_index(content_hash: str, _records: list):
+    return CompetencyIndex(_records)
+
+@st.cache_resource(max_entries=2)
+def build_catalog_index(content_hash: str, _records: list):
+    return CatalogIndex(_records)
 
-@st.cache_data(ttl=3600)
-def get_competencias(worksheet_name: str = "Diccionario_JobCraft"):
+def get_competencias(worksheet_name: str = DICCIONARIO_SHEET):
     try:
-        sh = get_google_sheet_client()
-        worksheet = sh.worksheet(worksheet_name)
-        return pd.DataFrame(worksheet.get_all_records()), None
+        snapshot = get_sheet_snapshots().get(worksheet_name)
+        return build_competency_index(snapshot.content_hash, snapshot.records), None
     except Exception as e:
         return None, f"Error cargando Diccionario: {e}"
 
-@st.cache_data(ttl=3600)
-def get_perfiles_estandar(worksheet_name: str = "Perfiles_Base_JobCraft"):
+def get_perfiles_estandar(worksheet_name: str = PERFILES_SHEET):
     try:
-        sh = get_google_sheet_client()
-        worksheet = sh.worksheet(worksheet_name)
-        data = worksheet.get_all_records()
-        lista_formateada = [f"{row['Cargo']} ({row.get('Nivel', 'N/A')})" for row in data]
-        return "\n".join(lista_formateada), None
+        snapshot = get_sheet_snapshots().get(worksheet_name)
+        return build_catalog_index(snapshot.content_hash, snapshot.records), None
     except Exception as e:
-        return "", f"Nota: No se encontró hoja de perfiles base ({e}). Se generará libremente."
+        return CatalogIndex([]), f"Nota: No se encontró hoja de perfiles base ({e}). Se generará libremente."
 
 # ---------------------------------------------------------
 # 3. CEREBRO DE LA IA
 # ---------------------------------------------------------
-def run_jobcraft_ai(api_key: str, title: str, level: str, critical_skill: str, competencias_df: pd.DataFrame, lista_perfiles_base: str):
-    max_retries = 3
-    for attempt in range(max_retries):
-        try:
-            client = genai.Client(api_key=api_key)
-            
-            lista_competencias = "\n".join([
-                f"- {row['Familia']}: {row['COREES_Definición_Core_N1_Inicial']}" 
-                for index, row in competencias_df.iterrows()
-            ])
-            
-            prompt = f"""
-            Actúa como Director de Estructura Organizacional.
-            Objetivo: Definir perfil para: '{title}' (Nivel: {level}).
-            Habilidad Crítica: {critical_skill}
-            
-            --- CATÁLOGO OFICIAL DE PUESTOS ---
-            {lista_perfiles_base}
-            -----------------------------------
-            
-            INSTRUCCIONES DE ESTANDARIZACIÓN (HÍBRIDA):
-            1. Busca en el CATÁLOGO OFICIAL si existe un puesto equivalente.
-            2. SI ENCUENTRAS COINCIDENCIA:
-               - 'titulo_puesto': Mantén el nombre que pidió el usuario.
-               - 'titulo_oficial_match': Pon el nombre oficial del catálogo.
-               - 'origen_titulo': "ESTANDARIZADO".
-               - 'observacion_ia': "Este puesto es equivalente a [Titulo Oficial] en el Catálogo Maestro".
-            3. SI NO HAY COINCIDENCIA:
-               - 'titulo_puesto': El solicitado por el usuario.
-               - 'titulo_oficial_match': "N/A"
-               - 'origen_titulo': "NUEVO".
-            
-            INSTRUCCIONES DE CONTENIDO:
-            4. Usa las competencias del diccionario adjunto.
-            5. Genera Misión, Responsabilidades y KPIs profesionales.
-            
-            Genera JSON estricto.
-            """
-            
-            config = types.GenerateContentConfig(response_mime_type="application/json", response_schema=JobDescriptionV4)
-            response = client.models.generate_content(model='gemini-2.5-flash', contents=prompt, config=config)
-            return None, JobDescriptionV4(**json.loads(response.text))
-            
-        except Exception as e:
-            if "503" in str(e) or "overloaded" in str(e).lower() or "429" in str(e):
-                time.sleep(2)
-                continue 
-            else:
-                return f"Error AI: {e}", None
+@st.cache_resource
+def get_rate_limiter():
+    # Un único planificador por proceso: todas las sesiones comparten la cuota de Gemini.
+    return RateLimitScheduler(max_retries=4, max_delay=20.0)
+
+@st.cache_resource
+def get_result_cache():
+    return ResultCache()
+
+@st.cache_resource
+def get_metrics():
+    # Tiempos por etapa, tokens y coste de todas las sesiones (.jobcraft/metrics.jsonl y metrics_web.prom).
+    return Metrics("web")
+
+@st.cache_resource
+def get_profile_store():
+    # Historial de perfiles generados (.jobcraft/profiles.sqlite), buscable y compartido por todas las sesiones.
+    return ProfileStore(JobDescriptionV4)
+
+@st.cache_resource
+def get_router():
+    # Rutas por modelo (JOBCRAFT_ROUTES) y sus estadísticas de latencia y validación, para todas las sesiones.
+    return ModelRouter()
+
+@st.cache_resource
+def get_context_cache():
+    # Caché de contexto de Gemini para el prefijo estable de la ruta completa, compartido por todas las sesiones.
+    return ContextCache(get_router().routes["full"].model)
+
+# Perfil de ejemplo del prefijo cacheado: fija tono y extensión de cada campo. Con él y el
+# diccionario completo el prefijo supera el mínimo del caché de contexto (MIN_CACHE_TOKENS).
+FEW_SHOT_EXAMPLE = JobDescriptionV4(
+    titulo_puesto="Analista de Compras",
+    nivel="Semi-Senior (3-5 años)",
+    titulo_oficial_match="Analista de Abastecimiento",
+    origen_titulo="ESTANDARIZADO",
+    mision_puesto=(
+        "Asegurar el abastecimiento de bienes y servicios en plazo, calidad y coste, gestionando proveedores "
+        "y negociaciones de la categoría asignada con criterios de eficiencia y cumplimiento normativo."
+    ),
+    responsabilidades_clave=[
+        "Gestionar el ciclo completo de compra de la categoría: solicitud, cotización, adjudicación y seguimiento.",
+        "Negociar precios, plazos y condiciones con proveedores, documentando los ahorros obtenidos.",
+        "Evaluar periódicamente a los proveedores (calidad, entregas, servicio) y proponer planes de mejora.",
+        "Coordinar con Almacén y Finanzas la planificación de necesidades y la conciliación de facturas.",
+        "Mantener actualizado el maestro de proveedores y los contratos marco en el ERP.",
+        "Detectar riesgos de suministro y proponer proveedores alternativos.",
+    ],
+    competencias_conductuales_seleccionadas=["Orientación a Resultados", "Negociación", "Planificación y Organización", "Trabajo en Equipo"],
+    competencias_tecnicas=["ERP (SAP MM u Oracle)", "Excel avanzado", "Análisis de costes", "Gestión de contratos"],
+    requisitos_formacion=["Grado en Administración de Empresas, Ingeniería Industrial o afín", "Formación en gestión de compras (deseable)"],
+    kpis_sugeridos=["Ahorro sobre precio de referencia (%)", "Entregas a tiempo de proveedores (%)", "Plazo medio de adjudicación (días)", "Incidencias de calidad por proveedor"],
+    observacion_ia="Este puesto es equivalente a Analista de Abastecimiento en el Catálogo Maestro",
+)
+
+INSTRUCCIONES_ESTANDARIZACION = """
+        INSTRUCCIONES DE ESTANDARIZACIÓN (HÍBRIDA):
+        1. Busca entre los CANDIDATOS DEL CATÁLOGO OFICIAL si alguno es realmente equivalente.
+        2. SI ENCUENTRAS COINCIDENCIA:
+           - 'titulo_puesto': Mantén el nombre que pidió el usuario.
+           - 'titulo_oficial_match': Pon el nombre oficial del catálogo.
+           - 'origen_titulo': "ESTANDARIZADO".
+           - 'observacion_ia': "Este puesto es equivalente a [Titulo Oficial] en el Catálogo Maestro".
+        3. SI NO HAY COINCIDENCIA:
+           - 'titulo_puesto': El solicitado por el usuario.
+           - 'titulo_oficial_match': "N/A"
+           - 'origen_titulo': "NUEVO".
+        """
 
-    return "El servidor de IA está muy ocupado. Por favor intenta en unos segundos.", None
+def build_system_instruction(diccionario: CompetencyIndex) -> str:
+    # Prefijo estable del prompt: no depende del cargo pedido, solo del diccionario oficial.
+    return f"""
+        Actúa como Director de Estructura Organizacional.
+        Recibirás un cargo, su nivel, su habilidad crítica, los CANDIDATOS DEL CATÁLOGO OFICIAL
+        preseleccionados para ese cargo y las COMPETENCIAS DEL DICCIONARIO OFICIAL más afines.
+        {INSTRUCCIONES_ESTANDARIZACION}
+        INSTRUCCIONES DE CONTENIDO:
+        4. 'competencias_conductuales_seleccionadas': elige 4-5 SOLO de las COMPETENCIAS DEL DICCIONARIO OFICIAL, usando el nombre exacto de su Familia.
+        5. Genera Misión, Responsabilidades y KPIs profesionales.
+        
+        FAMILIAS DE COMPETENCIAS OFICIALES: {diccionario.families}
+        
+        Genera JSON estricto.
+        """
+
+def build_cached_system_instruction(diccionario: CompetencyIndex) -> str:
+    # Prefijo para el caché de contexto: lleva el diccionario completo y un ejemplo de salida,
+    # que solo compensan a precio de caché; el prompt de cada cargo solo nombra las familias más afines.
+    lista_diccionario = "\n".join(diccionario.lines)
+    return f"""
+        Actúa como Director de Estructura Organizacional.
+        Recibirás un cargo, su nivel, su habilidad crítica, los CANDIDATOS DEL CATÁLOGO OFICIAL
+        preseleccionados para ese cargo y las familias del DICCIONARIO OFICIAL más afines.
+        {INSTRUCCIONES_ESTANDARIZACION}
+        INSTRUCCIONES DE CONTENIDO:
+        4. 'competencias_conductuales_seleccionadas': elige 4-5 SOLO del DICCIONARIO OFICIAL, usando el nombre exacto de su Familia
+           (da prioridad a las familias más afines que se indiquen para el cargo).
+        5. Genera Misión, Responsabilidades y KPIs profesionales.
+        
+        --- DICCIONARIO OFICIAL DE COMPETENCIAS (Familia: definición) ---
+        {lista_diccionario}
+        -----------------------------------
+        
+        EJEMPLO DE SALIDA (referencia de tono y extensión; no copies su contenido):
+        {FEW_SHOT_EXAMPLE.model_dump_json()}
+        
+        Genera JSON estricto.
+        """
+
+def build_prompt(title: str, level: str, critical_skill: str, diccionario: CompetencyIndex, candidatos: list[CatalogMatch],
+                 cached: bool = False) -> str:
+    # Parte variable del prompt (solo lo que depende del cargo pedido).
+    
+    # Solo viajan al prompt los pocos puestos oficiales que el índice local considera parecidos.
+    if candidatos:
+        bloque_catalogo = format_candidates(candidatos)
+    else:
+        bloque_catalogo = "(Ningún puesto del catálogo se parece a este cargo: trátalo como NUEVO.)"
+    
+    if cached:
+        # Con el prefijo cacheado las definiciones ya están en el diccionario completo: basta con nombrar las más afines.
+        familias = ", ".join(diccionario.items[i].familia for i in diccionario.top_k(title, critical_skill))
+        bloque_competencias = f"Familias del diccionario más afines: {familias}"
+    else:
+        # Solo las competencias más afines al cargo, ya formateadas al cargar el diccionario.
+        bloque_competencias = f"""--- COMPETENCIAS DEL DICCIONARIO OFICIAL ---
+        {diccionario.as_prompt(title, critical_skill)}
+        -----------------------------------"""
+    
+    return f"""
+        Objetivo: Definir perfil para: '{title}' (Nivel: {level}).
+        Habilidad Crítica: {critical_skill}
+        
+        --- CANDIDATOS DEL CATÁLOGO OFICIAL DE PUESTOS ---
+        {bloque_catalogo}
+        -----------------------------------
+        
+        {bloque_competencias}
+        """
+
+# Plantilla corta (ruta rápida): el índice ya encontró el puesto oficial, solo hay que adaptarlo.
+SHORT_SYSTEM_INSTRUCTION = """
+        Actúa como Director de Estructura Organizacional.
+        Recibirás un cargo, su nivel, su habilidad crítica y el PUESTO OFICIAL EQUIVALENTE del catálogo.
+        - 'titulo_puesto': el nombre que pidió el usuario. 'titulo_oficial_match': el puesto oficial. 'origen_titulo': "ESTANDARIZADO".
+        - 'observacion_ia': "Este puesto es equivalente a [Titulo Oficial] en el Catálogo Maestro".
+        - 'competencias_conductuales_seleccionadas': 4-5 SOLO de las competencias dadas, con el nombre exacto de su Familia.
+        - Misión, 5-7 responsabilidades y KPIs profesionales.
+        Genera JSON estricto.
+        """
+# Competencias que viajan en la plantilla corta (la completa lleva las 8 más afines).
+SHORT_COMPETENCIES = 5
+
+def build_short_prompt(title: str, level: str, critical_skill: str, diccionario: CompetencyIndex, match: CatalogMatch) -> str:
+    return f"""
+        Objetivo: Definir perfil para: '{title}' (Nivel: {level}).
+        Habilidad Crítica: {critical_skill}
+        Puesto oficial equivalente: {match.cargo} ({match.nivel})
+        
+        --- COMPETENCIAS DEL DICCIONARIO OFICIAL ---
+        {diccionario.as_prompt(title, critical_skill, k=SHORT_COMPETENCIES)}
+        -----------------------------------
+        """
+
+# Plantilla de adaptación (ruta "adapt"): se parte de un perfil parecido del historial.
+ADAPT_SYSTEM_INSTRUCTION = """
+        Actúa como Director de Estructura Organizacional.
+        Recibirás un cargo, su nivel, su habilidad crítica y un PERFIL YA APROBADO de un puesto parecido.
+        Adapta ese perfil al cargo pedido: conserva lo que siga valiendo y cambia lo que dependa del cargo, el nivel o la habilidad.
+        - 'titulo_puesto': el nombre que pidió el usuario. 'nivel': el nivel pedido.
+        - Mantén 'titulo_oficial_match' y 'origen_titulo' del perfil base salvo que ya no sean equivalentes
+          (entonces 'titulo_oficial_match': "N/A" y 'origen_titulo': "NUEVO").
+        - 'competencias_conductuales_seleccionadas': 4-5 SOLO de las competencias dadas, con el nombre exacto de su Familia.
+        Genera JSON estricto.
+        """
+
+def build_adapt_prompt(title: str, level: str, critical_skill: str, diccionario: CompetencyIndex, base: JobDescriptionV4) -> str:
+    return f"""
+        Objetivo: Definir perfil para: '{title}' (Nivel: {level}).
+        Habilidad Crítica: {critical_skill}
+        
+        --- PERFIL BASE (YA APROBADO) ---
+        {base.model_dump_json()}
+        -----------------------------------
+        
+        --- COMPETENCIAS DEL DICCIONARIO OFICIAL ---
+        {diccionario.as_prompt(title, critical_skill, k=SHORT_COMPETENCIES)}
+        -----------------------------------
+        """
+
+def run_jobcraft_ai(api_key: str, title: str, level: str, critical_skill: str, diccionario: CompetencyIndex, catalogo: CatalogIndex, on_partial=None):
+    # on_partial(campos): si se indica, la respuesta llega en streaming y se avisa cada vez que se completa un campo.
+    return generate_profile(
+        api_key, title, level, critical_skill, diccionario, catalogo, on_partial=on_partial,
+        cache=get_result_cache(), context_cache=get_context_cache(), scheduler=get_rate_limiter(), metrics=get_metrics(),
+        router=get_router(), store=get_profile_store(),
+    )
+
+def generate_profile(api_key: str, title: str, level: str, critical_skill: str, diccionario: CompetencyIndex, catalogo: CatalogIndex,
+                     cache: ResultCache, context_cache: ContextCache, scheduler: RateLimitScheduler, metrics: Metrics,
+                     router: ModelRouter, store: ProfileStore, on_partial=None):
+    # Igual que run_jobcraft_ai pero con los recursos compartidos ya resueltos: no usa st.*,
+    # así que puede correr en los hilos de la cola de lotes, fuera de cualquier sesión.
+    # Huella del diccionario + catálogo: si cambian las hojas, la caché deja de coincidir.
+    t0 = time.perf_counter()
+    contexto = fingerprint(diccionario.fingerprint, catalogo.fingerprint)
+    # Con qué se generaría ahora por la ruta completa: solo se reutiliza tal cual un perfil del historial generado así.
+    huella = fingerprint(PROMPT_VERSION, router.routes["full"].model, contexto)
+
+    def result_key(ruta: RouteDecision) -> str:
+        # La caché de resultados va por ruta (modelo + plantilla): un perfil de una ruta ligera
+        # nunca se sirve después como si lo hubiera generado la completa.
+        return ResultCache.make_key(title, level, critical_skill, ruta.config.model, PROMPT_VERSION,
+                                    fingerprint(contexto, ruta.config.template))
+
+    try:
+        # La ruta se decide antes de llamar: perfil casi igual en el historial -> se reutiliza; parecido -> se adapta;
+        # coincidencia clara con el catálogo y petición corta -> modelo y prompt ligeros; si no, la ruta completa.
+        with metrics.stage("profile_lookup"):
+            similares = store.closest(title, level, critical_skill, limit=1)
+        parecido = similares[0] if similares else None
+        candidatos = catalogo.search(title, level)
+        ruta = router.classify(title, level, critical_skill, candidatos, similar=parecido, context=huella)
+        if ruta.route == "reuse":
+            res = store.get(parecido.id).model_copy(update={"titulo_puesto": title, "nivel": level})
+            store.mark_reused(parecido.id)
+            router.record("reuse", time.perf_counter() - t0)
+            return None, res
+
+        cached = cache.get(result_key(ruta), JobDescriptionV4)
+        if cached is not None:
+            metrics.count("result_cache_hit")
+            router.record("cache", time.perf_counter() - t0)
+            return None, cached
+        metrics.count("result_cache_miss")
+
+        client = REGISTRY.genai(api_key)
+        base = store.get(parecido.id) if ruta.route == "adapt" else None
+        t0 = time.perf_counter()
+        try:
+            res = generate_on_route(client, ruta, title, level, critical_skill, diccionario, candidatos,
+                                    context_cache, scheduler, metrics, on_partial, base=base)
+            router.record(ruta.route, time.perf_counter() - t0)
+        except ValidationError:
+            router.record(ruta.route, time.perf_counter() - t0, valid=False)
+            if ruta.route == "full":
+                raise
+            # La ruta ligera no dio un perfil válido: se repite por la completa (con repregunta).
+            ruta, t0 = RouteDecision("full", router.routes["full"], "fallback"), time.perf_counter()
+            res = generate_on_route(client, ruta, title, level, critical_skill, diccionario, candidatos,
+                                    context_cache, scheduler, metrics, on_partial)
+            router.record("full", time.perf_counter() - t0, fallback=True)
+        if not candidatos:
+            # El índice ya decidió que no hay equivalente: no aceptamos un match inventado.
+            res.origen_titulo = "NUEVO"
+            res.titulo_oficial_match = "N/A"
+        # Se guarda con la ruta que lo generó de verdad (tras un fallback, la completa).
+        cache.put(result_key(ruta), res)
+        try:
+            store.add(title, level, critical_skill, res, route=ruta.route,
+                      context=fingerprint(PROMPT_VERSION, ruta.config.model, contexto))
+        except Exception:
+            pass  # El historial nunca debe hacer fallar una generación.
+        return None, res
+        
+    except CircuitOpenError:
+        return "El servidor de IA está muy ocupado. Por favor intenta en unos segundos.", None
+    except Exception as e:
+        if is_retryable(e):
+            return "El servidor de IA está muy ocupado. Por favor intenta en unos segundos.", None
+        return f"Error AI: {e}", None
+
+def generate_on_route(client, ruta: RouteDecision, title: str, level: str, critical_skill: str, diccionario: CompetencyIndex,
+                      candidatos: list[CatalogMatch], context_cache: ContextCache, scheduler: RateLimitScheduler, metrics: Metrics,
+                      on_partial=None, base: JobDescriptionV4 | None = None):
+    # Un intento completo por la ruta indicada: prompt, llamada y validación. Lanza ValidationError si la salida no vale.
+    from google.genai import types
+
+    modelo = ruta.config.model
+    plantilla = ruta.config.template
+    if (plantilla == "short" and not candidatos) or (plantilla == "adapt" and base is None):
+        plantilla = "full"
+    with metrics.stage("prompt_build", route=ruta.route):
+        if plantilla == "adapt":
+            prompt = build_adapt_prompt(title, level, critical_skill, diccionario, base)
+            system_instruction = ADAPT_SYSTEM_INSTRUCTION
+        elif plantilla == "short":
+            prompt = build_short_prompt(title, level, critical_skill, diccionario, candidatos[0])
+            system_instruction = SHORT_SYSTEM_INSTRUCTION
+        else:
+            prompt = build_prompt(title, level, critical_skill, diccionario, candidatos)
+            system_instruction = build_system_instruction(diccionario)
+
+    config = {"response_mime_type": "application/json", "response_schema": JobDescriptionV4}
+    if ruta.config.max_output_tokens:
+        config["max_output_tokens"] = ruta.config.max_output_tokens
+    stream_handler = (lambda chunks: collect_json_stream(chunks, on_partial)) if on_partial else None
+    llamada = functools.partial(metrics.measured_call(scheduler.call, modelo, route=ruta.route),
+                                estimated_tokens=estimate_tokens(system_instruction + prompt))
+    if modelo == context_cache.model and plantilla == "full":
+        # El prefijo ampliado (diccionario completo + ejemplo) solo se envía si hay caché de contexto.
+        response = context_cache.generate(
+            client, build_prompt(title, level, critical_skill, diccionario, candidatos, cached=True),
+            build_cached_system_instruction(diccionario), key=fingerprint(PROMPT_VERSION, diccionario.fingerprint),
+            call=llamada, stream_handler=stream_handler, uncached=(prompt, system_instruction), **config,
+        )
+    else:
+        # Las plantillas ligeras y otros modelos van sin caché de contexto (es por modelo y por prefijo).
+        generate = client.models.generate_content
+        if stream_handler is not None:
+            generate = lambda **kw: stream_handler(open_stream(client.models.generate_content_stream, **kw))
+        response = llamada(generate, model=modelo, contents=prompt,
+                           config=types.GenerateContentConfig(system_instruction=system_instruction, **config))
+
+    defaults = {"titulo_puesto": title, "nivel": level, "titulo_oficial_match": "N/A", "origen_titulo": "NUEVO", "observacion_ia": ""}
+    reask = None
+    if plantilla == "short":
+        # Las rutas ligeras no repreguntan: si no validan, se repite por la completa.
+        defaults.update(titulo_oficial_match=candidatos[0].cargo, origen_titulo="ESTANDARIZADO")
+    elif plantilla == "adapt":
+        defaults.update(titulo_oficial_match=base.titulo_oficial_match, origen_titulo=base.origen_titulo)
+    else:
+        # Reparación local de la salida; si faltan campos de contenido se piden solo esos.
+        repregunta = metrics.measured_call(scheduler.call, modelo, stage="model_reask", route=ruta.route)
+        reask = lambda missing, partial: reask_missing(client, modelo, repregunta, JobDescriptionV4, missing, partial, prompt)
+    with metrics.stage("validation", route=ruta.route):
+        return parse_model_output(response.text, JobDescriptionV4, defaults=defaults, reask=reask)
 
 def generate_linkedin_post(api_key: str, job_data: JobDescriptionV4):
+    # Generador de trozos de texto: el post se va mostrando mientras el modelo lo escribe.
     try:
-        client = genai.Client(api_key=api_key)
+        client = REGISTRY.genai(api_key)
         prompt = f"""
         Escribe un POST DE LINKEDIN viral para:
         - Título: {job_data.titulo_puesto} ({job_data.nivel})
@@ -124,272 +420,530 @@ def generate_linkedin_post(api_key: str, job_data: JobDescriptionV4):
         
         Usa Emojis, estructura AIDA y hashtags.
         """
-        response = client.models.generate_content(model='gemini-2.5-flash', contents=prompt)
-        return response.text
+        llamada = get_metrics().measured_stream(get_rate_limiter().call, MODEL_NAME, stage="model_call_linkedin")
+        chunks = llamada(
+            open_stream, client.models.generate_content_stream,
+            model=MODEL_NAME, contents=prompt,
+            estimated_tokens=estimate_tokens(prompt, expected_output=500),
+        )
+        for chunk in chunks:
+            if chunk.text:
+                yield chunk.text
     except Exception as e:
-        return f"No se pudo generar el post: {e}"
+        yield f"No se pudo generar el post: {e}"
+
+@st.cache_resource
+def get_export_cache():
+    # Exportaciones memorizadas por contenido y compartidas entre sesiones.
+    # python-docx y fpdf se cargan aquí, con el primer perfil, y no al arrancar la app.
+    from jobcraft_exports import ExportCache
+    return ExportCache()
 
 # ---------------------------------------------------------
-# 4. GENERADORES DE ARCHIVOS (Word, PDF, TXT, CSV)
+# 4. GUARDAR DATOS
 # ---------------------------------------------------------
+def open_tracking_worksheet(creds: dict):
+    # Se llama desde el hilo de la cola: no puede usar st.*, por eso recibe las credenciales ya leídas.
+    return REGISTRY.spreadsheet(creds, GOOGLE_SHEET_ID).worksheet("Seguimiento Generaciones")
 
-# --- A. Generador de WORD ---
-def create_docx(res):
-    doc = Document()
-    doc.add_heading(res.titulo_puesto, 0)
-    p = doc.add_paragraph()
-    p.add_run("Nivel: ").bold = True
-    p.add_run(f"{getattr(res, 'nivel', 'N/A')}\n")
-    p.add_run("Misión del Cargo: ").bold = True
-    p.add_run(f"{res.mision_puesto}")
-
-    def add_section(title, items):
-        doc.add_heading(title, level=1)
-        if items:
-            for item in items:
-                doc.add_paragraph(item, style='List Bullet')
-    
-    add_section("Responsabilidades Clave", res.responsabilidades_clave)
-    add_section("Competencias Conductuales", res.competencias_conductuales_seleccionadas)
-    add_section("Requisitos Técnicos", res.competencias_tecnicas)
-    add_section("Formación", res.requisitos_formacion)
-    add_section("KPIs Sugeridos", res.kpis_sugeridos)
-    
-    buffer = io.BytesIO()
-    doc.save(buffer)
-    buffer.seek(0)
-    return buffer
-
-# --- B. Generador de PDF ---
-class PDF(FPDF):
-    def header(self):
-        self.set_font('Arial', 'B', 15)
-        self.cell(0, 10, 'Perfil de Puesto - JobCraft AI', 0, 1, 'C')
-        self.ln(5)
-
-def clean_text_for_pdf(text):
-    return text.encode('latin-1', 'replace').decode('latin-1')
-
-def create_pdf(res):
-    pdf = PDF()
-    pdf.add_page()
-    pdf.set_font("Arial", size=12)
-    
-    pdf.set_font("Arial", 'B', 16)
-    pdf.multi_cell(0, 10, clean_text_for_pdf(res.titulo_puesto))
-    pdf.ln(5)
-    
-    pdf.set_font("Arial", 'B', 12)
-    pdf.cell(0, 10, "Misión del Cargo:", ln=True)
-    pdf.set_font("Arial", size=12)
-    pdf.multi_cell(0, 7, clean_text_for_pdf(res.mision_puesto))
-    pdf.ln(5)
-    
-    def add_pdf_section(title, items):
-        pdf.set_font("Arial", 'B', 12)
-        pdf.cell(0, 10, clean_text_for_pdf(title), ln=True)
-        pdf.set_font("Arial", size=12)
-        for item in items:
-            pdf.multi_cell(0, 7, f"- {clean_text_for_pdf(item)}")
-        pdf.ln(3)
-
-    add_pdf_section("Responsabilidades Clave", res.responsabilidades_clave)
-    add_pdf_section("Competencias Conductuales", res.competencias_conductuales_seleccionadas)
-    add_pdf_section("Requisitos Técnicos", res.competencias_tecnicas)
-    add_pdf_section("Formación", res.requisitos_formacion)
-    
-    try:
-        pdf_output = pdf.output(dest='S').encode('latin-1')
-    except:
-        pdf_output = pdf.output(dest='S')
-    return pdf_output
-
-# --- C. Generador de TXT ---
-def convert_to_text(res):
-    texto = f"PERFIL: {res.titulo_puesto}\nNivel: {getattr(res, 'nivel', 'N/A')}\nMisión: {res.mision_puesto}\n\n"
-    texto += "RESPONSABILIDADES:\n" + "\n".join([f"- {x}" for x in res.responsabilidades_clave]) + "\n\n"
-    texto += "COMPETENCIAS:\n" + "\n".join([f"- {x}" for x in res.competencias_conductuales_seleccionadas]) + "\n\n"
-    texto += "TÉCNICAS:\n" + "\n".join([f"- {x}" for x in res.competencias_tecnicas])
-    return texto
-
-# --- D. Generador de CSV (NUEVO) ---
-def create_csv(res):
-    # Creamos un diccionario plano. Unimos las listas con " | "
-    data = {
-        "Título": res.titulo_puesto,
-        "Nivel": getattr(res, 'nivel', 'N/A'),
-        "Misión": res.mision_puesto,
-        "Responsabilidades": " | ".join(res.responsabilidades_clave),
-        "Competencias Conductuales": " | ".join(res.competencias_conductuales_seleccionadas),
-        "Competencias Técnicas": " | ".join(res.competencias_tecnicas),
-        "Formación": " | ".join(res.requisitos_formacion),
-        "KPIs": " | ".join(res.kpis_sugeridos),
-        "Estado": getattr(res, 'origen_titulo', 'N/A')
-    }
-    # Creamos un DataFrame de 1 sola fila
-    df = pd.DataFrame([data])
-    return df.to_csv(index=False).encode('utf-8')
+# Una sola cola para todas las sesiones.
+@st.cache_resource
+def get_tracking_queue():
+    creds = dict(st.secrets["gspread"]["gcp_service_account_credentials"])
+    return TrackingQueue(functools.partial(open_tracking_worksheet, creds), metrics=get_metrics())
 
-# ---------------------------------------------------------
-# 5. GUARDAR DATOS
-# ---------------------------------------------------------
 def guardar_datos_en_sheets(titulo_puesto: str, nivel: str, origen: str):
+    # La fila se encola y se envía por lotes en segundo plano: no añade latencia a la generación.
     try:
-        sh = get_google_sheet_client()
-        worksheet = sh.worksheet("Seguimiento Generaciones") 
-        timestamp = pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')
-        worksheet.append_row([timestamp, titulo_puesto, nivel, origen]) 
+        timestamp = time.strftime('%Y-%m-%d %H:%M:%S')
+        with get_metrics().stage("tracking_write"):
+            get_tracking_queue().enqueue([timestamp, titulo_puesto, nivel, origen])
         return True, None
     except Exception as e:
         return False, f"Error al guardar: {e}"
 
 # ---------------------------------------------------------
-# 6. INTERFAZ GRÁFICA
+# 4.1 CARGA MASIVA (LOTES EN SEGUNDO PLANO)
 # ---------------------------------------------------------
-st.set_page_config(page_title="JobCraft AI Suite", layout="wide", page_icon="👔") 
-
-st.markdown("## 👔 JobCraft AI: Suite de Reclutamiento")
-st.markdown("---")
-
-api_key = st.secrets["GEMINI_API_KEY"] if "GEMINI_API_KEY" in st.secrets else None
-if not api_key:
-    st.error("⚠️ Falta API KEY en Secrets")
-    st.stop()
-
-col_load1, col_load2 = st.columns(2)
-with col_load1:
-    df_comp, err_comp = get_competencias()
-    if err_comp: st.error(err_comp); st.stop()
-    st.success(f"✅ Diccionario: {len(df_comp)} registros", icon="📘")
-
-with col_load2:
-    txt_perfiles, err_perf = get_perfiles_estandar()
-    if "Error" in str(err_perf): 
-        st.warning(err_perf)
-    else:
-        st.success(f"✅ Catálogo Oficial conectado", icon="🗂️")
+# Mismo formato que el lote de consola (jobcraft_runner.py); se aceptan también los nombres en español.
+BULK_COLUMNS = {"title": "title", "cargo": "title", "level": "level", "nivel": "level",
+                "critical_skill": "critical_skill", "habilidad": "critical_skill", "habilidad_critica": "critical_skill"}
+MAX_BULK_ROWS = 500
+
+# Una sola cola para todas las sesiones: el lote sigue aunque el usuario recargue o cierre la página.
+@st.cache_resource
+def get_bulk_queue():
+    return BulkQueue()
+
+def read_bulk_csv(data: bytes):
+    # Devuelve ([(title, level, critical_skill), ...], error). Admite CSV de Excel (';') y UTF-8 o Latin-1.
+    import csv
+    try:
+        texto = data.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        texto = data.decode("latin-1")
+    try:
+        dialecto = csv.Sniffer().sniff(texto[:4096], delimiters=",;\t")
+    except csv.Error:
+        dialecto = csv.excel
+    lector = csv.reader(io.StringIO(texto), dialecto)
+    cabecera = next(lector, [])
+    columnas = {BULK_COLUMNS.get(c.strip().lower().replace(" ", "_")): i for i, c in enumerate(cabecera)}
+    if not {"title", "level", "critical_skill"} <= columnas.keys():
+        return [], "El CSV debe tener las columnas: title, level, critical_skill (o cargo, nivel, habilidad)."
+    filas = []
+    for registro in lector:
+        valores = [registro[columnas[c]].strip() if columnas[c] < len(registro) else "" for c in ("title", "level", "critical_skill")]
+        if valores[0]:
+            filas.append(tuple(valores))
+    if not filas:
+        return [], "El CSV no tiene ningún puesto."
+    if len(filas) > MAX_BULK_ROWS:
+        return [], f"El CSV tiene {len(filas)} puestos; el máximo por lote es {MAX_BULK_ROWS}."
+    return filas, None
+
+def bulk_generator(api_key: str, diccionario: CompetencyIndex, catalogo: CatalogIndex):
+    # Se prepara en la sesión (aquí sí hay st.*) y se ejecuta en los hilos de la cola, fuera de ella.
+    recursos = dict(cache=get_result_cache(), context_cache=get_context_cache(), scheduler=get_rate_limiter(), metrics=get_metrics(),
+                    router=get_router(), store=get_profile_store())
+    seguimiento = get_tracking_queue()
+
+    def generar(row):
+        title, level, critical_skill = row
+        error, res = generate_profile(api_key, title, level, critical_skill, diccionario, catalogo, **recursos)
+        if res is not None:
+            try:
+                seguimiento.enqueue([time.strftime('%Y-%m-%d %H:%M:%S'), res.titulo_puesto, res.nivel, res.origen_titulo])
+            except Exception:
+                pass  # El seguimiento nunca debe hacer fallar una fila del lote.
+        return error, res
+    return generar
+
+def bulk_results_csv(job: BulkJob) -> bytes:
+    # Una fila por puesto del archivo, en su orden: la entrada, el estado y el perfil (listas unidas con ", ").
+    import csv
+    campos = list(JobDescriptionV4.model_fields)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["title", "level", "critical_skill", "estado", "error", *campos])
+    for row, res, error in job.ordered():
+        datos = res.model_dump() if res is not None else {}
+        writer.writerow([*row, "OK" if res is not None else "ERROR", error or "",
+                         *(", ".join(v) if isinstance(v, list) else v for v in (datos.get(c, "") for c in campos))])
+    return buffer.getvalue().encode("utf-8-sig")
 
-with st.container():
-    col1, col2, col3 = st.columns([1, 1, 2])
+# ---------------------------------------------------------
+# 5. INTERFAZ GRÁFICA
+# ---------------------------------------------------------
+NIVELES = ["Junior (0-2 años)", "Semi-Senior (3-5 años)", "Senior (5+ años)", "Líder/Gerente"]
+
+@st.fragment(run_every=1.0)
+def esperar_hojas(snapshots: SheetSnapshots):
+    # Comprueba cada segundo si la carga en segundo plano terminó y entonces repinta la app entera.
+    if snapshots.ready(DICCIONARIO_SHEET) and snapshots.ready(PERFILES_SHEET):
+        st.rerun()
+
+def warm_up(api_key: str, snapshots: SheetSnapshots):
+    # Deja listos clientes, hojas, índices y librerías de exportación antes de que llegue tráfico.
+    REGISTRY.genai(api_key)
+    for name in (DICCIONARIO_SHEET, PERFILES_SHEET):
+        try:
+            snapshots.get(name)
+        except Exception:
+            pass
+    from jobcraft_exports import render_export
+    muestra = JobDescriptionV4(
+        titulo_puesto="Analista", nivel="Junior", titulo_oficial_match="N/A", origen_titulo="NUEVO",
+        mision_puesto="-", responsabilidades_clave=["-"], competencias_conductuales_seleccionadas=["-"],
+        competencias_tecnicas=["-"], requisitos_formacion=["-"], kpis_sugeridos=["-"], observacion_ia="",
+    )
+    for fmt in ("docx", "pdf"):
+        render_export(muestra, fmt)
+
+# Opcional (JOBCRAFT_WARMUP=1): la primera ejecución del script, p.ej. la sonda de arranque del
+# despliegue, lanza el calentamiento en un hilo una sola vez por proceso.
+@st.cache_resource
+def start_warm_up(api_key: str):
+    hilo = threading.Thread(target=warm_up, args=(api_key, get_sheet_snapshots()), name="jobcraft-warmup", daemon=True)
+    hilo.start()
+    return hilo
+
+def exportar(res: JobDescriptionV4, fmt: str) -> bytes:
+    # Lo llama el botón de descarga al pulsarse; se mide como etapa "export".
+    with get_metrics().stage("export", format=fmt):
+        return get_export_cache().get(res, fmt)
+
+def render_debug_panel(metrics: Metrics, router: ModelRouter):
+    # Panel opcional (barra lateral): dónde se fue el tiempo en la última generación y acumulados del proceso.
+    resumen = metrics.summary()
+    traza = st.session_state.get('traza')
+    if traza:
+        st.markdown("**Última generación**")
+        eventos = metrics.recent(traza)
+        st.dataframe(
+            [{"etapa": e["stage"], "ruta": e.get("route"), "ms": e["ms"], "estado": e["status"], "reintentos": e.get("retries"),
+              "tokens prompt": e.get("prompt_tokens"), "tokens salida": e.get("output_tokens")} for e in eventos],
+            hide_index=True, use_container_width=True,
+        )
+    st.markdown("**Proceso (todas las sesiones)**")
+    st.dataframe(
+        [{"etapa": nombre, **datos} for nombre, datos in sorted(resumen["stages"].items())],
+        hide_index=True, use_container_width=True,
+    )
+    rutas = router.stats()
+    if rutas:
+        st.markdown("**Rutas de modelo**")
+        st.dataframe(
+            [{"ruta": nombre, "modelo": router.routes[nombre].model if nombre in router.routes else None, **datos}
+             for nombre, datos in sorted(rutas.items())],
+            hide_index=True, use_container_width=True,
+        )
+    contadores = resumen["counters"]
+    aciertos, fallos = contadores.get("result_cache_hit", 0), contadores.get("result_cache_miss", 0)
+    st.caption(
+        f"Caché de resultados: {aciertos}/{aciertos + fallos} aciertos · "
+        f"tokens: {contadores.get('prompt_tokens', 0)} prompt ({contadores.get('cached_tokens', 0)} cacheados), "
+        f"{contadores.get('output_tokens', 0)} salida · reintentos: {contadores.get('retries', 0)} · "
+        f"coste estimado: ${resumen['cost_usd']:.4f}"
+    )
+
+def render_bulk_progress(job: BulkJob):
+    eta = job.eta()
+    st.progress(job.done / job.total if job.total else 1.0,
+                text=f"{job.status.capitalize()}: {job.done}/{job.total} puestos · {len(job.errors)} con error"
+                     + (f" · ~{eta:.0f}s restantes" if eta is not None else ""))
+
+@st.fragment(run_every=1.0)
+def seguir_lote(lote_id: str):
+    # Se repinta solo este bloque cada segundo; al terminar el lote se repinta la app con los resultados.
+    cola = get_bulk_queue()
+    lote = cola.get(lote_id)
+    if lote is None or lote.finished is not None:
+        st.rerun()
+    render_bulk_progress(lote)
+    if st.button("⛔ Cancelar lote", disabled=lote.cancelled):
+        cola.cancel(lote_id)
+
+def render_bulk_mode(api_key: str):
+    st.markdown("### 📑 Carga masiva")
+    st.caption(f"Sube un CSV con las columnas **title, level, critical_skill** (o cargo, nivel, habilidad); máximo {MAX_BULK_ROWS} puestos. "
+               "El lote se procesa en segundo plano: puedes seguir usando la app o volver más tarde.")
+    cola = get_bulk_queue()
+    lote = cola.get(st.session_state.get('lote_id', ''))
+
+    archivo = st.file_uploader("Archivo CSV", type=["csv"])
+    if archivo is not None:
+        filas, err_csv = read_bulk_csv(archivo.getvalue())
+        if err_csv:
+            st.error(err_csv)
+        elif st.button(f"🚀 Procesar {len(filas)} puestos", type="primary", disabled=lote is not None and lote.finished is None):
+            # Si la carga de las hojas aún no terminó, se espera aquí.
+            diccionario, err_comp = get_competencias()
+            if err_comp: st.error(err_comp); st.stop()
+            catalogo, _ = get_perfiles_estandar()
+            lote = cola.submit(filas, bulk_generator(api_key, diccionario, catalogo))
+            st.session_state['lote_id'] = lote.id
+            st.session_state.pop('lote_zip', None)
+
+    if lote is None:
+        return
+    if lote.finished is None:
+        seguir_lote(lote.id)
+        return
+
+    render_bulk_progress(lote)
+    resultados = [res for _, res, _ in lote.ordered() if res is not None]
+    if lote.errors:
+        with st.expander(f"⚠️ {len(lote.errors)} puestos con error"):
+            st.dataframe([{"fila": i + 1, "cargo": lote.rows[i][0], "error": e} for i, e in sorted(lote.errors.items())],
+                         hide_index=True, use_container_width=True)
+    col_csv, col_zip = st.columns(2)
+    with col_csv:
+        st.download_button("📊 Descargar resultados (.csv)", data=functools.partial(bulk_results_csv, lote),
+                           file_name="Lote_JobCraft.csv", mime="text/csv", on_click="ignore", use_container_width=True)
+    with col_zip:
+        if resultados and st.button(f"📦 Preparar ZIP con los {len(resultados)} perfiles", use_container_width=True):
+            with st.spinner("Generando archivos..."):
+                from jobcraft_exports import export_bulk, format_bulk_stats
+                buffer = io.BytesIO()
+                workers = min(os.cpu_count() or 1, max(1, len(resultados) // 25))
+                stats = export_bulk(resultados, buffer, formats=("docx", "pdf"), workers=workers)
+                st.session_state['lote_zip'] = (buffer.getvalue(), format_bulk_stats(stats))
+        if st.session_state.get('lote_zip'):
+            zip_bytes, resumen = st.session_state['lote_zip']
+            st.download_button("⬇️ Descargar ZIP", data=zip_bytes, file_name="Lote_JobCraft.zip", mime="application/zip",
+                               on_click="ignore", use_container_width=True)
+            st.caption(resumen)
+
+# Filas que muestra el historial por búsqueda (la consulta va al índice FTS, no se recorre todo).
+HISTORY_LIMIT = 200
+
+def usar_perfil_guardado(profile_id: int, title: str, level: str):
+    # Callback: abre un perfil del historial como resultado, con el cargo y nivel pedidos ahora.
+    store = get_profile_store()
+    res = store.get(profile_id)
+    if res is not None:
+        st.session_state['job_result'] = res.model_copy(update={"titulo_puesto": title, "nivel": level})
+        store.mark_reused(profile_id)
+
+def abrir_perfil_guardado(profile_id: int):
+    # Callback: abre el perfil tal como se guardó y vuelve al modo "Un puesto" para verlo y exportarlo.
+    st.session_state['job_result'] = get_profile_store().get(profile_id)
+    st.session_state['modo'] = "👤 Un puesto"
+
+def render_profile_suggestion(title: str, level: str, critical_skill: str):
+    # Antes de generar: si el historial ya tiene algo parecido, se ofrece usarlo sin llamar al modelo.
+    router = get_router()
+    similares = get_profile_store().closest(title, level, critical_skill, limit=1) if title.strip() else []
+    if not similares or similares[0].score < router.adapt_score:
+        return
+    p = similares[0]
+    col_info, col_btn = st.columns([3, 1])
+    with col_info:
+        st.info(f"📚 En el historial hay un perfil parecido: **{p.titulo_puesto}** ({p.level}"
+                + (f", {p.critical_skill}" if p.critical_skill else "") + f") · similitud {p.score:.0%}")
+    with col_btn:
+        st.button("♻️ Usar este perfil", on_click=usar_perfil_guardado, args=(p.id, title, level), use_container_width=True)
+
+def render_history_mode():
+    st.markdown("### 🗂️ Historial de perfiles")
+    store = get_profile_store()
+    col1, col2, col3 = st.columns([2, 1, 1])
     with col1:
-        t = st.text_input("Nombre del Cargo (Búsqueda)", value="Analista de Ventas")
+        consulta = st.text_input("Buscar", placeholder="Cargo, habilidad, misión, KPIs...")
     with col2:
-        l = st.selectbox("Nivel de Seniority", ["Junior (0-2 años)", "Semi-Senior (3-5 años)", "Senior (5+ años)", "Líder/Gerente"])
+        nivel = st.selectbox("Nivel", ["Todos"] + NIVELES)
     with col3:
-        s = st.text_input("Habilidad Crítica / Foco", placeholder="Ej: Python, Ventas B2B...")
+        origen = st.selectbox("Origen", ["Todos", "ESTANDARIZADO", "NUEVO"])
+
+    perfiles = store.search(consulta, level="" if nivel == "Todos" else nivel,
+                            origen="" if origen == "Todos" else origen, limit=HISTORY_LIMIT)
+    st.caption(f"{len(perfiles)} resultado(s) · {store.count()} perfiles guardados")
+    if not perfiles:
+        return
+    tabla = st.dataframe(
+        [{"fecha": time.strftime('%Y-%m-%d %H:%M', time.localtime(p.created)), "puesto": p.titulo_puesto, "nivel": p.level,
+          "habilidad": p.critical_skill, "origen": p.origen_titulo, "oficial": p.titulo_oficial_match,
+          "ruta": p.route, "reutilizado": p.reused} for p in perfiles],
+        hide_index=True, use_container_width=True, on_select="rerun", selection_mode="single-row",
+    )
+    filas = tabla.selection.rows
+    if filas:
+        elegido = perfiles[filas[0]]
+        st.button(f"📂 Abrir '{elegido.titulo_puesto}'", type="primary", on_click=abrir_perfil_guardado, args=(elegido.id,))
+
+def render_debug_sidebar():
+    # Panel opcional (activado por defecto con JOBCRAFT_DEBUG=1).
+    with st.sidebar:
+        if st.toggle("🔧 Panel de depuración", value=os.environ.get("JOBCRAFT_DEBUG") == "1"):
+            render_debug_panel(get_metrics(), get_router())
+
+def render_partial_profile(fields: dict):
+    # Vista previa mientras llega el JSON: cada campo aparece en cuanto está completo.
+    if fields.get("titulo_puesto"):
+        st.markdown(f"<h1 style='text-align: center; color: #1E88E5;'>{fields['titulo_puesto']}</h1>", unsafe_allow_html=True)
+    if fields.get("mision_puesto"):
+        st.info(f"🎯 **Misión:** {fields['mision_puesto']}")
+    col_izq, col_der = st.columns(2)
+    with col_izq:
+        if fields.get("responsabilidades_clave"):
+            st.subheader("🚀 Responsabilidades")
+            for item in fields["responsabilidades_clave"]: st.markdown(f"✅ {item}")
+        if fields.get("competencias_conductuales_seleccionadas"):
+            st.subheader("🧠 Competencias (ADN)")
+            for item in fields["competencias_conductuales_seleccionadas"]: st.markdown(f"🔹 {item}")
+    with col_der:
+        if fields.get("competencias_tecnicas"):
+            st.subheader("🛠️ Técnicas")
+            for item in fields["competencias_tecnicas"]: st.markdown(f"🔧 {item}")
+        if fields.get("requisitos_formacion"):
+            st.subheader("🎓 Requisitos")
+            for item in fields["requisitos_formacion"]: st.markdown(f"🎓 {item}")
+
+def main():
+    st.set_page_config(page_title="JobCraft AI Suite", layout="wide", page_icon="👔") 
+
+    st.markdown("## 👔 JobCraft AI: Suite de Reclutamiento")
+    st.markdown("---")
+
+    api_key = st.secrets["GEMINI_API_KEY"] if "GEMINI_API_KEY" in st.secrets else None
+    if not api_key:
+        st.error("⚠️ Falta API KEY en Secrets")
+        st.stop()
+
+    # Las hojas se cargan en segundo plano: el formulario se pinta sin esperarlas.
+    snapshots = get_sheet_snapshots()
+    snapshots.prefetch()
+    if os.environ.get("JOBCRAFT_WARMUP") == "1":
+        start_warm_up(api_key)
+
+    col_load1, col_load2 = st.columns(2)
+    with col_load1:
+        if snapshots.ready(DICCIONARIO_SHEET):
+            diccionario, err_comp = get_competencias()
+            if err_comp: st.error(err_comp); st.stop()
+            st.success(f"✅ Diccionario: {len(diccionario)} registros", icon="📘")
+        else:
+            st.info("⏳ Cargando Diccionario...", icon="📘")
 
-    btn = st.button("✨ Generar Perfil Técnico", type="primary", use_container_width=True)
+    with col_load2:
+        if snapshots.ready(PERFILES_SHEET):
+            catalogo, err_perf = get_perfiles_estandar()
+            if "Error" in str(err_perf): 
+                st.warning(err_perf)
+            else:
+                st.success(f"✅ Catálogo Oficial conectado: {len(catalogo)} puestos", icon="🗂️")
+        else:
+            st.info("⏳ Cargando Catálogo Oficial...", icon="🗂️")
 
-if btn:
-    st.session_state['job_result'] = None 
-    with st.spinner("🔍 Diseñando perfil..."):
-        err_ai, res = run_jobcraft_ai(api_key, t, l, s, df_comp, txt_perfiles)
-        
-        if err_ai: 
-            st.error(err_ai)
+    if not (snapshots.ready(DICCIONARIO_SHEET) and snapshots.ready(PERFILES_SHEET)):
+        esperar_hojas(snapshots)
+
+    modo = st.radio("Modo", ["👤 Un puesto", "📑 Carga masiva (CSV)", "🗂️ Historial"], horizontal=True,
+                    label_visibility="collapsed", key="modo")
+    if modo != "👤 Un puesto":
+        if modo == "🗂️ Historial":
+            render_history_mode()
         else:
-            st.session_state['job_result'] = res
-            origen_seguro = getattr(res, 'origen_titulo', 'NUEVO')
-            nivel_seguro = getattr(res, 'nivel', l)
-            guardar_datos_en_sheets(res.titulo_puesto, nivel_seguro, origen_seguro)
-
-# --- VISUALIZACIÓN DE RESULTADOS ---
-if 'job_result' in st.session_state and st.session_state['job_result']:
-    res = st.session_state['job_result']
-    
-    st.divider()
-    
-    # --- ÁREA DE DESCARGAS (Ahora con CSV) ---
-    st.subheader("📂 Exportar Perfil")
-    
-    # Creamos 4 columnas para que quepan todos los botones
-    col_d1, col_d2, col_d3, col_d4 = st.columns(4)
-    
-    file_name_base = f"Perfil_{res.titulo_puesto.replace(' ', '_')}"
-    
-    with col_d1:
-        docx_file = create_docx(res)
-        st.download_button(
-            label="📄 Word (.docx)",
-            data=docx_file,
-            file_name=f"{file_name_base}.docx",
-            mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-            use_container_width=True
-        )
-    
-    with col_d2:
-        try:
-            pdf_bytes = create_pdf(res)
-            st.download_button(
-                label="📕 PDF (.pdf)",
-                data=bytes(pdf_bytes),
-                file_name=f"{file_name_base}.pdf",
-                mime="application/pdf",
-                use_container_width=True
-            )
-        except Exception as e:
-            st.error("Error PDF")
-
-    with col_d3:
-        txt_file = convert_to_text(res)
-        st.download_button(
-            label="📝 Texto (.txt)",
-            data=txt_file,
-            file_name=f"{file_name_base}.txt",
-            mime="text/plain",
-            use_container_width=True
-        )
-        
-    with col_d4:
-        # Botón CSV Nuevo
-        csv_file = create_csv(res)
-        st.download_button(
-            label="📊 Datos (.csv)",
-            data=csv_file,
-            file_name=f"{file_name_base}.csv",
-            mime="text/csv",
-            use_container_width=True
-        )
+            render_bulk_mode(api_key)
+        render_debug_sidebar()
+        return
+
+    with st.container():
+        col1, col2, col3 = st.columns([1, 1, 2])
+        with col1:
+            t = st.text_input("Nombre del Cargo (Búsqueda)", value="Analista de Ventas")
+        with col2:
+            l = st.selectbox("Nivel de Seniority", NIVELES)
+        with col3:
+            s = st.text_input("Habilidad Crítica / Foco", placeholder="Ej: Python, Ventas B2B...")
+
+        render_profile_suggestion(t, l, s)
+        btn = st.button("✨ Generar Perfil Técnico", type="primary", use_container_width=True)
+
+    metrics = get_metrics()
+    if btn:
+        st.session_state['job_result'] = None 
+        # Todas las etapas de esta generación quedan etiquetadas con la misma traza (panel de depuración).
+        traza = st.session_state['traza'] = uuid.uuid4().hex[:8]
+
+        # Si la carga en segundo plano aún no ha terminado, se espera aquí (solo ocurre en el primer arranque).
+        with metrics.trace(traza), metrics.stage("sheets_load"):
+            diccionario, err_comp = get_competencias()
+            catalogo, _ = get_perfiles_estandar()
+        if err_comp: st.error(err_comp); st.stop()
+
+        vista_previa = st.empty()
+        def mostrar_parcial(fields):
+            with vista_previa.container():
+                render_partial_profile(fields)
+
+        with st.spinner("🔍 Diseñando perfil..."), metrics.trace(traza):
+            err_ai, res = run_jobcraft_ai(api_key, t, l, s, diccionario, catalogo, on_partial=mostrar_parcial)
+            vista_previa.empty()
+
+            if err_ai: 
+                st.error(err_ai)
+            else:
+                st.session_state['job_result'] = res
+                st.session_state.setdefault('historial', []).append(res)
+                origen_seguro = getattr(res, 'origen_titulo', 'NUEVO')
+                nivel_seguro = getattr(res, 'nivel', l)
+                guardar_datos_en_sheets(res.titulo_puesto, nivel_seguro, origen_seguro)
+
+    # --- VISUALIZACIÓN DE RESULTADOS ---
+    if 'job_result' in st.session_state and st.session_state['job_result']:
+        res = st.session_state['job_result']
+
+        st.divider()
+
+        # --- ÁREA DE DESCARGAS (Ahora con CSV) ---
+        st.subheader("📂 Exportar Perfil")
+
+        # Creamos 4 columnas para que quepan todos los botones.
+        # Cada archivo se genera solo al pulsar su botón (en un hilo aparte) y queda memorizado por contenido.
+        from jobcraft_exports import EXPORT_FORMATS
+        file_name_base = f"Perfil_{res.titulo_puesto.replace(' ', '_')}"
+        etiquetas = {"docx": "📄 Word (.docx)", "pdf": "📕 PDF (.pdf)", "txt": "📝 Texto (.txt)", "csv": "📊 Datos (.csv)"}
+
+        for col, fmt in zip(st.columns(4), ["docx", "pdf", "txt", "csv"]):
+            ext, mime = EXPORT_FORMATS[fmt]
+            with col:
+                st.download_button(
+                    label=etiquetas[fmt],
+                    data=functools.partial(exportar, res, fmt),
+                    file_name=f"{file_name_base}.{ext}",
+                    mime=mime,
+                    on_click="ignore",
+                    use_container_width=True
+                )
+
+        st.divider()
+
+        # --- VISUALIZACIÓN EN PANTALLA ---
+        if getattr(res, 'origen_titulo', 'NUEVO') == "ESTANDARIZADO":
+            st.success(f"✅ PUESTO VALIDADO EN CATÁLOGO")
+        else:
+            st.info(f"🆕 NUEVO PUESTO CREADO")
 
-    st.divider()
+        st.markdown(f"<h1 style='text-align: center; color: #1E88E5;'>{res.titulo_puesto}</h1>", unsafe_allow_html=True)
 
-    # --- VISUALIZACIÓN EN PANTALLA ---
-    if getattr(res, 'origen_titulo', 'NUEVO') == "ESTANDARIZADO":
-        st.success(f"✅ PUESTO VALIDADO EN CATÁLOGO")
-    else:
-        st.info(f"🆕 NUEVO PUESTO CREADO")
-        
-    st.markdown(f"<h1 style='text-align: center; color: #1E88E5;'>{res.titulo_puesto}</h1>", unsafe_allow_html=True)
+        titulo_oficial = getattr(res, 'titulo_oficial_match', 'N/A')
+        obs_ia = getattr(res, 'observacion_ia', '')
 
-    titulo_oficial = getattr(res, 'titulo_oficial_match', 'N/A')
-    obs_ia = getattr(res, 'observacion_ia', '')
-    
-    if titulo_oficial != "N/A" and titulo_oficial != res.titulo_puesto:
-            st.warning(f"⚠️ **Nota:** Oficialmente equivale a **'{titulo_oficial}'**.")
-    elif obs_ia:
-            st.caption(f"🤖 Nota: {obs_ia}")
+        if titulo_oficial != "N/A" and titulo_oficial != res.titulo_puesto:
+                st.warning(f"⚠️ **Nota:** Oficialmente equivale a **'{titulo_oficial}'**.")
+        elif obs_ia:
+                st.caption(f"🤖 Nota: {obs_ia}")
 
-    st.markdown(f"<p style='text-align: center;'>Nivel: <b>{getattr(res, 'nivel', 'N/A')}</b></p>", unsafe_allow_html=True)
-    st.info(f"🎯 **Misión:** {res.mision_puesto}")
-    
-    col_izq, col_der = st.columns(2)
-    with col_izq:
-        st.subheader("🚀 Responsabilidades")
-        for item in res.responsabilidades_clave: st.markdown(f"✅ {item}")
-        st.subheader("🧠 Competencias (ADN)")
-        for item in res.competencias_conductuales_seleccionadas: st.markdown(f"🔹 {item}")
-    with col_der:
-        st.subheader("🛠️ Técnicas")
-        for item in res.competencias_tecnicas: st.markdown(f"🔧 {item}")
-        st.subheader("🎓 Requisitos")
-        for item in res.requisitos_formacion: st.markdown(f"🎓 {item}")
-    
-    st.divider()
-    
-    st.markdown("### 📢 Modo Reclutador")
-    if st.button("🚀 Generar Post para LinkedIn"):
-        with st.spinner("✍️ Redactando anuncio viral..."):
-            post_linkedin = generate_linkedin_post(api_key, res)
+        st.markdown(f"<p style='text-align: center;'>Nivel: <b>{getattr(res, 'nivel', 'N/A')}</b></p>", unsafe_allow_html=True)
+        st.info(f"🎯 **Misión:** {res.mision_puesto}")
+
+        col_izq, col_der = st.columns(2)
+        with col_izq:
+            st.subheader("🚀 Responsabilidades")
+            for item in res.responsabilidades_clave: st.markdown(f"✅ {item}")
+            st.subheader("🧠 Competencias (ADN)")
+            for item in res.competencias_conductuales_seleccionadas: st.markdown(f"🔹 {item}")
+        with col_der:
+            st.subheader("🛠️ Técnicas")
+            for item in res.competencias_tecnicas: st.markdown(f"🔧 {item}")
+            st.subheader("🎓 Requisitos")
+            for item in res.requisitos_formacion: st.markdown(f"🎓 {item}")
+
+        st.divider()
+
+        st.markdown("### 📢 Modo Reclutador")
+        if st.button("🚀 Generar Post para LinkedIn"):
             st.markdown("#### 📝 Tu Post sugerido:")
+            borrador = st.empty()
+            with borrador.container():
+                post_linkedin = st.write_stream(generate_linkedin_post(api_key, res))
+            borrador.empty()
             st.text_area("Copia este texto:", value=post_linkedin, height=300)
             st.balloons()
+
+    # --- EXPORTACIÓN MASIVA DE LA SESIÓN ---
+    historial = st.session_state.get('historial', [])
+    if len(historial) > 1:
+        st.divider()
+        st.markdown("### 📦 Exportación masiva")
+        formatos_zip = st.multiselect("Formatos", ["docx", "pdf", "txt", "csv"], default=["docx", "pdf", "csv"])
+        if st.button(f"📦 Preparar ZIP con los {len(historial)} perfiles de la sesión"):
+            with st.spinner("Generando archivos..."):
+                from jobcraft_exports import export_bulk, format_bulk_stats
+                buffer = io.BytesIO()
+                # Con pocos perfiles no compensa arrancar procesos: se generan en línea.
+                workers = min(os.cpu_count() or 1, max(1, len(historial) // 25))
+                stats = export_bulk(historial, buffer, formats=tuple(formatos_zip), workers=workers)
+                st.session_state['zip_masivo'] = (buffer.getvalue(), format_bulk_stats(stats))
+        if st.session_state.get('zip_masivo'):
+            zip_bytes, resumen = st.session_state['zip_masivo']
+            st.caption(resumen)
+            st.download_button("⬇️ Descargar ZIP", data=zip_bytes, file_name="Perfiles_JobCraft.zip", mime="application/zip", on_click="ignore")
+
+    render_debug_sidebar()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,10 @@
+import os
+import sys
+import tempfile
+
+# Los módulos de JobCraft viven en la raíz del repositorio (sin paquete).
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# El estado local (.jobcraft/) se crea relativo al directorio de trabajo al importar los módulos:
+# las pruebas trabajan en un temporal para no tocar el del repositorio.
+os.chdir(tempfile.mkdtemp(prefix="jobcraft-tests-"))
@@ -0,0 +1,70 @@
+from pydantic import BaseModel
+
+import jobcraft_cache
+from jobcraft_cache import ResultCache
+
+
+class Perfil(BaseModel):
+    titulo_puesto: str
+
+
+class Otro(BaseModel):
+    titulo_puesto: str
+
+
+def _key(title: str, model: str = "gemini-2.5-flash", context_hash: str = "") -> str:
+    return ResultCache.make_key(title, "Junior", "SQL", model, "v1", context_hash)
+
+
+def test_hit_miss_and_normalised_keys(tmp_path):
+    cache = ResultCache(str(tmp_path / "results.sqlite"))
+    assert cache.get(_key("Analista"), Perfil) is None
+
+    cache.put(_key("Analista de Ventas"), Perfil(titulo_puesto="Analista de Ventas"))
+    assert cache.get(_key("  analista de  VENTAS "), Perfil) == Perfil(titulo_puesto="Analista de Ventas")
+    assert cache.get(_key("Analista de Ventas"), Otro) is None            # otro esquema, otra entrada
+    assert cache.get(_key("Analista de Ventas", model="gemini-2.5-flash-lite"), Perfil) is None
+    assert cache.get(_key("Analista de Ventas", context_hash="nuevo"), Perfil) is None
+    assert cache.stats() == {"hits": 1, "misses": 4, "hit_rate": 0.2, "entries": 1}
+
+
+def test_entries_survive_reopening(tmp_path):
+    ResultCache(str(tmp_path / "results.sqlite")).put(_key("Analista"), Perfil(titulo_puesto="Analista"))
+    assert ResultCache(str(tmp_path / "results.sqlite")).get(_key("Analista"), Perfil) is not None
+
+
+def test_expired_entries_miss_and_are_purged(tmp_path, monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(jobcraft_cache.time, "time", lambda: now[0])
+    cache = ResultCache(str(tmp_path / "results.sqlite"), max_age=60)
+    cache.put(_key("Analista"), Perfil(titulo_puesto="Analista"))
+
+    now[0] += 61
+    assert cache.get(_key("Analista"), Perfil) is None
+    cache.put(_key("Gerente"), Perfil(titulo_puesto="Gerente"))
+    assert cache.stats()["entries"] == 1
+
+
+def test_eviction_drops_the_least_recently_used(tmp_path, monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(jobcraft_cache.time, "time", lambda: now[0])
+    cache = ResultCache(str(tmp_path / "results.sqlite"), max_entries=2)
+    for title in ("A", "B"):
+        now[0] += 1
+        cache.put(_key(title), Perfil(titulo_puesto=title))
+    now[0] += 1
+    cache.get(_key("A"), Perfil)   # A pasa a ser la más reciente
+
+    now[0] += 1
+    cache.put(_key("C"), Perfil(titulo_puesto="C"))
+    assert cache.get(_key("B"), Perfil) is None
+    assert cache.get(_key("A"), Perfil) is not None and cache.get(_key("C"), Perfil) is not None
+    assert cache.stats()["entries"] == 2
+
+
+def test_corrupt_entry_is_dropped(tmp_path):
+    cache = ResultCache(str(tmp_path / "results.sqlite"))
+    cache.put(_key("Analista"), Perfil(titulo_puesto="Analista"))
+    cache.conn.execute("UPDATE results SET payload = '{\"otro\": 1}'")
+    assert cache.get(_key("Analista"), Perfil) is None
+    assert cache.stats()["entries"] == 0
@@ -0,0 +1,187 @@
+import pytest
+
+from jobcraft_cache import ResultCache
+from jobcraft_context_cache import MIN_CACHE_TOKENS, RETRY_DISABLED_FOR, ContextCache
+from jobcraft_fakes import FakeGenaiClient, use_fakes
+from jobcraft_matching import CatalogIndex, CompetencyIndex
+from jobcraft_metrics import Metrics
+from jobcraft_ratelimit import RateLimitScheduler, estimate_tokens
+
+LONG_PREFIX = "Instrucciones estables del prompt. " * 200
+SHORT_PREFIX = "Instrucciones."
+
+
+def _scheduler() -> RateLimitScheduler:
+    return RateLimitScheduler(rpm=1_000_000, tpm=1_000_000_000, max_retries=0)
+
+
+def _dictionary(size: int = 40) -> CompetencyIndex:
+    return CompetencyIndex([
+        {"Familia": f"Familia {i}", "COREES_Definición_Core_N1_Inicial": f"Definición de la competencia {i}"}
+        for i in range(size)
+    ])
+
+
+def _cached_names(client: FakeGenaiClient) -> list:
+    return [c["cached_content"] for c in client.models.calls]
+
+
+def _generate(cache, client, key="v1"):
+    return cache.generate(client, "petición", LONG_PREFIX, key, uncached=("petición corta", SHORT_PREFIX))
+
+
+# --- ContextCache: creación, renovación y modo sin caché ---
+def test_cache_is_created_once_and_reused():
+    cache, client = ContextCache("modelo"), FakeGenaiClient()
+    _generate(cache, client)
+    _generate(cache, client)
+
+    assert client.caches.create_calls == 1
+    assert _cached_names(client) == [cache.name, cache.name]
+
+
+def test_key_change_refreshes_and_deletes_the_old_cache():
+    cache, client = ContextCache("modelo"), FakeGenaiClient()
+    _generate(cache, client, key="hojas-v1")
+    old = cache.name
+    _generate(cache, client, key="hojas-v2")
+
+    assert client.caches.create_calls == 2 and cache.name != old
+    assert old not in client.caches.store and client.caches.delete_calls == 1
+    assert _cached_names(client) == [old, cache.name]
+
+
+def test_cache_is_renewed_before_it_expires():
+    cache, client = ContextCache("modelo"), FakeGenaiClient()
+    _generate(cache, client)
+    cache.expires_at = 0.0
+    _generate(cache, client)
+
+    assert client.caches.create_calls == 2
+
+
+def test_unavailable_cache_sends_the_compact_prompt_and_backs_off(monkeypatch):
+    import jobcraft_context_cache
+
+    cache, client = ContextCache("modelo"), FakeGenaiClient(caching_available=False)
+    now = 1_000_000.0
+    monkeypatch.setattr(jobcraft_context_cache.time, "time", lambda: now)
+    _generate(cache, client)
+    _generate(cache, client)
+
+    assert client.caches.create_calls == 1   # no se reintenta mientras dura la pausa
+    assert [(c["cached_content"], c["contents"], c["system_instruction"]) for c in client.models.calls] == \
+        [(None, "petición corta", SHORT_PREFIX)] * 2
+
+    now += RETRY_DISABLED_FOR + 1
+    client.caches.available = True
+    _generate(cache, client)
+    assert client.caches.create_calls == 2 and _cached_names(client)[-1] == cache.name
+
+
+def test_short_prefix_is_never_cached():
+    cache, client = ContextCache("modelo"), FakeGenaiClient()
+    cache.generate(client, "petición", SHORT_PREFIX, "v1")
+
+    assert client.caches.create_calls == 0 and _cached_names(client) == [None]
+
+
+def test_cache_expired_on_the_server_falls_back_and_is_recreated():
+    cache, client = ContextCache("modelo"), FakeGenaiClient()
+    _generate(cache, client)
+    client.caches.expire(cache.name)
+
+    _generate(cache, client)
+    assert client.models.calls[-1]["cached_content"] is None
+    assert client.models.calls[-1]["system_instruction"] == SHORT_PREFIX
+
+    _generate(cache, client)
+    assert client.caches.create_calls == 2 and _cached_names(client)[-1] == cache.name
+
+
+# --- Prefijos reales del runner y de la web ---
+@pytest.fixture
+def runner(monkeypatch, tmp_path):
+    import jobcraft_runner as runner
+
+    monkeypatch.setattr(runner, "CONTEXT_CACHE", ContextCache(runner.MODEL_NAME))
+    monkeypatch.setattr(runner, "RESULT_CACHE", ResultCache(str(tmp_path / "results.sqlite")))
+    monkeypatch.setattr(runner, "RATE_LIMITER", _scheduler())
+    return runner
+
+
+def test_runner_prefix_is_cached_and_reused(runner):
+    assert estimate_tokens(runner.CACHED_SYSTEM_INSTRUCTION, expected_output=0) >= MIN_CACHE_TOKENS
+    client = FakeGenaiClient()
+
+    runner.generate_job_description(client, "Analista de Datos", "Junior", "SQL")
+    runner.generate_job_description(client, "Jefe de Ventas", "Senior", "Negociación")
+
+    names = _cached_names(client)
+    assert len(names) == 2 and names[0] and names[0] == names[1]
+    assert client.caches.create_calls == 1
+
+
+def test_runner_without_cache_sends_the_instruction_without_examples(runner):
+    client = FakeGenaiClient(caching_available=False)
+
+    runner.generate_job_description(client, "Analista de Datos", "Junior", "SQL")
+
+    (call,) = client.models.calls
+    assert call["cached_content"] is None and call["system_instruction"] == runner.SYSTEM_INSTRUCTION
+    assert "EJEMPLOS DE SALIDA" not in call["system_instruction"]
+
+
+def _web_resources(tmp_path):
+    import jobcraft_web as web
+    from jobcraft_profiles import ProfileStore
+    from jobcraft_routing import ModelRouter
+
+    router = ModelRouter()
+    return dict(
+        cache=ResultCache(str(tmp_path / "results.sqlite")),
+        context_cache=ContextCache(router.routes["full"].model),
+        scheduler=_scheduler(),
+        metrics=Metrics("test", path=str(tmp_path / "metrics.jsonl"), prom_path=""),
+        router=router,
+        store=ProfileStore(web.JobDescriptionV4, path=str(tmp_path / "profiles.sqlite")),
+    )
+
+
+def _web_generate(client, tmp_path, diccionario):
+    import jobcraft_web as web
+
+    recursos = _web_resources(tmp_path)
+    with use_fakes(genai_client=client):
+        for title, level, skill in [("Analista de Compras", "Junior", "Excel"), ("Piloto de Drones", "Senior", "FPV")]:
+            error, res = web.generate_profile("key", title, level, skill, diccionario, CatalogIndex([]), **recursos)
+            assert error is None and res is not None
+
+
+def test_web_prefix_is_cached_and_reused(tmp_path):
+    import jobcraft_web as web
+
+    diccionario = _dictionary()
+    assert estimate_tokens(web.build_cached_system_instruction(diccionario), expected_output=0) >= MIN_CACHE_TOKENS
+    client = FakeGenaiClient()
+    _web_generate(client, tmp_path, diccionario)
+
+    names = _cached_names(client)
+    assert len(names) == 2 and names[0] and names[0] == names[1]
+    assert client.caches.create_calls == 1
+    assert all("Familias del diccionario más afines" in c["contents"] for c in client.models.calls)
+
+
+def test_web_without_cache_sends_top_k_competencies(tmp_path):
+    import jobcraft_web as web
+
+    diccionario = _dictionary()
+    client = FakeGenaiClient(caching_available=False)
+    _web_generate(client, tmp_path, diccionario)
+
+    for call in client.models.calls:
+        assert call["cached_content"] is None
+        assert call["system_instruction"] == web.build_system_instruction(diccionario)
+        assert diccionario.as_prompt("Analista de Compras", "Excel") in call["contents"] or \
+            diccionario.as_prompt("Piloto de Drones", "FPV") in call["contents"]
+        assert len(call["system_instruction"]) < len(web.build_cached_system_instruction(diccionario)) / 2
@@ -0,0 +1,39 @@
+from jobcraft_dedup import canonical_row, group_rows
+
+ROWS = [
+    ("Analista Sr.", "Sr.", "Excel"),
+    ("analista senior", "Senior (5+ años)", "EXCEL "),
+    ("Analista de Datos", "Junior", "SQL"),
+    ("Analistas de Datos", "Junior", "SQL"),
+    ("Analista de Datos", "Senior", "SQL"),
+    ("Ing. de Software", "Junior", "Python"),
+    ("Ingeniero de Software", "Jr", "python"),
+]
+
+
+def test_normalisation_collisions_are_exact_duplicates():
+    assert canonical_row(*ROWS[0]) == canonical_row(*ROWS[1]) == ("analista", "rango 3", "excel")
+    assert canonical_row(*ROWS[5]) == canonical_row(*ROWS[6])
+
+    groups, report = group_rows(ROWS, title_threshold=1.0, skill_threshold=1.0)
+    assert groups == [[0, 1], [2], [3], [4], [5, 6]]
+    assert (report.exact, report.fuzzy, report.calls_saved) == (2, 0, 2)
+
+
+def test_near_duplicates_merge_only_within_the_same_level():
+    groups, report = group_rows(ROWS)
+
+    assert groups == [[0, 1], [2, 3], [4], [5, 6]]   # el Senior de datos no se une al Junior
+    assert (report.rows, report.groups, report.exact, report.fuzzy) == (7, 4, 2, 1)
+    assert "3 llamadas ahorradas" in str(report)
+
+
+def test_distinct_requests_are_not_merged():
+    rows = [
+        ("Desarrollador C++", "Senior", "Backend"),
+        ("Desarrollador C#", "Senior", "Backend"),
+        ("Analista", "Junior", "Excel"),
+        ("Analista", "Junior", "Excel avanzado"),
+    ]
+    groups, report = group_rows(rows)
+    assert groups == [[0], [1], [2], [3]] and report.calls_saved == 0
@@ -0,0 +1,77 @@
+import threading
+
+from pydantic import BaseModel
+
+import jobcraft_exports
+from jobcraft_exports import ExportCache
+
+
+class Perfil(BaseModel):
+    titulo_puesto: str = "Analista de Datos"
+    nivel: str = "Junior"
+    mision_puesto: str = "Convertir datos en decisiones."
+    responsabilidades_clave: list[str] = ["Informes semanales"]
+    competencias_conductuales_seleccionadas: list[str] = ["Comunicación"]
+    competencias_tecnicas: list[str] = ["SQL"]
+    requisitos_formacion: list[str] = ["Grado en Estadística"]
+    kpis_sugeridos: list[str] = ["Informes a tiempo"]
+
+
+def test_export_is_rendered_once_per_content():
+    cache = ExportCache()
+    first = cache.get(Perfil(), "txt")
+    assert cache.get(Perfil(), "txt") == first   # mismo contenido, otro objeto
+    assert (cache.renders, cache.hits) == (1, 1)
+
+    cache.get(Perfil(), "csv")
+    assert cache.renders == 2
+
+
+def test_editing_the_profile_invalidates_its_exports():
+    cache = ExportCache()
+    profile = Perfil()
+    assert b"SQL" in cache.get(profile, "txt")
+
+    edited = profile.model_copy(update={"competencias_tecnicas": ["Python"]})
+    text = cache.get(edited, "txt")
+    assert b"Python" in text and b"SQL" not in text
+    assert cache.renders == 2
+
+
+def test_least_recently_used_export_is_evicted():
+    cache = ExportCache(max_items=2)
+    a, b, c = Perfil(titulo_puesto="A"), Perfil(titulo_puesto="B"), Perfil(titulo_puesto="C")
+    cache.get(a, "txt")
+    cache.get(b, "txt")
+    cache.get(a, "txt")   # A pasa a ser la más reciente
+    cache.get(c, "txt")
+
+    renders = cache.renders
+    cache.get(a, "txt")
+    assert cache.renders == renders
+    cache.get(b, "txt")
+    assert cache.renders == renders + 1
+
+
+def test_concurrent_requests_render_once(monkeypatch):
+    started, release = threading.Event(), threading.Event()
+    real_render = jobcraft_exports.render_export
+
+    def slow_render(res, fmt):
+        started.set()
+        release.wait(5)
+        return real_render(res, fmt)
+
+    monkeypatch.setattr(jobcraft_exports, "render_export", slow_render)
+    cache = ExportCache()
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get(Perfil(), "txt"))) for _ in range(4)]
+    for t in threads:
+        t.start()
+    started.wait(5)
+    release.set()
+    for t in threads:
+        t.join(5)
+
+    assert len(results) == 4 and len(set(results)) == 1
+    assert cache.renders == 1 and cache.hits == 3
@@ -0,0 +1,74 @@
+import threading
+import time
+
+import jobcraft_jobs
+from jobcraft_jobs import BulkQueue
+
+
+def _wait_finished(job, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while job.finished is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert job.finished is not None
+
+
+def test_job_completes_with_results_and_errors_in_file_order():
+    def generate(row):
+        if row[0] == "falla":
+            return "Error del modelo", None
+        if row[0] == "explota":
+            raise RuntimeError("sin conexión")
+        if row[0] == "vacía":
+            return None, None
+        return None, f"perfil {row[0]}"
+
+    queue = BulkQueue(max_workers=3)
+    rows = [("a",), ("falla",), ("b",), ("explota",), ("vacía",)]
+    job = queue.submit(rows, generate)
+    _wait_finished(job)
+
+    assert job.status == "terminado" and job.done == job.total == 5
+    assert job.ordered() == [
+        (("a",), "perfil a", None),
+        (("falla",), None, "Error del modelo"),
+        (("b",), "perfil b", None),
+        (("explota",), None, "sin conexión"),
+        (("vacía",), None, "Sin resultado"),
+    ]
+    assert queue.get(job.id) is job
+    assert queue.stats() == {"jobs": 1, "active": 0, "pending_rows": 0}
+
+
+def test_empty_job_is_finished_immediately():
+    job = BulkQueue(max_workers=1).submit([], lambda row: (None, row))
+    assert job.status == "terminado" and job.total == 0
+
+
+def test_cancel_skips_rows_not_yet_started():
+    started, release = threading.Event(), threading.Event()
+
+    def generate(row):
+        started.set()
+        release.wait(5)
+        return None, row
+
+    queue = BulkQueue(max_workers=1)
+    job = queue.submit([(1,), (2,), (3,)], generate)
+    started.wait(5)
+    queue.cancel(job.id)
+    assert job.status == "cancelando"
+    release.set()
+    _wait_finished(job)
+
+    assert job.status == "cancelado"
+    assert [(result, error) for _, result, error in job.ordered()] == [((1,), None), (None, "Cancelado"), (None, "Cancelado")]
+
+
+def test_finished_jobs_expire_after_ttl(monkeypatch):
+    queue = BulkQueue(max_workers=1, ttl=60)
+    old = queue.submit([], lambda row: (None, row))
+    now = time.time() + 61
+    monkeypatch.setattr(jobcraft_jobs.time, "time", lambda: now)
+
+    queue.submit([], lambda row: (None, row))
+    assert queue.get(old.id) is None and queue.stats()["jobs"] == 1
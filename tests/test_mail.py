@@ -0,0 +1,86 @@
+import email
+import email.policy
+import socketserver
+import threading
+import time
+
+import pytest
+
+from jobcraft_mail import MailDispatcher, build_digest
+
+
+class _SmtpHandler(socketserver.StreamRequestHandler):
+    # Lo justo de SMTP para que smtplib entregue mensajes: como `aiosmtpd -n`, sin TLS ni login.
+    def reply(self, line: str):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        self.reply("220 localhost depuración")
+        while line := self.rfile.readline():
+            command = line.decode().strip().upper()
+            if command.startswith(("EHLO", "HELO")):
+                self.reply("250 localhost")
+            elif command == "DATA":
+                self.reply("354 fin con <CRLF>.<CRLF>")
+                data = b"".join(iter(lambda: self.rfile.readline(), b".\r\n"))
+                with server.lock:
+                    server.messages.append(email.message_from_bytes(data.replace(b"\r\n..", b"\r\n."), policy=email.policy.default))
+                self.reply("250 OK")
+            elif command == "QUIT":
+                self.reply("221 adiós")
+                return
+            else:   # MAIL, RCPT, RSET, NOOP
+                self.reply("250 OK")
+
+
+@pytest.fixture
+def smtp_server():
+    server = socketserver.ThreadingTCPServer(("localhost", 0), _SmtpHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.connections = 0
+    server.messages = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_messages_share_a_single_connection(smtp_server):
+    mailer = MailDispatcher.debug(port=smtp_server.server_address[1], per_minute=60_000)
+    for n in range(3):
+        mailer.send("rrhh@example.com", f"Perfil {n}", f"Cuerpo {n}", attachments=[(f"perfil_{n}.txt", b"hola")])
+    digest = build_digest(["rrhh@example.com"], "Lote", [("Analista", "Resumen", [("analista.pdf", b"%PDF")])])
+    for message in digest:
+        mailer.enqueue(message)
+    mailer.close(timeout=10)
+
+    assert mailer.stats()["sent"] == 4 and mailer.stats()["failed"] == 0
+    assert smtp_server.connections == 1 and mailer.logins == 1
+    assert [m["Subject"] for m in smtp_server.messages] == ["Perfil 0", "Perfil 1", "Perfil 2", "Lote: 1 puestos"]
+    assert [part.get_filename() for part in smtp_server.messages[3].iter_attachments()] == ["analista.pdf"]
+
+
+def test_idle_connection_is_closed_and_reopened(smtp_server):
+    mailer = MailDispatcher.debug(port=smtp_server.server_address[1], per_minute=60_000, idle_timeout=0.1)
+    mailer.send("rrhh@example.com", "Primero", "Cuerpo")
+    mailer.flush(timeout=10)
+    time.sleep(0.3)
+    mailer.send("rrhh@example.com", "Segundo", "Cuerpo")
+    mailer.close(timeout=10)
+
+    assert mailer.stats()["sent"] == 2
+    assert smtp_server.connections == 2
+
+
+def test_daily_limit_blocks_without_connecting(smtp_server):
+    mailer = MailDispatcher.debug(port=smtp_server.server_address[1], per_minute=60_000, daily_limit=1)
+    mailer.send(["a@example.com", "b@example.com"], "Dos destinatarios", "Cuerpo")
+    mailer.close(timeout=10)
+
+    assert mailer.stats()["failed"] == 1 and "Límite diario" in mailer.last_error
+    assert smtp_server.connections == 0
@@ -0,0 +1,47 @@
+from jobcraft_fakes import FakeGenaiClient, use_fakes
+from jobcraft_metrics import Metrics
+from jobcraft_ratelimit import RateLimitScheduler
+from jobcraft_streaming import open_stream
+
+
+def _metrics(tmp_path) -> Metrics:
+    return Metrics("test", path=str(tmp_path / "metrics.jsonl"), prom_path=str(tmp_path / "metrics.prom"))
+
+
+def test_measured_stream_records_the_whole_stream_with_tokens(tmp_path):
+    metrics, client = _metrics(tmp_path), FakeGenaiClient(error_rate=1.0, error_codes=(503,), seed=1)
+    scheduler = RateLimitScheduler(rpm=1_000_000, tpm=1_000_000_000, max_retries=3, base_delay=0.0)
+    llamada = metrics.measured_stream(scheduler.call, "gemini-2.5-flash", stage="model_call_linkedin")
+
+    def first_fails(**kwargs):
+        # Un 503 al abrir el stream y después, la respuesta.
+        if client.models.errors == 0:
+            return client.models.generate_content_stream(**kwargs)
+        client.models.error_rate = 0.0
+        return client.models.generate_content_stream(**kwargs)
+
+    chunks = llamada(open_stream, first_fails, model="gemini-2.5-flash", contents="Escribe un post")
+    assert metrics.summary()["stages"] == {}   # nada se mide hasta consumir el stream
+    text = "".join(c.text for c in chunks)
+
+    assert text == "Texto generado por el doble de Gemini."
+    stage = metrics.summary()["stages"]["model_call_linkedin"]
+    assert stage["count"] == 1 and stage["errors"] == 0
+    (event,) = [e for e in metrics.events if e["stage"] == "model_call_linkedin"]
+    assert event["retries"] == 1 and event["output_tokens"] > 0 and event["cost_usd"] > 0
+    metrics.flush()
+    assert 'stage="model_call_linkedin"' in (tmp_path / "metrics_test.prom").read_text()
+
+
+def test_linkedin_post_is_measured(tmp_path):
+    import jobcraft_web as web
+    from jobcraft_fakes import fake_payload
+
+    metrics = web.get_metrics()
+    before = metrics.summary()["stages"].get("model_call_linkedin", {}).get("count", 0)
+    perfil = web.JobDescriptionV4(**fake_payload(web.JobDescriptionV4))
+    with use_fakes(genai_client=FakeGenaiClient()):
+        post = "".join(web.generate_linkedin_post("key", perfil))
+
+    assert not post.startswith("No se pudo")
+    assert metrics.summary()["stages"]["model_call_linkedin"]["count"] == before + 1
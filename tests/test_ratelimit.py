@@ -0,0 +1,113 @@
+import pytest
+from google.genai import errors
+
+from jobcraft_ratelimit import CircuitBreaker, CircuitOpenError, RateLimitScheduler, is_retryable
+
+
+def _scheduler(breaker: CircuitBreaker) -> RateLimitScheduler:
+    return RateLimitScheduler(rpm=1_000_000, tpm=1_000_000_000, max_retries=0, base_delay=0.0, breaker=breaker)
+
+
+def _half_open_breaker() -> CircuitBreaker:
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.0)
+    breaker.record_failure()
+    assert breaker.state == "half-open"
+    return breaker
+
+
+def test_half_open_probe_failing_with_400_does_not_wedge_the_circuit():
+    breaker = _half_open_breaker()
+    scheduler = _scheduler(breaker)
+
+    def bad_request():
+        raise errors.ClientError(400, {"error": {"code": 400, "message": "prompt has 5000 tokens", "status": "INVALID_ARGUMENT"}})
+
+    with pytest.raises(errors.ClientError):
+        scheduler.call(bad_request)
+    assert not breaker.probing
+    assert breaker.state == "closed"
+    assert scheduler.call(lambda: "ok") == "ok"
+
+
+def test_interrupted_half_open_probe_releases_the_probe():
+    breaker = _half_open_breaker()
+    scheduler = _scheduler(breaker)
+
+    def interrupted():
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        scheduler.call(interrupted)
+    assert not breaker.probing
+    assert scheduler.call(lambda: "ok") == "ok"
+
+
+def test_half_open_probe_failing_with_503_reopens_the_circuit():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60.0)
+    breaker.record_failure()
+    breaker.opened_at -= 60.0   # ya pasó el reset_timeout: semiabierto
+    scheduler = _scheduler(breaker)
+
+    def overloaded():
+        raise errors.ServerError(503, {"error": {"code": 503, "message": "overloaded", "status": "UNAVAILABLE"}})
+
+    with pytest.raises(errors.ServerError):
+        scheduler.call(overloaded)
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        scheduler.call(lambda: "ok")
+
+
+@pytest.mark.parametrize("error, expected", [
+    (errors.ClientError(429, {"error": {"code": 429, "message": "quota", "status": "RESOURCE_EXHAUSTED"}}), True),
+    (errors.ServerError(503, {"error": {"code": 503, "message": "", "status": "UNAVAILABLE"}}), True),
+    # El código manda aunque el mensaje contenga números parecidos a un código reintentable.
+    (errors.ClientError(400, {"error": {"code": 400, "message": "prompt has 5000 tokens", "status": "INVALID_ARGUMENT"}}), False),
+    (ValueError("prompt has 5000 tokens"), False),
+    (ValueError("got 1500000"), False),
+    (ConnectionError("HTTP 503 from upstream"), True),
+    (RuntimeError("Resource_exhausted"), True),
+])
+def test_is_retryable(error, expected):
+    assert is_retryable(error) is expected
+
+
+def _quota_error(retry_delay: str) -> errors.ClientError:
+    return errors.ClientError(429, {"error": {"code": 429, "status": "RESOURCE_EXHAUSTED", "message": "Quota exceeded.",
+                                              "details": [{"retryDelay": retry_delay}]}})
+
+
+def test_retry_after_longer_than_max_delay_fails_fast(monkeypatch):
+    import jobcraft_ratelimit
+
+    slept = []
+    monkeypatch.setattr(jobcraft_ratelimit.time, "sleep", slept.append)
+    scheduler = RateLimitScheduler(rpm=1_000_000, tpm=1_000_000_000, max_retries=3, max_delay=60.0)
+    calls = []
+
+    def exhausted():
+        calls.append(1)
+        raise _quota_error("3600s")
+
+    with pytest.raises(errors.ClientError):
+        scheduler.call(exhausted)
+    assert len(calls) == 1 and slept == []
+    assert scheduler.call(lambda: "ok") == "ok"   # los demás hilos no quedan en pausa
+
+
+def test_retry_after_within_max_delay_is_honoured(monkeypatch):
+    import jobcraft_ratelimit
+
+    slept = []
+    monkeypatch.setattr(jobcraft_ratelimit.time, "sleep", slept.append)
+    scheduler = RateLimitScheduler(rpm=1_000_000, tpm=1_000_000_000, max_retries=3, max_delay=60.0)
+    outcomes = [_quota_error("2s"), "ok"]
+
+    def flaky():
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    assert scheduler.call(flaky) == "ok"
+    assert 2.0 in slept and max(slept) <= 60.0
@@ -0,0 +1,87 @@
+import json
+
+import pytest
+from pydantic import BaseModel, Field, ValidationError
+
+import jobcraft_repair as repair
+from jobcraft_fakes import FakeGenaiClient
+from jobcraft_ratelimit import RateLimitScheduler
+
+
+class Perfil(BaseModel):
+    titulo_puesto: str = Field(description="Título del puesto.")
+    nivel: str = Field(description="Nivel de experiencia.")
+    resumen_puesto: str = Field(description="Resumen del rol.")
+    responsabilidades_clave: list[str] = Field(description="Responsabilidades principales.")
+
+
+VALID = {"titulo_puesto": "Analista de Datos", "nivel": "Junior", "resumen_puesto": "Analiza datos.",
+         "responsabilidades_clave": ["Informes", "Limpieza de datos"]}
+
+
+@pytest.fixture(autouse=True)
+def clean_stats():
+    repair.stats.clear()
+
+
+def test_valid_output_is_returned_as_is():
+    assert repair.parse_model_output(json.dumps(VALID), Perfil).model_dump() == VALID
+    assert repair.stats == {"valid": 1}
+
+
+def test_fenced_output_with_extra_fields_and_text_lists_is_repaired():
+    text = "Aquí tienes:\n```json\n" + json.dumps({
+        "Titulo Puesto": "Analista de Datos", "nivel": "Junior", "resumen_puesto": ["Analiza", "datos."],
+        "responsabilidades-clave": "- Informes\n- Limpieza de datos", "salario": 30000, "notas": None,
+    }) + "\n```\nEspero que sirva."
+
+    result = repair.parse_model_output(text, Perfil)
+    assert result.responsabilidades_clave == ["Informes", "Limpieza de datos"]
+    assert result.resumen_puesto == "Analiza\ndatos."
+    assert "salario" not in result.model_dump()
+    assert repair.stats == {"repaired": 1}
+
+
+def test_truncated_output_keeps_closed_fields_and_fills_defaults():
+    text = json.dumps({"resumen_puesto": "Analiza datos.", "responsabilidades_clave": ["Informes", "Limpieza de datos"]})
+    truncated = text[:text.index("Limpieza") + 5]
+
+    result = repair.parse_model_output(truncated, Perfil, defaults={"titulo_puesto": "Analista", "nivel": "Junior"})
+    assert result.titulo_puesto == "Analista" and result.responsabilidades_clave == ["Informes"]
+
+
+def test_truncated_output_without_reask_fails_validation():
+    with pytest.raises(ValidationError):
+        repair.parse_model_output('{"titulo_puesto": "Analista", "nivel": "Jun', Perfil)
+    assert repair.stats == {"failed": 1}
+
+
+def test_reask_asks_only_for_the_missing_fields():
+    client = FakeGenaiClient()
+    scheduler = RateLimitScheduler(rpm=1_000_000, tpm=1_000_000_000, max_retries=0)
+
+    def reask(missing, partial):
+        return repair.reask_missing(client, "gemini-2.5-flash", scheduler.call, Perfil, missing, partial, "Analista, Junior, SQL")
+
+    truncated = '{"titulo_puesto": "Analista de Datos", "nivel": "Junior", "resumen_puesto": "Analiza d'
+    result = repair.parse_model_output(truncated, Perfil, reask=reask)
+
+    assert len(client.models.calls) == 1
+    call = client.models.calls[0]
+    assert "resumen_puesto, responsabilidades_clave" in call["contents"]
+    assert '"titulo_puesto": "Analista de Datos"' in call["contents"]
+    assert result.titulo_puesto == "Analista de Datos"   # lo ya generado no se pisa
+    assert len(result.responsabilidades_clave) == 5
+    assert repair.stats == {"reasked": 1}
+
+
+def test_failed_reask_surfaces_the_validation_error():
+    client = FakeGenaiClient(error_rate=1.0, error_codes=(503,))
+    scheduler = RateLimitScheduler(rpm=1_000_000, tpm=1_000_000_000, max_retries=0)
+
+    def reask(missing, partial):
+        return repair.reask_missing(client, "gemini-2.5-flash", scheduler.call, Perfil, missing, partial, "Analista")
+
+    with pytest.raises(ValidationError):
+        repair.parse_model_output('{"titulo_puesto": "Analista"}', Perfil, reask=reask)
+    assert repair.stats == {"failed": 1}
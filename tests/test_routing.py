@@ -0,0 +1,68 @@
+import pytest
+
+from jobcraft_fakes import fake_payload
+from jobcraft_profiles import ProfileStore
+from jobcraft_routing import ADAPT_SCORE, ModelRouter
+
+
+@pytest.fixture
+def store(tmp_path):
+    from jobcraft_web import JobDescriptionV4
+
+    store = ProfileStore(JobDescriptionV4, path=str(tmp_path / "profiles.sqlite"))
+    profile = JobDescriptionV4(**{**fake_payload(JobDescriptionV4), "titulo_puesto": "Analista de Datos"})
+    store.add("Analista de Datos", "Junior", "Excel", profile, context="ctx")
+    return store
+
+
+def _route(store, title, level, skill):
+    (similar,) = store.closest(title, level, skill, limit=1)
+    return similar.score, ModelRouter().classify(title, level, skill, [], similar=similar, context="ctx").route
+
+
+def test_other_level_and_unrelated_skill_is_not_adapted(store):
+    score, route = _route(store, "Analista de Datos", "Senior", "SQL")
+    assert score == pytest.approx(0.6) and score < ADAPT_SCORE
+    assert route == "full"
+
+
+@pytest.mark.parametrize("level, skill", [("Junior", "SQL"), ("Senior", "Excel")])
+def test_same_level_or_same_skill_is_adapted(store, level, skill):
+    score, route = _route(store, "Analista de Datos", level, skill)
+    assert ADAPT_SCORE < score < 0.95
+    assert route == "adapt"
+
+
+def test_light_route_results_are_not_served_to_the_full_route(tmp_path):
+    import jobcraft_web as web
+    from jobcraft_cache import ResultCache
+    from jobcraft_context_cache import ContextCache
+    from jobcraft_fakes import FakeGenaiClient, use_fakes
+    from jobcraft_matching import CatalogIndex, CompetencyIndex
+    from jobcraft_metrics import Metrics
+    from jobcraft_ratelimit import RateLimitScheduler
+    from jobcraft_routing import DEFAULT_ROUTES
+
+    diccionario = CompetencyIndex([{"Familia": "Negociación", "COREES_Definición_Core_N1_Inicial": "Acuerdos"}])
+    catalogo = CatalogIndex([{"Cargo": "Analista de Compras", "Nivel": "Junior"}])
+    shared = dict(
+        cache=ResultCache(str(tmp_path / "results.sqlite")),
+        context_cache=ContextCache(DEFAULT_ROUTES["full"].model),
+        scheduler=RateLimitScheduler(rpm=1_000_000, tpm=1_000_000_000, max_retries=0),
+        metrics=Metrics("test", path=str(tmp_path / "metrics.jsonl"), prom_path=""),
+        store=ProfileStore(web.JobDescriptionV4, path=str(tmp_path / "profiles.sqlite")),
+    )
+    client = FakeGenaiClient()
+
+    def generate(router):
+        with use_fakes(genai_client=client):
+            error, res = web.generate_profile("key", "Analista de Compras", "Junior", "Excel", diccionario, catalogo,
+                                              router=router, **shared)
+        assert error is None and res is not None
+
+    generate(ModelRouter())
+    generate(ModelRouter())   # misma ruta ligera: acierto de caché, sin llamada
+    assert [c["model"] for c in client.models.calls] == [DEFAULT_ROUTES["fast"].model]
+
+    generate(ModelRouter(routes={"full": DEFAULT_ROUTES["full"]}))
+    assert [c["model"] for c in client.models.calls] == [DEFAULT_ROUTES["fast"].model, DEFAULT_ROUTES["full"].model]
@@ -0,0 +1,137 @@
+import argparse
+
+import pytest
+
+import jobcraft_runner as runner
+
+
+@pytest.mark.parametrize("value, expected", [(None, None), ("auto", "auto"), (" AUTO ", "auto"), ("1", 1), ("8", 8), (4, 4)])
+def test_parse_pack_size_accepts_auto_and_positive_ints(value, expected):
+    assert runner.parse_pack_size(value) == expected
+
+
+@pytest.mark.parametrize("value", ["0", "-3", "dos", "2.5", "", 0, -1, 2.5])
+def test_parse_pack_size_rejects_the_rest(value):
+    with pytest.raises(ValueError):
+        runner.parse_pack_size(value)
+
+
+def test_pack_size_arg_reports_through_argparse():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pack-size", type=runner.pack_size_arg)
+    assert parser.parse_args(["--pack-size", "auto"]).pack_size == "auto"
+    with pytest.raises(SystemExit):
+        parser.parse_args(["--pack-size", "0"])
+
+
+@pytest.mark.parametrize("pack_size", [0, -2, "x"])
+def test_batch_rejects_invalid_pack_size_before_generating(tmp_path, capsys, pack_size):
+    input_file = tmp_path / "input.csv"
+    input_file.write_text("title,level,critical_skill\nAnalista,Junior,SQL\n")
+
+    assert runner.process_job_batch("key", str(input_file), pack_size=pack_size, notify="none",
+                                    output_file=str(tmp_path / "out.csv")) is None
+    assert "pack_size" in capsys.readouterr().out
+    assert not (tmp_path / "out.csv").exists()
+
+
+def _run_batch(tmp_path, monkeypatch, output_file, n=2, resume=False, client=None, rows=None, dedup=False):
+    from jobcraft_cache import ResultCache
+    from jobcraft_fakes import FakeGenaiClient, use_fakes
+    from jobcraft_ratelimit import RateLimitScheduler
+
+    monkeypatch.setattr(runner, "RESULT_CACHE", ResultCache(str(tmp_path / "results.sqlite")))
+    monkeypatch.setattr(runner, "RATE_LIMITER", RateLimitScheduler(rpm=1_000_000, tpm=1_000_000_000, max_retries=0))
+    input_file = tmp_path / "input.csv"
+    rows = rows or [(f"Puesto {i}", "Junior", f"Habilidad {i}") for i in range(n)]
+    input_file.write_text("title,level,critical_skill\n" + "".join(",".join(r) + "\n" for r in rows))
+    with use_fakes(genai_client=client or FakeGenaiClient()):
+        return runner.process_job_batch("key", str(input_file), notify="none", output_file=output_file,
+                                        resume=resume, dedup=dedup)
+
+
+def test_batch_defaults_to_its_own_output(tmp_path, monkeypatch):
+    assert runner.BATCH_OUTPUT_FILE != runner.OUTPUT_FILE
+    output = tmp_path / "batch.csv"
+    output.write_text("fila de un lote anterior\n")
+
+    assert all(_run_batch(tmp_path, monkeypatch, str(output)))
+    assert "fila de un lote anterior" not in output.read_text()
+
+
+@pytest.fixture
+def shared(tmp_path, monkeypatch):
+    import pandas as pd
+
+    shared = tmp_path / "jobcraft_output.csv"
+    monkeypatch.setattr(runner, "OUTPUT_FILE", str(shared))
+    pd.DataFrame([{f: "suelta" for f in runner.JobDescription.model_fields}]).to_csv(shared, index=False)
+    return shared
+
+
+def test_batch_appends_to_the_shared_output(tmp_path, monkeypatch, shared):
+    import pandas as pd
+
+    _run_batch(tmp_path, monkeypatch, str(shared))
+    _run_batch(tmp_path, monkeypatch, str(shared))
+
+    assert len(pd.read_csv(shared)) == 1 + 2 + 2
+
+
+def test_resume_into_shared_output_only_adds_unpublished_rows(tmp_path, monkeypatch, shared):
+    import pandas as pd
+    from jobcraft_fakes import FakeGenaiClient
+
+    flaky = FakeGenaiClient(error_rate=0.5, error_codes=(503,), seed=3)
+    first = _run_batch(tmp_path, monkeypatch, str(shared), n=12, client=flaky)
+    assert 0 < sum(r is not None for r in first) < 12
+    assert len(pd.read_csv(shared)) == 1 + sum(r is not None for r in first)
+
+    assert all(_run_batch(tmp_path, monkeypatch, str(shared), n=12, resume=True))
+    assert all(_run_batch(tmp_path, monkeypatch, str(shared), n=12, resume=True))
+    assert len(pd.read_csv(shared)) == 1 + 12
+
+
+def test_interrupted_batch_leaves_shared_output_untouched(tmp_path, monkeypatch, shared):
+    before = shared.read_text()
+
+    def interrupt(*args, **kwargs):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(runner, "generate_job_description", interrupt)
+    assert _run_batch(tmp_path, monkeypatch, str(shared), n=3) is None
+    assert shared.read_text() == before
+    assert not (tmp_path / "jobcraft_output.csv.tmp").exists()
+
+
+DUPLICATED_ROWS = [
+    ("Analista Sr.", "Sr.", "Excel"),
+    ("analista senior", "Senior (5+ años)", "EXCEL "),
+    ("Ing. de Software", "Junior", "Python"),
+    ("Ingeniero de Software", "Jr", "python"),
+    ("Ingeniero de Software", "Junior", "Python"),
+]
+
+
+def test_dedup_generates_once_per_group_and_fans_out(tmp_path, monkeypatch):
+    from jobcraft_fakes import FakeGenaiClient
+
+    client = FakeGenaiClient()
+    results = _run_batch(tmp_path, monkeypatch, str(tmp_path / "out.csv"), rows=DUPLICATED_ROWS, dedup=True, client=client)
+
+    assert len(client.models.calls) == 2
+    assert len(results) == len(DUPLICATED_ROWS) and all(results)
+    assert results[0] is results[1]
+    assert results[2] is results[3] is results[4]
+
+
+def test_failed_representative_fails_every_member(tmp_path, monkeypatch):
+    import jobcraft_journal
+    from jobcraft_fakes import FakeGenaiClient
+
+    failing = FakeGenaiClient(error_rate=1.0, error_codes=(503,))
+    results = _run_batch(tmp_path, monkeypatch, str(tmp_path / "out.csv"), rows=DUPLICATED_ROWS, dedup=True, client=failing)
+
+    assert results == [None] * len(DUPLICATED_ROWS)
+    journal = jobcraft_journal.BatchJournal(jobcraft_journal.journal_path(str(tmp_path / "input.csv")))
+    assert journal.counts() == {"failed": len(DUPLICATED_ROWS)}
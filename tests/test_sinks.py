@@ -0,0 +1,39 @@
+import time
+
+import pytest
+
+from jobcraft_sinks import CsvSink, JsonlSink, OutputSink
+
+
+def test_base_sink_requires_the_file_methods(tmp_path):
+    class Incomplete(OutputSink):
+        def _close_file(self):
+            pass
+
+    with pytest.raises(TypeError):
+        OutputSink(str(tmp_path / "out.csv"), ["a"])
+    with pytest.raises(TypeError):
+        Incomplete(str(tmp_path / "out.csv"), ["a"])
+
+
+def test_idle_rows_are_flushed_on_a_timer(tmp_path):
+    path = tmp_path / "out.jsonl"
+    sink = JsonlSink(str(path), ["a"], flush_rows=100, flush_interval=0.05)
+    sink.write({"a": 1})
+    assert path.read_text() == ""
+
+    deadline = time.monotonic() + 2.0
+    while not path.read_text() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert path.read_text() == '{"a": 1}\n'
+    assert sink.written == 1 and sink.buffer == []
+    sink.close()
+    assert not sink.thread.is_alive()
+
+
+def test_close_flushes_and_stops_the_timer(tmp_path):
+    path = tmp_path / "out.csv"
+    with CsvSink(str(path), ["a"], replace=True, flush_rows=100, flush_interval=60.0) as sink:
+        sink.write_many([{"a": 1}, {"a": 2}])
+    assert path.read_text().splitlines() == ["a", "1", "2"]
+    assert not sink.thread.is_alive()
@@ -0,0 +1,57 @@
+import pytest
+
+from jobcraft_fakes import FakeSpreadsheet
+from jobcraft_snapshot import SheetSnapshots
+
+
+@pytest.fixture
+def doc():
+    doc = FakeSpreadsheet(modified_time="t0")
+    doc.add("Diccionario", [{"Familia": "Negociación", "Definición": "Acuerdos"}])
+    doc.add("Perfiles", [{"Cargo": "Analista de Compras", "Nivel": "Junior"}])
+    doc.add("Seguimiento Generaciones")
+    return doc
+
+
+@pytest.fixture
+def snapshots(doc, tmp_path):
+    snapshots = SheetSnapshots(lambda: doc, ["Diccionario", "Perfiles"], path=str(tmp_path / "snapshots.sqlite"), start=False)
+    snapshots.get("Diccionario")
+    snapshots.get("Perfiles")
+    assert snapshots.downloads == 2
+    return snapshots
+
+
+def test_tracking_writes_do_not_trigger_downloads(doc, snapshots):
+    for i in range(3):
+        doc.worksheet("Seguimiento Generaciones").append_row([f"fila {i}"])
+        doc.modified_time = f"t{i + 1}"
+        assert snapshots.refresh() == []
+    assert snapshots.downloads == 2 and snapshots.checks == 3
+
+
+def test_resized_sheet_is_downloaded(doc, snapshots):
+    doc.worksheet("Perfiles").records.append({"Cargo": "Jefe de Ventas", "Nivel": "Senior"})
+    doc.modified_time = "t1"
+
+    assert snapshots.refresh() == ["Perfiles"]
+    assert snapshots.downloads == 3
+    assert len(snapshots.get("Perfiles").records) == 2
+
+
+def test_in_place_edit_is_picked_up_by_the_full_check(doc, snapshots):
+    doc.worksheet("Diccionario").records[0]["Definición"] = "Acuerdos beneficiosos"
+    doc.modified_time = "t1"
+    assert snapshots.refresh() == []
+
+    snapshots.snapshots["Diccionario"].fetched -= snapshots.full_check_interval
+    assert snapshots.refresh() == ["Diccionario"]
+    assert snapshots.get("Diccionario").records[0]["Definición"] == "Acuerdos beneficiosos"
+    assert snapshots.downloads == 3
+
+
+def test_unchanged_document_is_not_probed(doc, snapshots, monkeypatch):
+    calls = []
+    monkeypatch.setattr(doc, "fetch_sheet_metadata", lambda: calls.append(1) or {"sheets": []})
+    assert snapshots.refresh() == []
+    assert calls == [] and snapshots.downloads == 2
@@ -0,0 +1,87 @@
+import json
+
+from jobcraft_streaming import PartialJsonParser, StreamedResponse, collect_json_stream
+
+DOCUMENT = {
+    "titulo_puesto": "Analista \"Senior\" de Datos",
+    "mision_puesto": "Línea 1\nLínea 2 con \\ barra, comas, y llaves {}",
+    "responsabilidades_clave": ["Uno, con coma", "Dos [corchetes]", "Tres é 😀"],
+    "detalle": {"nivel": 3, "tags": ["a", {"b": [1, 2]}], "activo": True},
+    "vacia": [],
+    "anios": 12345,
+}
+TEXT = json.dumps(DOCUMENT, ensure_ascii=False, indent=1)
+
+
+def _feed(chunks) -> list[dict]:
+    parser = PartialJsonParser()
+    return [parser.feed(c) for c in chunks]
+
+
+def _assert_consistent(fields: dict):
+    # Todo lo que se entrega es definitivo, salvo una lista a medias que es un prefijo de la final.
+    for key, value in fields.items():
+        final = DOCUMENT[key]
+        if isinstance(final, list):
+            assert value == final[:len(value)]
+        else:
+            assert value == final
+
+
+def test_any_two_chunk_split_gives_the_full_object():
+    for split in range(1, len(TEXT)):
+        first, last = _feed([TEXT[:split], TEXT[split:]])
+        _assert_consistent(first)
+        assert last == DOCUMENT, split
+
+
+def test_char_by_char_is_monotonic_and_complete():
+    seen = {}
+    for fields in _feed(TEXT):
+        _assert_consistent(fields)
+        for key in seen:
+            assert key in fields
+        seen = fields
+    assert seen == DOCUMENT
+
+
+def test_text_before_the_object_is_ignored():
+    assert _feed(["```json\n", TEXT[:10], TEXT[10:] + "\n```"])[-1] == DOCUMENT
+
+
+def test_number_at_the_end_waits_for_more_digits():
+    assert _feed(['{"a": "x", "n": 12'])[-1] == {"a": "x"}
+    assert _feed(['{"a": "x", "n": 12', "3}"])[-1] == {"a": "x", "n": 123}
+
+
+def test_truncated_input_keeps_only_complete_fields():
+    cut = TEXT.index("Dos [corchetes]") + 3
+    fields = _feed([TEXT[:cut]])[-1]
+    assert fields == {
+        "titulo_puesto": DOCUMENT["titulo_puesto"],
+        "mision_puesto": DOCUMENT["mision_puesto"],
+        "responsabilidades_clave": ["Uno, con coma"],
+    }
+    assert _feed(['{"titulo_puesto": "Anal'])[-1] == {}
+    assert _feed(["sin json"])[-1] == {}
+
+
+def test_split_inside_an_escape_sequence():
+    text = '{"a": "comillas \\" y \\u00e9", "b": 1}'
+    for split in range(1, len(text)):
+        assert _feed([text[:split], text[split:]])[-1] == {"a": 'comillas " y é', "b": 1}
+
+
+def test_collect_json_stream_reports_new_fields_once():
+    class Chunk:
+        def __init__(self, text, usage=None):
+            self.text, self.usage_metadata = text, usage
+
+    seen = []
+    chunks = [Chunk(TEXT[i:i + 7]) for i in range(0, len(TEXT), 7)] + [Chunk("", usage="consumo")]
+    response = collect_json_stream(chunks, seen.append)
+
+    assert isinstance(response, StreamedResponse)
+    assert json.loads(response.text) == DOCUMENT and response.usage_metadata == "consumo"
+    assert seen[-1] == DOCUMENT
+    assert all(a != b for a, b in zip(seen, seen[1:]))
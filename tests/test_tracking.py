@@ -0,0 +1,14 @@
+from jobcraft_fakes import FakeWorksheet
+from jobcraft_tracking import TrackingQueue
+
+
+def test_rows_are_sent_raw(tmp_path):
+    worksheet = FakeWorksheet("Seguimiento Generaciones")
+    queue = TrackingQueue(lambda: worksheet, spool_path=str(tmp_path / "spool.jsonl"), flush_interval=60.0)
+    queue.enqueue(["2024-01-01 10:00", '=IMPORTXML("http://x", "//a")', "1-2", "NUEVO"])
+
+    assert queue.flush()
+    queue.close()
+    assert worksheet.appended == [["2024-01-01 10:00", '=IMPORTXML("http://x", "//a")', "1-2", "NUEVO"]]
+    assert worksheet.options == [{"value_input_option": "RAW"}]
+    assert queue.stats()["pending"] == 0